@@ -2,17 +2,34 @@
 Sistema de Relatórios - Aplicação Principal
 """
 
-from flask import Flask
+from flask import Flask, request, jsonify, g
 from config.settings import Config
+from pathlib import Path
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Templates e arquivos estáticos ficam na raiz do projeto, fora do pacote
+BASE_DIR = Path(__file__).resolve().parent.parent
 
 def create_app():
     """Factory function para criar a aplicação Flask"""
-    app = Flask(__name__)
+    app = Flask(
+        __name__,
+        template_folder=str(BASE_DIR / 'templates'),
+        static_folder=str(BASE_DIR / 'static')
+    )
+    Config.validate()
     app.config.from_object(Config)
     
     # Registrar blueprints
     from app.routes.auth import auth_bp
     from app.routes.relatorios import relatorios_bp
+    from app.routes.estatisticas import estatisticas_bp
+    from app.routes.exportacao import exportacao_bp
+    from app.routes.eventos import eventos_bp
     from app.routes.admin import admin_bp
     from app.routes.dp import dp_bp
     from app.routes.trafego import trafego_bp
@@ -20,9 +37,78 @@ def create_app():
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(relatorios_bp)
+    app.register_blueprint(estatisticas_bp)
+    app.register_blueprint(exportacao_bp)
+    app.register_blueprint(eventos_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(dp_bp)
     app.register_blueprint(trafego_bp)
     app.register_blueprint(backup_bp)
     
+    registrar_log_requisicoes(app)
+    registrar_handlers_erro(app)
+    registrar_agendamento_backup(app)
+    
     return app
+
+def registrar_agendamento_backup(app):
+    """
+    Inicia o agendamento de backups na primeira requisição, e não ao criar a
+    aplicação: o boot do worker, os testes e os scripts não criam o
+    BackupManager nem a thread. Desligado com BACKUP_AUTOMATICO=false.
+    """
+    if not app.config['BACKUP_AUTOMATICO']:
+        return
+
+    @app.before_request
+    def iniciar_agendamento_backup():
+        if not app.testing:
+            from app.services.backup_service import get_backup_manager
+            get_backup_manager().start_scheduler()
+
+def registrar_log_requisicoes(app):
+    """
+    Log de requisições: uma amostra (LOG_REQUESTS_AMOSTRA) vai para INFO,
+    erros e requisições lentas sempre para WARNING e o restante para DEBUG.
+
+    Usa apenas cabeçalhos e Content-Length: o corpo nunca é lido aqui, e
+    informações do corpo (ex.: número de fotos) são registradas pelas rotas.
+    """
+    @app.before_request
+    def log_request_info():
+        g.inicio_requisicao = time.perf_counter()
+
+    @app.after_request
+    def log_response_info(response):
+        inicio = g.get('inicio_requisicao')
+        duracao_ms = (time.perf_counter() - inicio) * 1000 if inicio else 0
+
+        if response.status_code >= 500 or duracao_ms >= Config.LOG_REQUESTS_LENTAS_MS:
+            nivel = logging.WARNING
+        elif random.random() < Config.LOG_REQUESTS_AMOSTRA and not request.path.startswith('/static/'):
+            nivel = logging.INFO
+        else:
+            nivel = logging.DEBUG
+
+        if logger.isEnabledFor(nivel):
+            logger.log(
+                nivel,
+                f'{request.method} {request.path} {response.status_code} '
+                f'{duracao_ms:.0f}ms entrada={request.content_length or 0}B'
+            )
+        return response
+
+def registrar_handlers_erro(app):
+    """Respostas JSON para os erros HTTP mais comuns"""
+    @app.errorhandler(500)
+    def internal_error(error):
+        logger.error(f"Erro interno do servidor: {error}")
+        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({'success': False, 'message': 'Recurso não encontrado'}), 404
+
+    @app.errorhandler(400)
+    def bad_request(error):
+        return jsonify({'success': False, 'message': 'Requisição inválida'}), 400
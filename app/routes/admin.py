@@ -1,8 +1,9 @@
 """
 Rotas de administração
 """
-from flask import Blueprint, render_template, request, jsonify
-from app.services.auth_service import require_login, require_admin
+from flask import Blueprint, render_template, request, jsonify, session
+from app.services.supabase_service import invalidar_cache_referencia
+from app.services.auth_service import require_login
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,8 +11,21 @@ logger = logging.getLogger(__name__)
 admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/admin')
-@require_login
 def admin():
-    """Página de administração"""
+    if 'user' not in session or session['user'].get('setor') != 'admin':
+        return render_template('login.html')
     return render_template('admin.html')
 
+@admin_bp.route('/api/cache/invalidar', methods=['POST'])
+@require_login
+def invalidar_cache():
+    """Invalida o cache das tabelas de referência (após alterar tipos/porteiros)"""
+    if session['user'].get('setor') != 'admin':
+        return jsonify({'success': False, 'message': 'Apenas administradores podem invalidar o cache'}), 403
+
+    tabela = request.json.get('tabela') if request.is_json and request.json else None
+    if tabela not in (None, 'tipos_relatorio', 'porteiros'):
+        return jsonify({'success': False, 'message': f'Tabela inválida: {tabela}'}), 400
+
+    invalidar_cache_referencia(tabela)
+    return jsonify({'success': True, 'message': 'Cache invalidado com sucesso'})
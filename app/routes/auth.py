@@ -1,10 +1,10 @@
 """
 Rotas de autenticação
 """
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, session
 from app.services.supabase_service import supabase_service
-from app.services.auth_service import require_login
 import logging
+import traceback
 
 logger = logging.getLogger(__name__)
 
@@ -12,65 +12,69 @@ auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/')
 def index():
-    """Página inicial - redireciona para login"""
-    if 'user' in session:
-        user = session['user']
-        if user.get('tipo') == 'ADMIN':
-            return redirect(url_for('admin.admin'))
-        elif user.get('tipo') == 'DP':
-            return redirect(url_for('dp.dp'))
-        elif user.get('tipo') == 'TRAFEGO':
-            return redirect(url_for('trafego.trafego'))
+    if 'user' in session and session['user'].get('setor') == 'porteiro':
+        return render_template('index.html')
     return render_template('login.html')
 
 @auth_bp.route('/api/check-auth')
 def check_auth():
-    """Verifica se o usuário está autenticado"""
     if 'user' in session:
-        return jsonify({'authenticated': True, 'user': session['user']})
-    return jsonify({'authenticated': False})
+        return jsonify({'success': True, 'user': session['user']})
+    else:
+        return jsonify({'success': False, 'message': 'Não autenticado'}), 401
 
 @auth_bp.route('/api/login', methods=['POST'])
 def login():
-    """Endpoint de login"""
     try:
-        data = request.get_json()
-        username = data.get('username')
-        password = data.get('password')
-        
-        if not username or not password:
-            return jsonify({'success': False, 'message': 'Username e password são obrigatórios'}), 400
-        
-        # Buscar usuário no Supabase
-        response = supabase_service.get_table('administradores').select('*').eq('username', username).execute()
-        
-        if not response.data:
-            return jsonify({'success': False, 'message': 'Usuário não encontrado'}), 401
-        
-        user = response.data[0]
-        
-        # Verificar senha (em produção, usar hash)
-        if user['password'] != password:
-            return jsonify({'success': False, 'message': 'Senha incorreta'}), 401
-        
-        # Armazenar na sessão
-        session['user'] = {
-            'id': user['id'],
-            'username': user['username'],
-            'nome': user['nome'],
-            'tipo': user['tipo']
-        }
-        
-        logger.info(f"Usuário {username} logado com sucesso")
-        return jsonify({'success': True, 'message': 'Login realizado com sucesso'})
-        
+        data = request.json
+        if not data or 'codigo' not in data or 'setor' not in data:
+            return jsonify(
+                {'success': False, 'message': 'Código e setor não fornecidos'}
+            ), 400
+
+        codigo = data.get('codigo')
+        setor = data.get('setor')
+
+        # Verificar se o usuário existe no setor correto
+        if setor == 'porteiro':
+            response = supabase_service.get_table('porteiros').select('*').eq(
+                'codigo_acesso', codigo).eq('ativo', True).execute()
+        elif setor == 'admin':
+            response = supabase_service.get_table('administradores').select('*').eq(
+                'codigo_acesso', codigo).eq('ativo', True).execute()
+        elif setor == 'dp':
+            response = supabase_service.get_table('dp_users').select('*').eq(
+                'codigo_acesso', codigo).eq('ativo', True).execute()
+        elif setor == 'trafego':
+            response = supabase_service.get_table('trafego_users').select('*').eq(
+                'codigo_acesso', codigo).eq('ativo', True).execute()
+        else:
+            return jsonify(
+                {'success': False, 'message': 'Setor inválido'}
+            ), 400
+
+        if response.data:
+            user_data = response.data[0]
+            user_data['setor'] = setor
+            session['user'] = user_data
+            log_msg = f"Login bem-sucedido para usuário ID: {user_data['id']}"
+            logger.info(log_msg)
+            return jsonify({'success': True, 'user': user_data})
+        else:
+            logger.warning(f"Tentativa de login com código inválido: {codigo}")
+            return jsonify(
+                {'success': False, 'message': 'Código de acesso inválido'}
+            )
     except Exception as e:
-        logger.error(f"Erro no login: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+        logger.error(f"Erro no login: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro interno no servidor'}
+        ), 500
 
 @auth_bp.route('/api/logout', methods=['POST'])
 def logout():
-    """Endpoint de logout"""
-    session.clear()
-    return jsonify({'success': True, 'message': 'Logout realizado com sucesso'})
-
+    session.pop('user', None)
+    return jsonify(
+        {'success': True, 'message': 'Logout realizado com sucesso'}
+    )
@@ -1,11 +1,13 @@
 """
 Rotas de backup
 """
-from flask import Blueprint, request, jsonify, send_file
-from app.services.auth_service import require_login, require_admin
-from app.services.backup_service import create_backup, get_backup_status, list_backups
+from flask import Blueprint, request, jsonify, session, send_file, current_app
+from app.services.auth_service import require_login
+from app.services.backup_service import create_backup, get_backup_status, list_backups, get_backup_manager
+from app.services.export_service import enviar_e_remover
 import logging
 import os
+import tempfile
 
 logger = logging.getLogger(__name__)
 
@@ -14,59 +16,107 @@ backup_bp = Blueprint('backup', __name__)
 @backup_bp.route('/api/backup/criar', methods=['POST'])
 @require_login
 def criar_backup():
-    """Cria backup do sistema"""
+    """Cria um novo backup manual"""
     try:
-        backup_info = create_backup()
-        return jsonify({'success': True, 'message': 'Backup criado com sucesso', 'backup': backup_info})
+        if session['user'].get('setor') != 'admin':
+            return jsonify({'success': False, 'message': 'Apenas administradores podem criar backups'}), 403
+        
+        backup_type = request.json.get('tipo', 'manual') if request.json else 'manual'
+        result = create_backup(backup_type)
+        
+        if result['status'] == 'completed':
+            return jsonify({
+                'success': True, 
+                'message': f'Backup criado com sucesso: {result["name"]}',
+                'backup': result
+            })
+        else:
+            return jsonify({
+                'success': False, 
+                'message': f'Erro ao criar backup: {result.get("error", "Erro desconhecido")}',
+                'backup': result
+            }), 500
+            
     except Exception as e:
-        logger.error(f"Erro ao criar backup: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro ao criar backup'}), 500
+        logger.error(f"Erro ao criar backup: {e}")
+        return jsonify({'success': False, 'message': f'Erro interno: {str(e)}'}), 500
 
 @backup_bp.route('/api/backup/status')
 @require_login
 def status_backup():
-    """Verifica status do backup"""
+    """Retorna status dos backups"""
     try:
+        if session['user'].get('setor') != 'admin':
+            return jsonify({'success': False, 'message': 'Apenas administradores podem acessar status dos backups'}), 403
+        
         status = get_backup_status()
         return jsonify({'success': True, 'status': status})
+        
     except Exception as e:
-        logger.error(f"Erro ao verificar status do backup: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro ao verificar status'}), 500
+        logger.error(f"Erro ao obter status dos backups: {e}")
+        return jsonify({'success': False, 'message': f'Erro interno: {str(e)}'}), 500
 
 @backup_bp.route('/api/backup/listar')
 @require_login
 def listar_backups():
-    """Lista backups disponíveis"""
+    """Lista todos os backups existentes"""
     try:
+        if session['user'].get('setor') != 'admin':
+            return jsonify({'success': False, 'message': 'Apenas administradores podem listar backups'}), 403
+        
         backups = list_backups()
         return jsonify({'success': True, 'backups': backups})
+        
     except Exception as e:
-        logger.error(f"Erro ao listar backups: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro ao listar backups'}), 500
+        logger.error(f"Erro ao listar backups: {e}")
+        return jsonify({'success': False, 'message': f'Erro interno: {str(e)}'}), 500
 
 @backup_bp.route('/api/backup/download/<int:backup_id>')
 @require_login
 def download_backup(backup_id):
-    """Download de backup"""
+    """Download de um backup específico"""
     try:
+        if session['user'].get('setor') != 'admin':
+            return jsonify({'success': False, 'message': 'Apenas administradores podem baixar backups'}), 403
+        
         backups = list_backups()
         backup = next((b for b in backups if b['id'] == backup_id), None)
         
         if not backup:
             return jsonify({'success': False, 'message': 'Backup não encontrado'}), 404
         
-        file_path = backup['file_path']
-        if not os.path.exists(file_path):
+        if backup['status'] != 'completed':
+            return jsonify({'success': False, 'message': 'Backup não está completo'}), 400
+        
+        if backup.get('mode') == 'incremental':
+            # O ZIP é montado a partir do manifesto e removido após o envio
+            fd, caminho = tempfile.mkstemp(suffix='.zip')
+            os.close(fd)
+            try:
+                get_backup_manager().write_zip(backup, caminho)
+            except Exception:
+                os.remove(caminho)
+                raise
+            return current_app.response_class(
+                enviar_e_remover(caminho),
+                mimetype='application/zip',
+                headers={
+                    'Content-Disposition': f'attachment; filename={backup["name"]}.zip',
+                    'Content-Length': str(os.path.getsize(caminho))
+                }
+            )
+        
+        zip_path = backup['zip_path']
+        if not os.path.exists(zip_path):
             return jsonify({'success': False, 'message': 'Arquivo de backup não encontrado'}), 404
         
         return send_file(
-            file_path,
-            as_attachment=True,
+            zip_path, 
+            as_attachment=True, 
             download_name=f"{backup['name']}.zip",
             mimetype='application/zip'
         )
         
     except Exception as e:
-        logger.error(f"Erro ao fazer download do backup: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro ao fazer download'}), 500
-
+        logger.error(f"Erro ao baixar backup {backup_id}: {e}")
+        return jsonify({'success': False, 'message': f'Erro interno: {str(e)}'}), 500
@@ -1,8 +1,7 @@
 """
 Rotas do Departamento Pessoal
 """
-from flask import Blueprint, render_template, request, jsonify
-from app.services.auth_service import require_login, require_dp_user
+from flask import Blueprint, render_template, session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,8 +9,7 @@ logger = logging.getLogger(__name__)
 dp_bp = Blueprint('dp', __name__)
 
 @dp_bp.route('/dp')
-@require_login
 def dp():
-    """Página do Departamento Pessoal"""
+    if 'user' not in session or session['user'].get('setor') != 'dp':
+        return render_template('login.html')
     return render_template('dp.html')
-
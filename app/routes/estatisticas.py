@@ -0,0 +1,77 @@
+"""
+Rotas de estatísticas
+"""
+from flask import Blueprint, request, jsonify, session
+from app.services.supabase_service import supabase_service
+from app.services.auth_service import require_login
+from app.services.estatisticas_service import contar_por_status
+from app.services.relatorio_service import filtrar_dados_localmente, intervalo_datas, obter_filtros
+import logging
+import traceback
+
+logger = logging.getLogger(__name__)
+
+estatisticas_bp = Blueprint('estatisticas', __name__)
+
+@estatisticas_bp.route('/api/estatisticas')
+@require_login
+def get_estatisticas():
+    try:
+        filtros = obter_filtros(request.args)
+        filtro_local = filtrar_dados_localmente(filtros)
+
+        try:
+            intervalo_datas(filtros)
+        except ValueError:
+            return jsonify(
+                {'success': False, 'message': 'Formato de data inválido'}
+            ), 400
+
+        contagem = contar_por_status(filtros, filtro_local)
+
+        estatisticas_status = {
+            'PENDENTE': 0,
+            'EM_DP': 0,
+            'EM_TRAFEGO': 0,
+            'COBRADO': 0
+        }
+        for status, quantidade in contagem.items():
+            estatisticas_status[status] = (
+                estatisticas_status.get(status, 0) + quantidade
+            )
+
+        # O total respeita o filtro de status; a contagem por status não
+        if filtros.get('status'):
+            total = contagem.get(filtros['status'], 0)
+        else:
+            total = sum(contagem.values())
+
+        return jsonify({
+            'total': total,
+            'por_status': estatisticas_status
+        })
+    except Exception as e:
+        logger.error(f"Erro ao buscar estatísticas: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao buscar estatísticas'}
+        ), 500
+
+@estatisticas_bp.route('/api/estatisticas/reconstruir', methods=['POST'])
+@require_login
+def reconstruir_estatisticas():
+    """Recalcula os contadores de estatísticas a partir de relatorios"""
+    if session['user'].get('setor') != 'admin':
+        return jsonify({'success': False, 'message': 'Apenas administradores podem reconstruir as estatísticas'}), 403
+
+    try:
+        response = supabase_service.client.rpc('reconstruir_relatorios_contadores', {}).execute()
+        logger.info(f"Contadores de estatísticas reconstruídos: {response.data} combinações")
+        return jsonify({
+            'success': True,
+            'message': 'Estatísticas reconstruídas com sucesso',
+            'combinacoes': response.data
+        })
+    except Exception as e:
+        logger.error(f"Erro ao reconstruir estatísticas: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao reconstruir estatísticas'}), 500
@@ -0,0 +1,50 @@
+"""
+Rotas de eventos em tempo real (Server-Sent Events)
+"""
+from flask import Blueprint, request, Response, stream_with_context
+from app.services.auth_service import require_login
+from app.services.eventos_service import EVENTO_RESYNC, formatar_evento_sse, get_event_broker
+from config.settings import Config
+import logging
+import queue
+
+logger = logging.getLogger(__name__)
+
+eventos_bp = Blueprint('eventos', __name__)
+
+# Intervalo dos comentários de keep-alive nas conexões SSE, em segundos
+EVENTOS_KEEPALIVE = Config.EVENTOS_KEEPALIVE
+
+@eventos_bp.route('/api/eventos')
+@require_login
+def stream_eventos():
+    """
+    Canal Server-Sent Events com relatorio_criado e status_alterado.
+    O evento resync é sempre enviado, qualquer que seja o filtro de tipos.
+
+    Uma conexão ociosa não consulta o banco: a thread fica bloqueada na fila
+    do broker e só acorda com um evento ou com o keep-alive.
+    """
+    tipos = set(filter(None, request.args.get('tipos', '').split(',')))
+    event_broker = get_event_broker()
+    fila = event_broker.subscribe()
+
+    def gerar():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    evento = fila.get(timeout=EVENTOS_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if not tipos or evento['tipo'] in tipos or evento['tipo'] == EVENTO_RESYNC:
+                    yield formatar_evento_sse(evento)
+        finally:
+            event_broker.unsubscribe(fila)
+
+    return Response(
+        stream_with_context(gerar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,238 @@
+"""
+Rotas de exportação de relatórios
+"""
+from flask import Blueprint, request, jsonify, session, send_file, stream_template, current_app
+from app.services.auth_service import require_login
+from app.services.export_service import (
+    FORMATOS_EXPORTACAO, acompanhar_progresso, contar_relatorios_exportacao, enviar_e_remover,
+    gerar_csv, gerar_xlsx, get_export_manager, iterar_relatorios_exportacao,
+    nome_arquivo_exportacao, registrar_exportacao
+)
+from app.services.relatorio_service import intervalo_datas, obter_filtros
+from datetime import datetime
+import logging
+import os
+import tempfile
+import traceback
+
+logger = logging.getLogger(__name__)
+
+exportacao_bp = Blueprint('exportacao', __name__)
+
+# Setores que exportam relatórios em CSV/XLSX e por jobs em segundo plano
+SETORES_EXPORTACAO = ('admin', 'dp', 'trafego')
+
+@exportacao_bp.route('/api/exportar/html')
+@require_login
+def exportar_html():
+    try:
+        filtros = obter_filtros(request.args)
+
+        try:
+            intervalo_datas(filtros)
+        except ValueError:
+            return jsonify(
+                {'success': False, 'message': 'Formato de data inválido'}
+            ), 400
+
+        # O HTML é renderizado em partes conforme as páginas chegam do
+        # Supabase: o navegador recebe os primeiros bytes imediatamente e a
+        # memória do worker não cresce com o tamanho da exportação
+        logger.info("Iniciando exportação HTML em streaming")
+        conteudo = stream_template(
+            'export_template.html',
+            relatorios=registrar_exportacao(
+                iterar_relatorios_exportacao(filtros), 'HTML'
+            ),
+            data_exportacao=datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        )
+        return current_app.response_class(conteudo, mimetype='text/html')
+    except Exception as e:
+        logger.error(f"Erro ao exportar relatórios: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': f'Erro ao exportar relatórios: {str(e)}'}
+        ), 500
+
+@exportacao_bp.route('/api/exportar/csv')
+@require_login
+def exportar_csv():
+    if session['user'].get('setor') not in SETORES_EXPORTACAO:
+        return jsonify({'success': False, 'message': 'Setor sem permissão para exportar relatórios'}), 403
+
+    try:
+        filtros = obter_filtros(request.args)
+
+        try:
+            intervalo_datas(filtros)
+        except ValueError:
+            return jsonify(
+                {'success': False, 'message': 'Formato de data inválido'}
+            ), 400
+
+        logger.info("Iniciando exportação CSV em streaming")
+        conteudo = gerar_csv(registrar_exportacao(
+            iterar_relatorios_exportacao(filtros), 'CSV'
+        ))
+        return current_app.response_class(
+            conteudo,
+            mimetype='text/csv; charset=utf-8',
+            headers={
+                'Content-Disposition': f'attachment; filename={nome_arquivo_exportacao("csv")}'
+            }
+        )
+    except Exception as e:
+        logger.error(f"Erro ao exportar relatórios: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': f'Erro ao exportar relatórios: {str(e)}'}
+        ), 500
+
+@exportacao_bp.route('/api/exportar/xlsx')
+@require_login
+def exportar_xlsx():
+    if session['user'].get('setor') not in SETORES_EXPORTACAO:
+        return jsonify({'success': False, 'message': 'Setor sem permissão para exportar relatórios'}), 403
+
+    try:
+        filtros = obter_filtros(request.args)
+
+        try:
+            intervalo_datas(filtros)
+        except ValueError:
+            return jsonify(
+                {'success': False, 'message': 'Formato de data inválido'}
+            ), 400
+
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            logger.error("openpyxl não instalado: exportação XLSX indisponível")
+            return jsonify(
+                {'success': False, 'message': 'Exportação XLSX indisponível no servidor'}
+            ), 501
+
+        # O arquivo XLSX é um ZIP e só pode ser enviado depois de fechado:
+        # as linhas vão para um arquivo temporário, não para a memória
+        descritor, caminho = tempfile.mkstemp(suffix='.xlsx')
+        os.close(descritor)
+        try:
+            gerar_xlsx(registrar_exportacao(
+                iterar_relatorios_exportacao(filtros), 'XLSX'
+            ), caminho)
+        except Exception:
+            os.remove(caminho)
+            raise
+
+        return current_app.response_class(
+            enviar_e_remover(caminho),
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers={
+                'Content-Disposition': f'attachment; filename={nome_arquivo_exportacao("xlsx")}',
+                'Content-Length': str(os.path.getsize(caminho))
+            }
+        )
+    except Exception as e:
+        logger.error(f"Erro ao exportar relatórios: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': f'Erro ao exportar relatórios: {str(e)}'}
+        ), 500
+
+@exportacao_bp.route('/api/exportar/jobs', methods=['POST'])
+@require_login
+def criar_job_exportacao():
+    """
+    Enfileira uma exportação (html, csv ou xlsx) para ser gerada em segundo
+    plano. Os filtros são os mesmos de /api/exportar/<formato>, no corpo JSON
+    ou na query string.
+    """
+    if session['user'].get('setor') not in SETORES_EXPORTACAO:
+        return jsonify({'success': False, 'message': 'Setor sem permissão para exportar relatórios'}), 403
+
+    try:
+        parametros = request.get_json(silent=True) or request.args
+        formato = (parametros.get('formato') or '').lower()
+        if formato not in FORMATOS_EXPORTACAO:
+            return jsonify(
+                {'success': False, 'message': f'Formato de exportação inválido: {formato}'}
+            ), 400
+
+        filtros = obter_filtros(parametros)
+        try:
+            intervalo_datas(filtros)
+        except ValueError:
+            return jsonify(
+                {'success': False, 'message': 'Formato de data inválido'}
+            ), 400
+
+        if formato == 'xlsx':
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                logger.error("openpyxl não instalado: exportação XLSX indisponível")
+                return jsonify(
+                    {'success': False, 'message': 'Exportação XLSX indisponível no servidor'}
+                ), 501
+
+        escrever, _ = FORMATOS_EXPORTACAO[formato]
+        # O job roda fora da requisição: o template HTML precisa da aplicação
+        aplicacao = current_app._get_current_object()
+
+        def gerar(caminho, progresso):
+            with aplicacao.app_context():
+                escrever(acompanhar_progresso(
+                    iterar_relatorios_exportacao(filtros), progresso
+                ), caminho)
+
+        job = get_export_manager().submit(
+            formato, formato, gerar, total=contar_relatorios_exportacao(filtros)
+        )
+        return jsonify({
+            'success': True,
+            'job': job,
+            'status_url': f"/api/exportar/jobs/{job['id']}",
+            'download_url': f"/api/exportar/jobs/{job['id']}/download"
+        }), 202
+    except Exception as e:
+        logger.error(f"Erro ao criar exportação: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': f'Erro ao criar exportação: {str(e)}'}
+        ), 500
+
+@exportacao_bp.route('/api/exportar/jobs/<job_id>', methods=['GET'])
+@require_login
+def status_job_exportacao(job_id):
+    """Retorna o estado e o progresso de uma exportação"""
+    if session['user'].get('setor') not in SETORES_EXPORTACAO:
+        return jsonify({'success': False, 'message': 'Setor sem permissão para exportar relatórios'}), 403
+
+    job = get_export_manager().get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Exportação não encontrada'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@exportacao_bp.route('/api/exportar/jobs/<job_id>/download', methods=['GET'])
+@require_login
+def download_job_exportacao(job_id):
+    """Baixa o arquivo de uma exportação concluída"""
+    if session['user'].get('setor') not in SETORES_EXPORTACAO:
+        return jsonify({'success': False, 'message': 'Setor sem permissão para exportar relatórios'}), 403
+
+    export_manager = get_export_manager()
+    job = export_manager.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Exportação não encontrada'}), 404
+    if job['status'] != 'completed':
+        return jsonify(
+            {'success': False, 'message': 'Exportação ainda não concluída', 'job': job}
+        ), 409
+
+    _, mimetype = FORMATOS_EXPORTACAO[job['formato']]
+    return send_file(
+        os.path.abspath(export_manager.get_artifact(job)),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=nome_arquivo_exportacao(job['formato'])
+    )
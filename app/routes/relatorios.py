@@ -1,262 +1,636 @@
 """
 Rotas de relatórios
 """
-from flask import Blueprint, request, jsonify
-from app.services.supabase_service import supabase_service
-from app.services.auth_service import require_login, require_admin, require_dp_user, require_trafego_user
-from app.utils.security import sanitize_input
+from flask import Blueprint, request, jsonify, session
+from app.services.supabase_service import supabase_service, cache_referencia
+from app.services.auth_service import require_login
+from app.services.eventos_service import publicar_evento
+from app.services.foto_service import (
+    FORMATOS_FOTO, FOTOS_PROCESSANDO, FOTOS_ERRO, concluir_fotos_relatorio,
+    fotos_abandonadas, fotos_assincronas_executor, marcador_fotos_processando,
+    marcar_fotos_abandonadas, processar_fotos, urls_das_fotos
+)
+from app.services.relatorio_service import (
+    STATUS_VALIDOS, aplicar_cursor, aplicar_filtros, codificar_cursor,
+    dados_atualizacao_status, decodificar_cursor, enriquecer_relatorios,
+    filtrar_dados_localmente, filtrar_por_dados, gerar_numero_os, obter_filtros,
+    sincronizar_fila
+)
+from config.settings import Config
+from datetime import datetime, timezone
+import json
 import logging
+import os
+import tempfile
 import traceback
 
 logger = logging.getLogger(__name__)
 
 relatorios_bp = Blueprint('relatorios', __name__)
 
+# Setores que movimentam relatórios entre as filas
+SETORES_STATUS = ('admin', 'dp', 'trafego')
+
 @relatorios_bp.route('/api/tipos-relatorio')
 @require_login
 def get_tipos_relatorio():
-    """Busca tipos de relatório"""
     try:
-        response = supabase_service.get_table('tipos_relatorio').select('*').execute()
-        return jsonify({'success': True, 'data': response.data})
+        tipos = cache_referencia.get_or_load(
+            ('tipos_relatorio', '*'),
+            lambda: supabase_service.get_table('tipos_relatorio').select('*').execute().data
+        )
+        return jsonify(tipos)
     except Exception as e:
-        logger.error(f"Erro ao buscar tipos de relatório: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+        logger.error(f"Erro ao buscar tipos de relatório: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao buscar tipos de relatório'}
+        ), 500
 
 @relatorios_bp.route('/api/porteiros')
 @require_login
 def get_porteiros():
-    """Busca porteiros"""
     try:
-        response = supabase_service.get_table('porteiros').select('*').execute()
-        return jsonify({'success': True, 'data': response.data})
+        porteiros = cache_referencia.get_or_load(
+            ('porteiros', 'ativos'),
+            lambda: supabase_service.get_table('porteiros').select(
+                'id, nome, codigo_acesso').eq('ativo', True).execute().data
+        )
+        return jsonify(porteiros)
     except Exception as e:
-        logger.error(f"Erro ao buscar porteiros: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+        logger.error(f"Erro ao buscar porteiros: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao buscar porteiros'}
+        ), 500
+
+def listar_relatorios_por_cursor(query, posicao_cursor, per_page, filtros):
+    """
+    Paginação por keyset sobre (criado_em desc, id desc).
+
+    Cada página busca apenas per_page + 1 registros a partir do cursor, de
+    modo que o custo não cresce com a profundidade da página. O total
+    ('count') só é calculado na primeira página.
+    """
+    query = query.order('criado_em', desc=True).order('id', desc=True)
+    if posicao_cursor:
+        query = aplicar_cursor(query, *posicao_cursor)
+
+    if filtrar_dados_localmente(filtros):
+        response = query.execute()
+        relatorios = filtrar_por_dados(
+            response.data, filtros['matricula'], filtros['carro']
+        )
+        total_count = None if posicao_cursor else len(relatorios)
+        relatorios = relatorios[:per_page + 1]
+    else:
+        response = query.limit(per_page + 1).execute()
+        total_count = response.count
+        relatorios = response.data
+
+    pagina = relatorios[:per_page]
+    next_cursor = None
+    if len(relatorios) > per_page:
+        next_cursor = codificar_cursor(pagina[-1])
+
+    return jsonify({
+        'data': enriquecer_relatorios([relatorio.copy() for relatorio in pagina]),
+        'count': total_count,
+        'per_page': per_page,
+        'total_pages': (
+            (total_count + per_page - 1) // per_page
+            if total_count is not None else None
+        ),
+        'next_cursor': next_cursor
+    })
 
 @relatorios_bp.route('/api/relatorios', methods=['GET'])
 @require_login
 def get_relatorios():
-    """Busca relatórios com filtros"""
     try:
-        # Parâmetros de filtro
-        status = request.args.get('status')
-        tipo = request.args.get('tipo')
-        data_inicio = request.args.get('data_inicio')
-        data_fim = request.args.get('data_fim')
-        
-        # Construir query
-        query = supabase_service.get_table('relatorios').select('*')
-        
-        if status:
-            query = query.eq('status', status)
-        if tipo:
-            query = query.eq('tipo_ocorrencia', tipo)
-        if data_inicio:
-            query = query.gte('data_ocorrencia', data_inicio)
-        if data_fim:
-            query = query.lte('data_ocorrencia', data_fim)
-        
-        response = query.order('data_ocorrencia', desc=True).execute()
-        
-        return jsonify({'success': True, 'data': response.data})
+        logger.info("Recebida requisição para /api/relatorios")
         
+        filtros = obter_filtros(request.args)
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = max(int(request.args.get('per_page', 10)), 1)
+        # Paginação por cursor (opcional): 'cursor=' vazio pede a primeira página
+        usar_cursor = 'cursor' in request.args
+        cursor = request.args.get('cursor')
+
+        logger.info(f"Parámetros: page={page}, per_page={per_page}, cursor={usar_cursor}")
+
+        posicao_cursor = None
+        if cursor:
+            try:
+                posicao_cursor = decodificar_cursor(cursor)
+            except (ValueError, KeyError, TypeError):
+                return jsonify(
+                    {'success': False, 'message': 'Cursor inválido'}
+                ), 400
+
+        # Filtros de matrícula/carro vão para o banco quando a coluna de
+        # busca existe; senão são aplicados no Python após a query
+        filtro_local = filtrar_dados_localmente(filtros)
+
+        # Query básica primeiro (o total só é contado fora das páginas de cursor)
+        query = supabase_service.get_table('relatorios').select(
+            '*', count=None if posicao_cursor else 'exact'
+        )
+
+        try:
+            query = aplicar_filtros(query, filtros, busca_dados=not filtro_local)
+        except ValueError:
+            return jsonify(
+                {'success': False, 'message': 'Formato de data inválido'}
+            ), 400
+
+        if usar_cursor:
+            return listar_relatorios_por_cursor(
+                query, posicao_cursor, per_page, filtros
+            )
+
+        start = (page - 1) * per_page
+        end = start + per_page
+        query = query.order('criado_em', desc=True)
+
+        if filtro_local:
+            # Sem busca no servidor, os filtros de texto em 'dados' exigem a
+            # busca completa e a paginação é feita sobre o resultado filtrado
+            logger.info("Executando query no Supabase (filtro local em dados)...")
+            response = query.execute()
+            logger.info(
+                f"Query executada. {len(response.data)} registros encontrados"
+            )
+
+            relatorios_filtrados = filtrar_por_dados(
+                response.data, filtros['matricula'], filtros['carro']
+            )
+            total_count = len(relatorios_filtrados)
+            pagina = relatorios_filtrados[start:end]
+        else:
+            # Paginação no servidor: apenas a janela da página é buscada e
+            # o total vem do cabeçalho de contagem (count='exact')
+            logger.info("Executando query paginada no Supabase...")
+            response = query.range(start, end).execute()
+            total_count = response.count or 0
+            pagina = response.data
+            logger.info(
+                f"Query executada. {len(pagina)} de {total_count} registros"
+            )
+
+        # Enriquecer apenas os registros da página
+        paginated_data = enriquecer_relatorios(
+            [relatorio.copy() for relatorio in pagina]
+        )
+
+        return jsonify({
+            'data': paginated_data,
+            'count': total_count,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': (total_count + per_page - 1) // per_page
+        })
     except Exception as e:
         logger.error(f"Erro ao buscar relatórios: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': f'Erro ao buscar relatórios: {str(e)}'}
+        ), 500
+
+@relatorios_bp.route('/api/relatorios/delta')
+@require_login
+def get_relatorios_delta():
+    """
+    Alterações de uma fila (status) desde a marca d'água 'since'.
+
+    Sem 'since' (ou quando o delta não é possível) retorna a fila inteira
+    com completo=true; o navegador substitui a lista. Caso contrário retorna
+    apenas os relatórios alterados e os ids removidos da fila.
+    """
+    try:
+        status = request.args.get('status')
+        if status not in STATUS_VALIDOS:
+            return jsonify({'success': False, 'message': 'Status inválido'}), 400
+
+        desde = None
+        since = request.args.get('since')
+        if since:
+            try:
+                desde = datetime.fromisoformat(since.replace('Z', '+00:00'))
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Parâmetro since inválido'}), 400
+            if desde.tzinfo is None:
+                desde = desde.replace(tzinfo=timezone.utc)
+
+        # A marca d'água é tomada antes das consultas: nada alterado durante
+        # elas fica de fora da próxima sincronização
+        watermark = datetime.now(timezone.utc).isoformat()
+
+        relatorios, removidos, completo = sincronizar_fila(status, desde)
+
+        return jsonify({
+            'success': True,
+            'completo': completo,
+            'data': enriquecer_relatorios([r.copy() for r in relatorios]),
+            'removidos': removidos,
+            'watermark': watermark
+        })
+    except Exception as e:
+        logger.error(f"Erro ao sincronizar fila: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao sincronizar fila'}
+        ), 500
 
 @relatorios_bp.route('/api/relatorios/numero/<numero_os>')
 @require_login
-def get_relatorio_by_numero(numero_os):
-    """Busca relatório por número da OS"""
+def get_relatorio_por_numero(numero_os):
+    """Busca relatório por número de OS"""
     try:
         response = supabase_service.get_table('relatorios').select('*').eq('numero_os', numero_os).execute()
-        
-        if not response.data:
-            return jsonify({'success': False, 'message': 'Relatório não encontrado'}), 404
-        
-        return jsonify({'success': True, 'data': response.data[0]})
-        
+
+        if response.data:
+            relatorio = response.data[0]
+            
+            # Enriquecer dados
+            enriquecer_relatorios([relatorio])
+
+            return jsonify(relatorio)
+        else:
+            return jsonify({'error': 'Relatório não encontrado'}), 404
+            
     except Exception as e:
-        logger.error(f"Erro ao buscar relatório por número: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+        logger.error(f"Erro ao buscar relatório por número {numero_os}: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao buscar relatório'}
+        ), 500
 
 @relatorios_bp.route('/api/relatorios/<id>')
 @require_login
-def get_relatorio_by_id(id):
-    """Busca relatório por ID"""
+def get_relatorio(id):
     try:
+        logger.debug(f"Buscando relatório com ID: {id}")
         response = supabase_service.get_table('relatorios').select('*').eq('id', id).execute()
-        
+
+        if response.data:
+            relatorio = response.data[0]
+
+            # Enriquecer dados
+            enriquecer_relatorios([relatorio])
+
+            return jsonify(relatorio)
+        else:
+            logger.debug(f"Relatório não encontrado para ID: {id}")
+            return jsonify({'error': 'Relatório não encontrado'}), 404
+            
+    except Exception as e:
+        logger.error(f"Erro ao buscar relatório {id}: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao buscar relatório'}
+        ), 500
+
+@relatorios_bp.route('/api/relatorios/<id>/fotos', methods=['GET'])
+@require_login
+def status_fotos_relatorio(id):
+    """Situação das fotos de um relatório criado com fotos_assincronas"""
+    try:
+        response = supabase_service.get_table('relatorios').select('fotos').eq('id', id).execute()
         if not response.data:
             return jsonify({'success': False, 'message': 'Relatório não encontrado'}), 404
-        
-        return jsonify({'success': True, 'data': response.data[0]})
-        
+
+        fotos = response.data[0].get('fotos') or {}
+        if isinstance(fotos, str):
+            fotos = json.loads(fotos)
+
+        status = fotos.get('_status')
+        if status == FOTOS_PROCESSANDO and fotos_abandonadas(fotos):
+            marcar_fotos_abandonadas(id)
+            status = FOTOS_ERRO
+        if status == FOTOS_PROCESSANDO:
+            return jsonify({'success': True, 'status': 'processando', 'fotosUrls': []})
+        if status == FOTOS_ERRO:
+            return jsonify({'success': True, 'status': 'erro', 'fotosUrls': []})
+
+        return jsonify({
+            'success': True,
+            'status': 'concluido',
+            'fotosUrls': urls_das_fotos(fotos)
+        })
     except Exception as e:
-        logger.error(f"Erro ao buscar relatório por ID: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+        logger.error(f"Erro ao consultar fotos do relatório {id}: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao consultar fotos'}), 500
+
+def ler_relatorio_multipart():
+    """
+    Lê um relatório enviado como multipart/form-data.
+
+    Campos: tipo_id, dados (JSON), destinatario_whatsapp e os arquivos em
+    'fotos' (na ordem FOTO1..N), com o nome do campo do formulário de cada
+    foto em 'fotos_campo'. O Werkzeug mantém em disco os arquivos grandes e
+    cada foto é copiada em blocos para um arquivo temporário, enviado ao
+    Storage sem carregar a imagem inteira em memória.
+    """
+    dados = request.form.get('dados')
+    data = {
+        'tipo_id': request.form.get('tipo_id'),
+        'dados': json.loads(dados) if dados else {},
+        'destinatario_whatsapp': request.form.get('destinatario_whatsapp', ''),
+        'fotos_assincronas': request.form.get('fotos_assincronas') in ('1', 'true'),
+        'fotos': []
+    }
+    if data['tipo_id'] is None:
+        del data['tipo_id']
+    else:
+        data['tipo_id'] = int(data['tipo_id'])
+
+    campos = request.form.getlist('fotos_campo')
+    for i, arquivo in enumerate(request.files.getlist('fotos')):
+        formato = (arquivo.mimetype or '').split('/')[-1]
+        foto_data = {
+            'campoNome': campos[i] if i < len(campos) else '',
+            'fileName': arquivo.filename or '',
+            'formato': formato
+        }
+        if arquivo.mimetype.startswith('image/') and formato in FORMATOS_FOTO:
+            descritor, caminho = tempfile.mkstemp(suffix=f'.{formato}')
+            with os.fdopen(descritor, 'wb') as destino:
+                arquivo.save(destino)
+            foto_data['arquivo'] = caminho
+        else:
+            # Mantém a posição da foto para que FOTO1..N não se desloquem
+            logger.warning(f"Formato de imagem não suportado: {arquivo.mimetype}")
+        data['fotos'].append(foto_data)
+
+    return data
 
 @relatorios_bp.route('/api/relatorios', methods=['POST'])
 @require_login
 def criar_relatorio():
-    """Cria novo relatório"""
+    fotos_temporarias = []
     try:
-        data = request.get_json()
-        
-        # Validar dados obrigatórios
-        campos_obrigatorios = ['tipo_ocorrencia', 'descricao', 'local', 'data_ocorrencia', 'hora_ocorrencia']
-        for campo in campos_obrigatorios:
-            if not data.get(campo):
-                return jsonify({'success': False, 'message': f'Campo {campo} é obrigatório'}), 400
-        
-        # Sanitizar dados
-        dados_sanitizados = {}
-        for key, value in data.items():
-            if isinstance(value, str):
-                dados_sanitizados[key] = sanitize_input(value)
-            else:
-                dados_sanitizados[key] = value
-        
-        # Gerar número da OS
-        from app.services.relatorio_service import gerar_numero_os
-        numero_os = gerar_numero_os()
-        
-        # Preparar dados para inserção
+        if request.mimetype == 'multipart/form-data':
+            try:
+                data = ler_relatorio_multipart()
+            except ValueError:
+                return jsonify(
+                    {'success': False, 'message': 'Dados do formulário inválidos'}
+                ), 400
+            fotos_temporarias = [f['arquivo'] for f in data['fotos'] if f.get('arquivo')]
+        else:
+            data = request.json
+        if not data:
+            return jsonify(
+                {'success': False, 'message': 'Dados não fornecidos'}
+            ), 400
+
+        if data.get('fotos'):
+            logger.info(f'Recebidas {len(data["fotos"])} fotos')
+
+        # Validação básica
+        if 'tipo_id' not in data:
+            return jsonify({
+                'success': False,
+                'message': 'Campos obrigatórios não fornecidos'
+            }), 400
+
+        # Preparar dados do relatório
         relatorio_data = {
-            'numero_os': numero_os,
-            'tipo_ocorrencia': dados_sanitizados['tipo_ocorrencia'],
-            'descricao': dados_sanitizados['descricao'],
-            'local': dados_sanitizados['local'],
-            'data_ocorrencia': dados_sanitizados['data_ocorrencia'],
-            'hora_ocorrencia': dados_sanitizados['hora_ocorrencia'],
-            'status': 'EM_DP',
-            'dados': dados_sanitizados.get('dados', {}),
-            'motorista': dados_sanitizados.get('motorista', ''),
-            'porteiros_id': dados_sanitizados.get('porteiros_id')
+            'porteiro_id': session['user']['id'],
+            'tipo_id': data['tipo_id'],
+            'dados': data.get('dados', {}),
+            'destinatario_whatsapp': data.get('destinatario_whatsapp', ''),
+            'status': 'PENDENTE',
+            'criado_em': datetime.now().isoformat()
         }
+
+        # Sem bloco reservado o número é atribuído pelo trigger do banco
+        numero_os = gerar_numero_os()
+        if numero_os:
+            relatorio_data['numero_os'] = numero_os
+
+        # Processar fotos se existirem - FORMATO CORRETO
+        fotos_dict = {}
+        fotos_urls = []  # ✅ NOVO: Lista para retornar as URLs ao frontend
+        fotos_assincronas = bool(data.get('fotos') and data.get('fotos_assincronas'))
         
-        # Inserir no banco
+        if fotos_assincronas:
+            # O relatório é gravado antes das fotos, marcado como pendente
+            relatorio_data['fotos'] = marcador_fotos_processando()
+        elif 'fotos' in data and data['fotos']:
+            fotos_dict, fotos_urls = processar_fotos(data['fotos'])
+
+        if fotos_dict:
+            relatorio_data['fotos'] = fotos_dict
+            logger.debug(f"URLs das fotos para salvar: {fotos_dict}")
+
+        # Inserir no banco de dados
         response = supabase_service.get_table('relatorios').insert(relatorio_data).execute()
-        
+
         if response.data:
-            logger.info(f"Relatório criado com sucesso: {numero_os}")
-            return jsonify({'success': True, 'message': 'Relatório criado com sucesso', 'numero_os': numero_os})
+            log_msg = (
+                f"Relatório criado com sucesso: ID {response.data[0]['id']}"
+            )
+            logger.info(log_msg)
+            publicar_evento('relatorio_criado', {
+                'id': response.data[0]['id'],
+                'status': response.data[0].get('status'),
+                'numero_os': response.data[0].get('numero_os')
+            })
+            
+            if fotos_assincronas:
+                relatorio_id = response.data[0]['id']
+                fotos_assincronas_executor.submit(
+                    concluir_fotos_relatorio, relatorio_id, data['fotos'], fotos_temporarias
+                )
+                # Os arquivos temporários passam a ser removidos pela tarefa
+                fotos_temporarias = []
+                return jsonify({
+                    'success': True,
+                    'id': relatorio_id,
+                    'numero_os': response.data[0].get('numero_os'),
+                    'fotos_pendentes': True,
+                    'fotos_status_url': f"/api/relatorios/{relatorio_id}/fotos",
+                    'fotosUrls': [],
+                    'message': 'Relatório criado com sucesso; fotos em processamento'
+                })
+            
+            # ✅ NOVO: Retornar as URLs das fotos no formato esperado pelo frontend
+            return jsonify({
+                'success': True, 
+                'id': response.data[0]['id'],
+                'fotos_salvas': len(fotos_urls),
+                'fotosUrls': fotos_urls,  # ✅ Isso é o que o frontend precisa
+                'message': 'Relatório criado com sucesso'
+            })
         else:
-            return jsonify({'success': False, 'message': 'Erro ao criar relatório'}), 500
+            logger.error("Erro ao criar relatório no banco de dados")
+            return jsonify(
+                {'success': False, 'message': 'Erro ao criar relatório'}
+            ), 500
             
     except Exception as e:
-        logger.error(f"Erro ao criar relatório: {str(e)}")
+        logger.error(f"Erro ao criar relatório: {e}")
         logger.error(traceback.format_exc())
-        return jsonify({'success': False, 'message': f'Erro interno do servidor: {str(e)}'}), 500
+        return jsonify({
+            'success': False,
+            'message': f'Erro interno ao criar relatório: {str(e)}'
+        }), 500
+    finally:
+        for caminho in fotos_temporarias:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+# Limite de relatórios por chamada de /api/relatorios/status
+MAX_RELATORIOS_LOTE = Config.MAX_RELATORIOS_LOTE
 
 @relatorios_bp.route('/api/relatorios/<id>/status', methods=['PUT'])
 @require_login
-def atualizar_status_relatorio(id):
-    """Atualiza status do relatório"""
+def atualizar_status(id):
+    if session['user'].get('setor') not in SETORES_STATUS:
+        return jsonify({'success': False, 'message': 'Setor sem permissão para alterar status'}), 403
+
     try:
-        data = request.get_json()
-        novo_status = data.get('status')
-        
-        if not novo_status:
-            return jsonify({'success': False, 'message': 'Status é obrigatório'}), 400
-        
-        # Validar status
-        status_validos = ['EM_DP', 'EM_TRAFEGO', 'CONCLUIDO']
-        if novo_status not in status_validos:
-            return jsonify({'success': False, 'message': 'Status inválido'}), 400
-        
-        # Atualizar status
-        response = supabase_service.get_table('relatorios').update({'status': novo_status}).eq('id', id).execute()
+        data = request.json
+        logger.info(f"Atualizando status do relatório {id} com dados: {data}")
         
+        if not data or 'status' not in data:
+            logger.error(f"Status não fornecido para relatório {id}")
+            return jsonify(
+                {'success': False, 'message': 'Status não fornecido'}
+            ), 400
+
+        novo_status = data.get('status')
+        logger.info(f"Novo status: {novo_status}")
+
+        try:
+            update_data = dados_atualizacao_status(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        logger.info(f"Executando update no Supabase com dados: {update_data}")
+        response = supabase_service.get_table('relatorios').update(
+            update_data).eq('id', id).execute()
+
+        logger.info(f"Resposta do Supabase: {response}")
+
         if response.data:
-            logger.info(f"Status do relatório {id} atualizado para {novo_status}")
-            return jsonify({'success': True, 'message': 'Status atualizado com sucesso'})
+            log_msg = f"Status do relatório {id} atualizado para {novo_status}"
+            logger.info(log_msg)
+            publicar_evento('status_alterado', {'ids': [id], 'status': novo_status})
+            return jsonify({'success': True})
         else:
-            return jsonify({'success': False, 'message': 'Relatório não encontrado'}), 404
-            
+            logger.error(f"Relatório {id} não encontrado para atualização")
+            return jsonify(
+                {'success': False, 'message': 'Relatório não encontrado'}
+            ), 404
     except Exception as e:
-        logger.error(f"Erro ao atualizar status: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+        logger.error(f"Erro ao atualizar status do relatório {id}: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao atualizar status'}
+        ), 500
 
-@relatorios_bp.route('/api/estatisticas')
+@relatorios_bp.route('/api/relatorios/status', methods=['PUT'])
 @require_login
-def get_estatisticas():
-    """Busca estatísticas dos relatórios"""
+def atualizar_status_em_lote():
+    """
+    Atualiza o status de vários relatórios em uma chamada.
+
+    Corpo: {"status": ..., "ids": [...]} e/ou {"relatorios": [{"id": ...,
+    "valor": ..., "motorista": ..., "documentos": ...}]}; cada item pode
+    sobrescrever o status geral. Itens com o mesmo update são agrupados em
+    um único UPDATE ... WHERE id IN (...). Retorna o resultado por id.
+    Um id repetido com dados diferentes retorna 400 sem atualizar nada.
+    """
+    if session['user'].get('setor') not in SETORES_STATUS:
+        return jsonify({'success': False, 'message': 'Setor sem permissão para alterar status'}), 403
+
     try:
-        # Buscar todos os relatórios
-        response = supabase_service.get_table('relatorios').select('*').execute()
-        relatorios = response.data
-        
-        # Calcular estatísticas
-        total = len(relatorios)
-        em_dp = len([r for r in relatorios if r['status'] == 'EM_DP'])
-        em_trafego = len([r for r in relatorios if r['status'] == 'EM_TRAFEGO'])
-        concluidos = len([r for r in relatorios if r['status'] == 'CONCLUIDO'])
-        
-        # Estatísticas por tipo
-        tipos = {}
-        for relatorio in relatorios:
-            tipo = relatorio.get('tipo_ocorrencia', 'Não especificado')
-            tipos[tipo] = tipos.get(tipo, 0) + 1
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'total': total,
-                'em_dp': em_dp,
-                'em_trafego': em_trafego,
-                'concluidos': concluidos,
-                'tipos': tipos
+        data = request.get_json(silent=True) or {}
+
+        itens = [{'id': id} for id in data.get('ids') or []]
+        itens += data.get('relatorios') or []
+
+        if not itens:
+            return jsonify({'success': False, 'message': 'Nenhum relatório informado'}), 400
+        if len(itens) > MAX_RELATORIOS_LOTE:
+            return jsonify({
+                'success': False,
+                'message': f'Máximo de {MAX_RELATORIOS_LOTE} relatórios por chamada'
+            }), 400
+
+        resultados = {}
+        grupos = {}
+        dados_por_id = {}
+        for item in itens:
+            if not isinstance(item, dict) or not item.get('id'):
+                return jsonify({'success': False, 'message': 'Item sem id'}), 400
+
+            id = str(item['id'])
+            dados = {
+                campo: valor for campo, valor in item.items() if campo != 'id'
             }
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao buscar estatísticas: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
+            dados.setdefault('status', data.get('status'))
+            if dados_por_id.setdefault(id, dados) != dados:
+                return jsonify({
+                    'success': False,
+                    'message': f'Relatório {id} informado mais de uma vez com dados diferentes'
+                }), 400
+            try:
+                update_data = dados_atualizacao_status(dados)
+            except ValueError as e:
+                resultados[id] = {'id': id, 'success': False, 'message': str(e)}
+                continue
+
+            chave = json.dumps(update_data, sort_keys=True, default=str)
+            grupo = grupos.setdefault(chave, (update_data, []))
+            if id not in grupo[1]:
+                grupo[1].append(id)
+
+        for update_data, ids in grupos.values():
+            try:
+                response = supabase_service.get_table('relatorios').update(
+                    update_data).in_('id', ids).execute()
+                atualizados = {str(r['id']) for r in response.data or []}
+            except Exception as e:
+                logger.error(f"Erro ao atualizar status de {len(ids)} relatórios: {e}")
+                for id in ids:
+                    resultados[id] = {
+                        'id': id, 'success': False, 'message': 'Erro ao atualizar status'
+                    }
+                continue
+
+            if atualizados:
+                publicar_evento('status_alterado', {
+                    'ids': sorted(atualizados), 'status': update_data['status']
+                })
+
+            for id in ids:
+                if id in atualizados:
+                    resultados[id] = {'id': id, 'success': True, 'status': update_data['status']}
+                else:
+                    resultados[id] = {
+                        'id': id, 'success': False, 'message': 'Relatório não encontrado'
+                    }
+
+        total_atualizados = sum(1 for r in resultados.values() if r['success'])
+        logger.info(
+            f"Status atualizado em lote: {total_atualizados}/{len(resultados)} "
+            f"relatórios em {len(grupos)} updates"
+        )
 
-@relatorios_bp.route('/api/exportar/html')
-@require_login
-def exportar_html():
-    """Exporta relatórios em HTML"""
-    try:
-        # Buscar relatórios
-        response = supabase_service.get_table('relatorios').select('*').order('data_ocorrencia', desc=True).execute()
-        relatorios = response.data
-        
-        # Processar dados para exportação
-        dados_exportacao = []
-        for relatorio in relatorios:
-            # Extrair nome do motorista dos dados
-            motorista_nome = relatorio.get('motorista', '')
-            if not motorista_nome and relatorio.get('dados'):
-                dados = relatorio['dados']
-                if isinstance(dados, str):
-                    # Tentar extrair motorista de string JSON
-                    import re
-                    match = re.search(r'"motorista":\s*"([^"]+)"', dados)
-                    if match:
-                        motorista_nome = match.group(1)
-                elif isinstance(dados, dict):
-                    motorista_nome = dados.get('motorista', '')
-            
-            dados_exportacao.append({
-                'numero_os': relatorio['numero_os'],
-                'data': relatorio['data_ocorrencia'],
-                'hora': relatorio['hora_ocorrencia'],
-                'tipo': relatorio['tipo_ocorrencia'],
-                'descricao': relatorio['descricao'],
-                'local': relatorio['local'],
-                'motorista': motorista_nome,
-                'status': relatorio['status']
-            })
-        
         return jsonify({
-            'success': True,
-            'data': dados_exportacao
+            'success': total_atualizados == len(resultados),
+            'atualizados': total_atualizados,
+            'resultados': list(resultados.values())
         })
-        
     except Exception as e:
-        logger.error(f"Erro ao exportar HTML: {str(e)}")
-        return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
-
+        logger.error(f"Erro ao atualizar status em lote: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify(
+            {'success': False, 'message': 'Erro ao atualizar status'}
+        ), 500
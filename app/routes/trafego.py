@@ -1,8 +1,7 @@
 """
-Rotas de Tráfego
+Rotas do Tráfego
 """
-from flask import Blueprint, render_template, request, jsonify
-from app.services.auth_service import require_login, require_trafego_user
+from flask import Blueprint, render_template, session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,8 +9,7 @@ logger = logging.getLogger(__name__)
 trafego_bp = Blueprint('trafego', __name__)
 
 @trafego_bp.route('/trafego')
-@require_login
 def trafego():
-    """Página de Tráfego"""
+    if 'user' not in session or session['user'].get('setor') != 'trafego':
+        return render_template('login.html')
     return render_template('trafego.html')
-
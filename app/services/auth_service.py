@@ -24,7 +24,7 @@ def require_admin(f):
             return jsonify({'success': False, 'message': 'Não autenticado'}), 401
         
         user = session.get('user', {})
-        if user.get('tipo') != 'ADMIN':
+        if user.get('setor') != 'admin':
             return jsonify({'success': False, 'message': 'Acesso negado'}), 403
             
         return f(*args, **kwargs)
@@ -38,7 +38,7 @@ def require_dp_user(f):
             return jsonify({'success': False, 'message': 'Não autenticado'}), 401
         
         user = session.get('user', {})
-        if user.get('tipo') not in ['ADMIN', 'DP']:
+        if user.get('setor') not in ['admin', 'dp']:
             return jsonify({'success': False, 'message': 'Acesso negado'}), 403
             
         return f(*args, **kwargs)
@@ -52,7 +52,7 @@ def require_trafego_user(f):
             return jsonify({'success': False, 'message': 'Não autenticado'}), 401
         
         user = session.get('user', {})
-        if user.get('tipo') not in ['ADMIN', 'TRAFEGO']:
+        if user.get('setor') not in ['admin', 'trafego']:
             return jsonify({'success': False, 'message': 'Acesso negado'}), 403
             
         return f(*args, **kwargs)
@@ -1,7 +1,11 @@
 import os
 import json
+import gzip
+import hashlib
 import shutil
+import tempfile
 import zipfile
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import logging
@@ -9,19 +13,30 @@ import schedule
 import time
 import threading
 from pathlib import Path
+from config.settings import Config
 
 # Configurar logging para backup
 backup_logger = logging.getLogger('backup')
 backup_logger.setLevel(logging.INFO)
 
+# Modos de backup aceitos (ver BackupManager.backup_mode)
+BACKUP_MODOS = ('completo', 'incremental')
+
 class BackupManager:
     """Gerenciador de backup automático do sistema"""
     
-    def __init__(self, backup_dir: str = "backups", max_backups: int = 30):
+    def __init__(self, backup_dir: str = "backups", max_backups: int = 30,
+                 backup_mode: str = "completo"):
         self.backup_dir = Path(backup_dir)
         self.max_backups = max_backups
         self.backup_dir.mkdir(exist_ok=True)
         
+        # Modo padrão: 'completo' (ZIP com todos os arquivos) ou 'incremental'
+        # (conteúdo único em objects/ e um manifesto por backup em manifests/)
+        self.backup_mode = backup_mode
+        self.objects_dir = self.backup_dir / "objects"
+        self.manifests_dir = self.backup_dir / "manifests"
+        
         # Configurações de backup
         self.backup_config = {
             'database': True,
@@ -33,9 +48,19 @@ class BackupManager:
         # Histórico de backups
         self.backup_history_file = self.backup_dir / "backup_history.json"
         self.backup_history = self._load_backup_history()
+        self.history_lock_file = self.backup_dir / "historico.lock"
+        self._history_thread_lock = threading.Lock()
         
-        # Configurar backup automático
-        self._setup_automated_backup()
+        # Agendamento próprio (não o global do módulo schedule), iniciado
+        # explicitamente por start_scheduler() ou run_scheduler()
+        self._scheduler = schedule.Scheduler()
+        self._scheduler_thread = None
+        self._scheduler_lock = threading.Lock()
+        
+        # Liderança entre processos: só quem detém o lock executa os agendados
+        self.scheduler_lock_file = self.backup_dir / "agendamento.lock"
+        self._scheduler_lock_handle = None
+        self._is_leader = False
         
         backup_logger.info(f"Backup Manager inicializado. Diretório: {self.backup_dir}")
     
@@ -51,15 +76,54 @@ class BackupManager:
         return []
     
     def _save_backup_history(self):
-        """Salva histórico de backups"""
+        """Salva histórico de backups (arquivo temporário + rename, para leitores sem lock)"""
         try:
-            with open(self.backup_history_file, 'w', encoding='utf-8') as f:
+            temporary = self.backup_history_file.with_suffix('.json.tmp')
+            with open(temporary, 'w', encoding='utf-8') as f:
                 json.dump(self.backup_history, f, indent=2, ensure_ascii=False)
+            os.replace(temporary, self.backup_history_file)
         except Exception as e:
             backup_logger.error(f"Erro ao salvar histórico de backup: {e}")
     
-    def create_backup(self, backup_type: str = "manual") -> Dict[str, Any]:
-        """Cria um novo backup"""
+    @contextmanager
+    def _history_lock(self):
+        """
+        Lock exclusivo entre processos para ler, alterar e gravar o histórico
+        (incluindo a escolha do próximo ID). Usa fcntl.flock, como a eleição
+        do líder, mas em historico.lock: o líder mantém agendamento.lock
+        travado enquanto vive e um segundo flock nele nunca seria concedido.
+        Sem fcntl (Windows) vale só entre as threads do processo.
+        """
+        with self._history_thread_lock:
+            try:
+                import fcntl
+            except ImportError:
+                yield
+                return
+            
+            with open(self.history_lock_file, 'a') as arquivo:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    
+    def create_backup(self, backup_type: str = "manual", mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Cria um novo backup (`mode` sobrepõe o modo padrão do gerenciador).
+
+        Todo o backup roda sob _history_lock: o histórico é relido (outro
+        processo, como o líder do agendamento, pode tê-lo alterado), o ID é
+        escolhido e o histórico gravado sem que outro backup se intercale.
+        """
+        with self._history_lock():
+            self.backup_history = self._load_backup_history()
+            if (mode or self.backup_mode) == 'incremental':
+                return self._create_incremental_backup(backup_type)
+            return self._create_full_backup(backup_type)
+    
+    def _create_full_backup(self, backup_type: str) -> Dict[str, Any]:
+        """Backup completo: todos os arquivos em um ZIP"""
         timestamp = datetime.now()
         backup_name = f"backup_{timestamp.strftime('%Y%m%d_%H%M%S')}_{backup_type}"
         backup_path = self.backup_dir / backup_name
@@ -68,7 +132,7 @@ class BackupManager:
             backup_path.mkdir(exist_ok=True)
             
             backup_info = {
-                'id': len(self.backup_history) + 1,
+                'id': self._next_backup_id(),
                 'name': backup_name,
                 'type': backup_type,
                 'timestamp': timestamp.isoformat(),
@@ -129,6 +193,239 @@ class BackupManager:
             
             return backup_info
     
+    def _next_backup_id(self) -> int:
+        """Próximo ID livre (o histórico perde os mais antigos na limpeza)"""
+        return max((b['id'] for b in self.backup_history), default=0) + 1
+    
+    def _create_incremental_backup(self, backup_type: str) -> Dict[str, Any]:
+        """
+        Backup incremental: cada conteúdo distinto é guardado uma única vez,
+        comprimido com gzip, em objects/ pelo SHA-256 do conteúdo original, e
+        o backup em si é só o manifesto
+        (caminho -> hash). Arquivos com o mesmo tamanho e mtime registrados
+        no último manifesto não são relidos.
+        """
+        timestamp = datetime.now()
+        backup_id = self._next_backup_id()
+        backup_name = f"backup_{timestamp.strftime('%Y%m%d_%H%M%S')}_{backup_type}"
+        if (self.manifests_dir / f"{backup_name}.json").exists():
+            # Dois backups no mesmo segundo
+            backup_name = f"{backup_name}_{backup_id}"
+        manifest_path = self.manifests_dir / f"{backup_name}.json"
+        
+        backup_info = {
+            'id': backup_id,
+            'name': backup_name,
+            'type': backup_type,
+            'mode': 'incremental',
+            'timestamp': timestamp.isoformat(),
+            'status': 'in_progress',
+            'files': [],
+            'size': 0,
+            'error': None
+        }
+        
+        try:
+            self.manifests_dir.mkdir(exist_ok=True)
+            previous = self._last_manifest_entries()
+            entries = []
+            total_size = 0
+            new_objects = 0
+            
+            for arcname, source in self._collect_backup_files():
+                stat = source.stat()
+                known = previous.get(arcname)
+                unchanged = (
+                    known is not None
+                    and known['size'] == stat.st_size
+                    and known['mtime_ns'] == stat.st_mtime_ns
+                )
+                sha, written = self._store_object(source, known['sha256'] if unchanged else None)
+                
+                entries.append({
+                    'path': arcname,
+                    'sha256': sha,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns
+                })
+                backup_info['files'].append(arcname)
+                total_size += stat.st_size
+                backup_info['size'] += written
+                new_objects += 1 if written else 0
+            
+            backup_info['status'] = 'completed'
+            backup_info['manifest_path'] = str(manifest_path)
+            backup_info['total_size'] = total_size
+            backup_info['new_objects'] = new_objects
+            
+            # Manifesto gravado de forma atômica: só existe se estiver completo
+            temporary = manifest_path.with_suffix('.json.tmp')
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(dict(backup_info, files=entries), f, indent=2, ensure_ascii=False)
+            os.replace(temporary, manifest_path)
+            
+            self.backup_history.append(backup_info)
+            self._save_backup_history()
+            self._cleanup_old_backups()
+            
+            backup_logger.info(
+                f"Backup incremental criado: {backup_name} ({len(entries)} arquivos, "
+                f"{new_objects} novos, {backup_info['size']} bytes gravados)"
+            )
+            return backup_info
+            
+        except Exception as e:
+            backup_info['status'] = 'failed'
+            backup_info['error'] = str(e)
+            backup_logger.error(f"Erro ao criar backup {backup_name}: {e}")
+            
+            # Objetos já gravados ficam para a limpeza de não referenciados
+            manifest_path.with_suffix('.json.tmp').unlink(missing_ok=True)
+            return backup_info
+    
+    def _collect_backup_files(self) -> List[tuple]:
+        """
+        Arquivos de um backup como (caminho no backup, arquivo de origem),
+        com a mesma seleção e organização do backup completo
+        """
+        files = []
+        
+        if self.backup_config['database']:
+            schema_dir = Path("database/schema")
+            if schema_dir.exists():
+                files += [(f"database/{f.name}", f) for f in sorted(schema_dir.glob("*.sql"))]
+        
+        if self.backup_config['files']:
+            static_dir = Path("static")
+            if static_dir.exists():
+                files += [
+                    (f"static/{f.relative_to(static_dir).as_posix()}", f)
+                    for f in sorted(static_dir.rglob("*")) if f.is_file()
+                ]
+        
+        if self.backup_config['logs']:
+            files += [(f"logs/{f.name}", f) for f in sorted(Path(".").glob("*.log"))]
+        
+        if self.backup_config['config']:
+            files += [
+                (f"config/{name}", Path(name))
+                for name in ("requirements.txt", "env.example", ".gitignore")
+                if Path(name).exists()
+            ]
+        
+        return files
+    
+    def _object_path(self, sha: str) -> Path:
+        return self.objects_dir / sha[:2] / sha
+    
+    def _store_object(self, source: Path, sha: Optional[str] = None) -> tuple:
+        """
+        Guarda o conteúdo do arquivo (gzip) em objects/ se ele ainda não
+        existir. `sha` é o hash já conhecido de um arquivo inalterado.
+        Retorna (sha256, bytes gravados em disco).
+        """
+        if sha and self._object_path(sha).exists():
+            # Renova o mtime: protege o objeto de uma limpeza concorrente
+            os.utime(self._object_path(sha))
+            return sha, 0
+        
+        # Comprime para um temporário calculando o hash e só então publica
+        temp_dir = self.objects_dir / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        with open(source, 'rb') as origin, tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temporary:
+            with gzip.GzipFile(fileobj=temporary, mode='wb', mtime=0) as compressed:
+                for block in iter(lambda: origin.read(1024 * 1024), b''):
+                    digest.update(block)
+                    compressed.write(block)
+        
+        sha = digest.hexdigest()
+        size = os.path.getsize(temporary.name)
+        destination = self._object_path(sha)
+        if destination.exists():
+            os.remove(temporary.name)
+            os.utime(destination)
+            return sha, 0
+        
+        destination.parent.mkdir(exist_ok=True)
+        os.replace(temporary.name, destination)
+        return sha, size
+    
+    def _load_manifest(self, backup: Dict[str, Any]) -> Dict[str, Any]:
+        with open(backup['manifest_path'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _last_manifest_entries(self) -> Dict[str, Dict[str, Any]]:
+        """Entradas do último backup incremental concluído, por caminho"""
+        for backup in reversed(self.backup_history):
+            if backup.get('mode') == 'incremental' and backup['status'] == 'completed':
+                try:
+                    return {e['path']: e for e in self._load_manifest(backup)['files']}
+                except (OSError, ValueError, KeyError) as e:
+                    backup_logger.warning(f"Manifesto de {backup['name']} ilegível: {e}")
+        return {}
+    
+    def _remove_unreferenced_objects(self, grace_seconds: int = 3600) -> int:
+        """
+        Remove de objects/ o conteúdo que nenhum manifesto referencia.
+        Objetos tocados há menos de `grace_seconds` são mantidos: podem
+        pertencer a um backup ainda em andamento em outro processo.
+        """
+        if not self.objects_dir.exists():
+            return 0
+        
+        referenced = set()
+        for manifest_file in self.manifests_dir.glob("*.json"):
+            try:
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    referenced.update(e['sha256'] for e in json.load(f)['files'])
+            except (OSError, ValueError, KeyError) as e:
+                # Sem saber o que o manifesto referencia, nada é removido
+                backup_logger.error(f"Manifesto ilegível {manifest_file}, limpeza de objetos cancelada: {e}")
+                return 0
+        
+        limit = time.time() - grace_seconds
+        removed = 0
+        for obj in self.objects_dir.glob("*/*"):
+            if obj.name not in referenced and obj.stat().st_mtime < limit:
+                obj.unlink()
+                removed += 1
+        
+        if removed:
+            backup_logger.info(f"{removed} objetos de backup não referenciados removidos")
+        return removed
+    
+    def _restore_from_manifest(self, backup: Dict[str, Any], restore_dir: Path) -> Dict[str, Any]:
+        """Reconstrói os arquivos de um backup incremental a partir do manifesto"""
+        manifest = self._load_manifest(backup)
+        root = restore_dir.resolve()
+        
+        for entry in manifest['files']:
+            source = self._object_path(entry['sha256'])
+            if not source.exists():
+                raise ValueError(f"Conteúdo de {entry['path']} ausente no repositório de backups")
+            
+            destination = (restore_dir / entry['path']).resolve()
+            if root not in destination.parents:
+                raise ValueError(f"Caminho inválido no manifesto: {entry['path']}")
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(source, 'rb') as origin, open(destination, 'wb') as f:
+                shutil.copyfileobj(origin, f)
+        
+        with open(restore_dir / "backup_info.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return manifest
+    
+    def write_zip(self, backup: Dict[str, Any], destination: str):
+        """Gera em `destination` o ZIP de um backup incremental (para download)"""
+        manifest = self._load_manifest(backup)
+        with zipfile.ZipFile(destination, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for entry in manifest['files']:
+                with gzip.open(self._object_path(entry['sha256']), 'rb') as origin, \
+                        zipf.open(entry['path'], 'w') as f:
+                    shutil.copyfileobj(origin, f)
+            zipf.writestr("backup_info.json", json.dumps(manifest, indent=2, ensure_ascii=False))
+    
     def _backup_database(self, backup_path: Path, backup_info: Dict[str, Any]):
         """Backup do banco de dados (schema)"""
         try:
@@ -268,6 +565,11 @@ class BackupManager:
                         Path(backup['zip_path']).unlink()
                         backup_logger.info(f"Backup removido: {backup['zip_path']}")
                     
+                    # Remove manifesto (backup incremental)
+                    if 'manifest_path' in backup and Path(backup['manifest_path']).exists():
+                        Path(backup['manifest_path']).unlink()
+                        backup_logger.info(f"Backup removido: {backup['manifest_path']}")
+                    
                     # Remove do histórico
                     self.backup_history.remove(backup)
                     
@@ -275,14 +577,17 @@ class BackupManager:
                     backup_logger.error(f"Erro ao remover backup {backup['name']}: {e}")
             
             self._save_backup_history()
+            self._remove_unreferenced_objects()
             backup_logger.info(f"Cleanup concluído: {len(backups_to_remove)} backups removidos")
             
         except Exception as e:
             backup_logger.error(f"Erro no cleanup de backups: {e}")
     
     def restore_backup(self, backup_id: int) -> Dict[str, Any]:
-        """Restaura um backup específico"""
+        """Restaura um backup específico em backups/restore_<nome>"""
         try:
+            self.backup_history = self._load_backup_history()
+            
             # Encontrar backup no histórico
             backup = next((b for b in self.backup_history if b['id'] == backup_id), None)
             if not backup:
@@ -291,23 +596,27 @@ class BackupManager:
             if backup['status'] != 'completed':
                 raise ValueError(f"Backup {backup['name']} não está completo")
             
-            zip_path = Path(backup['zip_path'])
-            if not zip_path.exists():
-                raise ValueError(f"Arquivo de backup não encontrado: {zip_path}")
-            
             # Criar diretório temporário para restauração
             restore_dir = self.backup_dir / f"restore_{backup['name']}"
             restore_dir.mkdir(exist_ok=True)
             
-            # Extrair backup
-            with zipfile.ZipFile(zip_path, 'r') as zipf:
-                zipf.extractall(restore_dir)
-            
-            # Ler metadados
-            metadata_file = restore_dir / "backup_info.json"
-            if metadata_file.exists():
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
+            if backup.get('mode') == 'incremental':
+                metadata = self._restore_from_manifest(backup, restore_dir)
+            else:
+                zip_path = Path(backup['zip_path'])
+                if not zip_path.exists():
+                    raise ValueError(f"Arquivo de backup não encontrado: {zip_path}")
+                
+                # Extrair backup
+                with zipfile.ZipFile(zip_path, 'r') as zipf:
+                    zipf.extractall(restore_dir)
+                
+                # Ler metadados
+                metadata = None
+                metadata_file = restore_dir / "backup_info.json"
+                if metadata_file.exists():
+                    with open(metadata_file, 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
             
             backup_logger.info(f"Backup {backup['name']} extraído para restauração")
             
@@ -328,6 +637,7 @@ class BackupManager:
     def get_backup_status(self) -> Dict[str, Any]:
         """Retorna status dos backups"""
         try:
+            self.backup_history = self._load_backup_history()
             total_size = sum(b.get('size', 0) for b in self.backup_history if b['status'] == 'completed')
             
             return {
@@ -345,35 +655,93 @@ class BackupManager:
             backup_logger.error(f"Erro ao obter status dos backups: {e}")
             return {'error': str(e)}
     
+    def start_scheduler(self) -> bool:
+        """
+        Inicia a thread de agendamento; chamadas repetidas não criam outra.
+        Com vários processos, só o líder (ver _acquire_leadership) executa os
+        backups agendados; os demais tentam assumir a cada minuto.
+        """
+        if self._scheduler_thread is not None:
+            return False
+        
+        with self._scheduler_lock:
+            if self._scheduler_thread is not None:
+                return False
+            self._scheduler_thread = threading.Thread(
+                target=self.run_scheduler, name='backup-agendamento', daemon=True
+            )
+            self._scheduler_thread.start()
+            return True
+    
+    def run_scheduler(self):
+        """Laço do agendamento (thread de start_scheduler ou backup_cli.py daemon)"""
+        while True:
+            try:
+                self._scheduler_step()
+            except Exception as e:
+                backup_logger.error(f"Erro no agendamento de backup: {e}")
+            time.sleep(60)  # Verifica a cada minuto
+    
+    def _scheduler_step(self):
+        """Assume a liderança se possível e executa os backups pendentes"""
+        if not self._is_leader and self._acquire_leadership():
+            self._is_leader = True
+            self._setup_automated_backup()
+        
+        if self._is_leader:
+            self._scheduler.run_pending()
+    
     def _setup_automated_backup(self):
-        """Configura backup automático"""
+        """Configura backup automático (horários a partir de agora)"""
+        # Backup diário às 2:00 da manhã
+        self._scheduler.every().day.at("02:00").do(self.create_backup, "automated")
+        
+        # Backup semanal aos domingos às 3:00
+        self._scheduler.every().sunday.at("03:00").do(self.create_backup, "weekly")
+        
+        backup_logger.info(f"Backup automático configurado neste processo (PID {os.getpid()})")
+    
+    def _acquire_leadership(self) -> bool:
+        """
+        Tenta obter, sem bloquear, o lock exclusivo de agendamento em
+        backup_dir. O arquivo fica aberto enquanto o processo viver e o
+        sistema libera o lock quando ele termina, permitindo que outro
+        processo assuma. O lock vale para processos da mesma máquina.
+        Sem fcntl (Windows) cada processo agenda seus backups.
+        """
         try:
-            # Backup diário às 2:00 da manhã
-            schedule.every().day.at("02:00").do(self.create_backup, "automated")
-            
-            # Backup semanal aos domingos às 3:00
-            schedule.every().sunday.at("03:00").do(self.create_backup, "weekly")
-            
-            # Thread para executar agendamentos
-            def run_scheduler():
-                while True:
-                    schedule.run_pending()
-                    time.sleep(60)  # Verifica a cada minuto
-            
-            scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-            scheduler_thread.start()
-            
-            backup_logger.info("Backup automático configurado")
-            
-        except Exception as e:
-            backup_logger.error(f"Erro ao configurar backup automático: {e}")
+            import fcntl
+        except ImportError:
+            backup_logger.warning("fcntl indisponível: agendamento de backup sem eleição de líder")
+            return True
+        
+        arquivo = open(self.scheduler_lock_file, 'a+')
+        try:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        
+        # PID do líder, apenas para diagnóstico
+        arquivo.seek(0)
+        arquivo.truncate()
+        arquivo.write(f"{os.getpid()}\n")
+        arquivo.flush()
+        self._scheduler_lock_handle = arquivo
+        return True
     
     def list_backups(self) -> List[Dict[str, Any]]:
         """Lista todos os backups"""
+        self.backup_history = self._load_backup_history()
         return self.backup_history.copy()
     
     def delete_backup(self, backup_id: int) -> bool:
         """Remove um backup específico"""
+        with self._history_lock():
+            self.backup_history = self._load_backup_history()
+            return self._delete_backup(backup_id)
+    
+    def _delete_backup(self, backup_id: int) -> bool:
         try:
             backup = next((b for b in self.backup_history if b['id'] == backup_id), None)
             if not backup:
@@ -383,9 +751,14 @@ class BackupManager:
             if 'zip_path' in backup and Path(backup['zip_path']).exists():
                 Path(backup['zip_path']).unlink()
             
+            # Remove manifesto (backup incremental)
+            if 'manifest_path' in backup and Path(backup['manifest_path']).exists():
+                Path(backup['manifest_path']).unlink()
+            
             # Remove do histórico
             self.backup_history.remove(backup)
             self._save_backup_history()
+            self._remove_unreferenced_objects()
             
             backup_logger.info(f"Backup {backup['name']} removido")
             return True
@@ -394,17 +767,32 @@ class BackupManager:
             backup_logger.error(f"Erro ao remover backup {backup_id}: {e}")
             return False
 
-# Instância global do gerenciador de backup
-backup_manager = BackupManager()
+# Instância global do gerenciador de backup, criada no primeiro uso: importar
+# este módulo não cria o diretório, não lê o histórico nem inicia threads
+_backup_manager = None
+_backup_manager_lock = threading.Lock()
+
+def get_backup_manager() -> BackupManager:
+    """Retorna o gerenciador de backup global, criando-o se necessário"""
+    global _backup_manager
+    if _backup_manager is None:
+        with _backup_manager_lock:
+            if _backup_manager is None:
+                _backup_manager = BackupManager(Config.BACKUP_DIR, backup_mode=Config.BACKUP_MODO)
+    return _backup_manager
 
-def create_backup(backup_type: str = "manual") -> Dict[str, Any]:
+def create_backup(backup_type: str = "manual", mode: Optional[str] = None) -> Dict[str, Any]:
     """Função helper para criar backup"""
-    return backup_manager.create_backup(backup_type)
+    return get_backup_manager().create_backup(backup_type, mode)
 
 def get_backup_status() -> Dict[str, Any]:
     """Função helper para obter status dos backups"""
-    return backup_manager.get_backup_status()
+    return get_backup_manager().get_backup_status()
 
 def list_backups() -> List[Dict[str, Any]]:
     """Função helper para listar backups"""
-    return backup_manager.list_backups()
+    return get_backup_manager().list_backups()
+
+def restore_backup(backup_id: int) -> Dict[str, Any]:
+    """Função helper para restaurar backup"""
+    return get_backup_manager().restore_backup(backup_id)
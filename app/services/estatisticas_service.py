@@ -0,0 +1,161 @@
+"""
+Serviço de estatísticas dos relatórios
+"""
+from app.services.supabase_service import supabase_service
+from app.services.relatorio_service import (
+    aplicar_filtros, filtrar_por_dados, intervalo_datas, padrao_busca,
+    recurso_ausente_no_servidor
+)
+from postgrest.exceptions import APIError
+import logging
+
+logger = logging.getLogger(__name__)
+
+_estatisticas_no_servidor = True
+_contadores_no_servidor = True
+_soma_contadores_no_servidor = True
+
+# Linhas por página na leitura direta de relatorios_contadores (max-rows
+# padrão do PostgREST; respostas maiores são cortadas sem erro)
+PAGINA_CONTADORES = 1000
+
+# Filtros atendidos pela tabela relatorios_contadores (dia × tipo × porteiro × status)
+FILTROS_CONTADORES = {'tipo', 'porteiro', 'status', 'data_inicio', 'data_fim'}
+
+def contadores_atendem(filtros):
+    """Indica se os filtros podem ser respondidos pelos contadores"""
+    return all(
+        not valor for campo, valor in filtros.items()
+        if campo not in FILTROS_CONTADORES
+    )
+
+def contar_por_status_nos_contadores(filtros):
+    """
+    Soma os contadores mantidos por trigger em relatorios_contadores
+    (database/schema/relatorios_contadores.sql) com a RPC
+    estatisticas_contadores, um SUM ... GROUP BY status no banco. Sem a
+    RPC, as linhas dos contadores são lidas em páginas e somadas aqui.
+    """
+    global _soma_contadores_no_servidor
+
+    if _soma_contadores_no_servidor:
+        datas = filtros.get('data_inicio') and filtros.get('data_fim')
+        params = {
+            'p_tipo': filtros.get('tipo'),
+            'p_porteiro': filtros.get('porteiro'),
+            'p_data_inicio': filtros['data_inicio'] if datas else None,
+            'p_data_fim': filtros['data_fim'] if datas else None
+        }
+        try:
+            response = supabase_service.client.rpc('estatisticas_contadores', params).execute()
+            return {item['status']: item['total'] for item in (response.data or [])}
+        except APIError as e:
+            if not recurso_ausente_no_servidor(e):
+                raise
+            logger.warning(
+                f"RPC estatisticas_contadores indisponível, somando os contadores: {e.message}"
+            )
+            _soma_contadores_no_servidor = False
+
+    return somar_contadores_em_paginas(filtros)
+
+def somar_contadores_em_paginas(filtros):
+    """
+    Lê relatorios_contadores em páginas de PAGINA_CONTADORES linhas (uma por
+    combinação dia × tipo × porteiro × status) até uma página vir incompleta
+    """
+    query = supabase_service.get_table('relatorios_contadores').select('status, total')
+    if filtros.get('tipo'):
+        query = query.eq('tipo_id', filtros['tipo'])
+    if filtros.get('porteiro'):
+        query = query.eq('porteiro_id', filtros['porteiro'])
+    if filtros.get('data_inicio') and filtros.get('data_fim'):
+        query = query.gte('dia', filtros['data_inicio']).lte('dia', filtros['data_fim'])
+    # Ordem total pela chave da tabela, para as páginas não se sobreporem
+    for coluna in ('dia', 'tipo_id', 'porteiro_id', 'status'):
+        query = query.order(coluna)
+
+    contagem = {}
+    inicio = 0
+    while True:
+        pagina = query.range(inicio, inicio + PAGINA_CONTADORES - 1).execute().data or []
+        for contador in pagina:
+            contagem[contador['status']] = (
+                contagem.get(contador['status'], 0) + contador['total']
+            )
+        if len(pagina) < PAGINA_CONTADORES:
+            return contagem
+        inicio += PAGINA_CONTADORES
+
+def contar_por_status_no_servidor(filtros):
+    """
+    Conta os relatórios por status com a RPC estatisticas_relatorios
+    (database/schema/estatisticas_relatorios.sql): um GROUP BY no banco,
+    com resposta de tamanho independente do número de relatórios.
+    O filtro de status não é aplicado, como no restante do painel.
+    """
+    intervalo = intervalo_datas(filtros)
+    params = {
+        'p_tipo': filtros.get('tipo'),
+        'p_porteiro': filtros.get('porteiro'),
+        'p_data_inicio': intervalo[0] if intervalo else None,
+        'p_data_fim': intervalo[1] if intervalo else None,
+        'p_numero_os': filtros.get('numero_os'),
+        'p_matricula': padrao_busca(filtros['matricula']) if filtros.get('matricula') else None,
+        'p_carro': padrao_busca(filtros['carro']) if filtros.get('carro') else None
+    }
+    response = supabase_service.client.rpc('estatisticas_relatorios', params).execute()
+    return {item['status']: item['total'] for item in (response.data or [])}
+
+def contar_por_status_localmente(filtros, filtro_local):
+    """Conta os relatórios por status buscando apenas as colunas necessárias"""
+    query = supabase_service.get_table('relatorios').select(
+        'status, dados' if filtro_local else 'status'
+    )
+    query = aplicar_filtros(
+        query, filtros, incluir_status=False, busca_dados=not filtro_local
+    )
+    relatorios = query.execute().data
+
+    if filtro_local:
+        relatorios = filtrar_por_dados(
+            relatorios, filtros['matricula'], filtros['carro']
+        )
+
+    contagem = {}
+    for relatorio in relatorios:
+        status = relatorio.get('status') or 'PENDENTE'
+        contagem[status] = contagem.get(status, 0) + 1
+    return contagem
+
+def contar_por_status(filtros, filtro_local):
+    """
+    Contagem de relatórios por status, da fonte mais barata disponível:
+    contadores (quando os filtros permitem), RPC de agregação e, por fim,
+    a contagem local. Fontes ausentes no banco são memorizadas por processo.
+    """
+    global _estatisticas_no_servidor, _contadores_no_servidor
+
+    if _contadores_no_servidor and contadores_atendem(filtros):
+        try:
+            return contar_por_status_nos_contadores(filtros)
+        except APIError as e:
+            if not recurso_ausente_no_servidor(e):
+                raise
+            logger.warning(
+                f"Tabela relatorios_contadores indisponível, usando agregação: {e.message}"
+            )
+            _contadores_no_servidor = False
+
+    if _estatisticas_no_servidor and not filtro_local:
+        try:
+            return contar_por_status_no_servidor(filtros)
+        except APIError as e:
+            if not recurso_ausente_no_servidor(e):
+                raise
+            logger.warning(
+                f"RPC estatisticas_relatorios indisponível, contando localmente: {e.message}"
+            )
+            _estatisticas_no_servidor = False
+
+    return contar_por_status_localmente(filtros, filtro_local)
@@ -0,0 +1,221 @@
+"""
+Serviço de eventos em tempo real (Server-Sent Events)
+"""
+from config.settings import Config
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Evento enviado às conexões quando eventos podem ter se perdido: o painel
+# deve sincronizar a fila inteira em vez de esperar pelos avisos seguintes
+EVENTO_RESYNC = 'resync'
+
+class EventBroker:
+    """
+    Pub/sub em memória entre as rotas e as conexões SSE do processo
+
+    Cada conexão recebe uma fila limitada; um cliente lento que a enche
+    perde eventos em vez de segurar quem publica. Os eventos são apenas
+    avisos de mudança: o navegador busca os dados pela API (delta).
+    """
+
+    def __init__(self, max_eventos_por_cliente: int = 100):
+        self.max_eventos_por_cliente = max_eventos_por_cliente
+        self._assinantes = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        fila = queue.Queue(maxsize=self.max_eventos_por_cliente)
+        with self._lock:
+            self._assinantes.add(fila)
+        return fila
+
+    def unsubscribe(self, fila: queue.Queue):
+        with self._lock:
+            self._assinantes.discard(fila)
+
+    @property
+    def total_assinantes(self) -> int:
+        return len(self._assinantes)
+
+    def publish(self, tipo: str, dados: dict):
+        """Publica um evento para as conexões deste processo"""
+        self._entregar({'tipo': tipo, 'dados': dados, 'em': time.time()})
+
+    def _entregar(self, evento: dict):
+        with self._lock:
+            assinantes = list(self._assinantes)
+        for fila in assinantes:
+            try:
+                fila.put_nowait(evento)
+            except queue.Full:
+                logger.debug("Fila de eventos cheia, evento descartado para um cliente")
+
+class FileEventBroker(EventBroker):
+    """
+    Broker para vários workers que compartilham um diretório
+
+    `publish` acrescenta o evento como uma linha JSON no arquivo de eventos
+    (O_APPEND, atômico para linhas pequenas) e uma única thread por processo
+    acompanha o arquivo e repassa as linhas novas às conexões locais. O
+    custo ocioso é um stat por intervalo por processo, não por conexão.
+
+    Ao passar de `max_bytes` o arquivo é truncado e recomeça com uma linha
+    de geração (id aleatório). O leitor compara a geração a cada leitura,
+    então percebe o truncamento mesmo se o arquivo voltar a crescer além da
+    sua posição antes da leitura; nesse caso volta ao início e envia
+    EVENTO_RESYNC às conexões, pois os eventos não lidos se perderam.
+    """
+
+    INTERVALO_LEITURA = 0.5
+    TIPO_GERACAO = 'geracao'
+
+    def __init__(self, caminho: str, max_bytes: int = 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        open(caminho, 'a').close()
+        self._posicao = 0
+        self._geracao = None
+        self._leitor = None
+        self._leitor_lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        self._iniciar_leitor()
+        return super().subscribe()
+
+    @staticmethod
+    def _linha(evento: dict) -> bytes:
+        return (json.dumps(evento, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+    def publish(self, tipo: str, dados: dict):
+        evento = {'tipo': tipo, 'dados': dados, 'em': time.time(), 'id': uuid.uuid4().hex}
+        linha = self._linha(evento)
+        fd = os.open(self.caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size > self.max_bytes:
+                os.ftruncate(fd, 0)
+                geracao = {'tipo': self.TIPO_GERACAO, 'id': uuid.uuid4().hex}
+                linha = self._linha(geracao) + linha
+            os.write(fd, linha)
+        finally:
+            os.close(fd)
+
+    def _ler_geracao(self, arquivo):
+        """Retorna o id da geração na primeira linha do arquivo (None se não houver)"""
+        arquivo.seek(0)
+        primeira = arquivo.readline(256)
+        try:
+            cabecalho = json.loads(primeira)
+        except ValueError:
+            return None
+        if isinstance(cabecalho, dict) and cabecalho.get('tipo') == self.TIPO_GERACAO:
+            return cabecalho.get('id')
+        return None
+
+    def _iniciar_leitor(self):
+        with self._leitor_lock:
+            if self._leitor is None or not self._leitor.is_alive():
+                # Só interessam eventos publicados a partir de agora
+                try:
+                    with open(self.caminho, 'rb') as f:
+                        self._geracao = self._ler_geracao(f)
+                        self._posicao = os.fstat(f.fileno()).st_size
+                except FileNotFoundError:
+                    self._geracao = None
+                    self._posicao = 0
+                self._leitor = threading.Thread(
+                    target=self._acompanhar, name='eventos-arquivo', daemon=True
+                )
+                self._leitor.start()
+
+    def _acompanhar(self):
+        while True:
+            try:
+                self._ler_novos()
+            except Exception as e:
+                logger.error(f"Erro ao ler arquivo de eventos: {e}")
+            time.sleep(self.INTERVALO_LEITURA)
+
+    def _ler_novos(self):
+        try:
+            tamanho = os.path.getsize(self.caminho)
+        except FileNotFoundError:
+            # Ainda não recriado pelo próximo publish
+            return
+        if tamanho == self._posicao:
+            return
+
+        with open(self.caminho, 'rb') as f:
+            geracao = self._ler_geracao(f)
+            if tamanho < self._posicao or geracao != self._geracao:
+                # Arquivo truncado por algum worker
+                logger.info("Arquivo de eventos truncado; conexões avisadas para ressincronizar")
+                self._geracao = geracao
+                self._posicao = 0
+                self._entregar({'tipo': EVENTO_RESYNC, 'dados': {}, 'em': time.time()})
+            f.seek(self._posicao)
+            dados = f.read()
+
+        # Uma linha ainda incompleta fica para a próxima leitura
+        completo = dados.rfind(b'\n') + 1
+        self._posicao += completo
+        for linha in dados[:completo].splitlines():
+            try:
+                evento = json.loads(linha)
+            except ValueError:
+                continue
+            if evento.get('tipo') != self.TIPO_GERACAO:
+                self._entregar(evento)
+
+def varios_workers() -> bool:
+    """Indica se WEB_CONCURRENCY (número de workers do gunicorn) pede mais de um processo"""
+    try:
+        return int(os.environ.get('WEB_CONCURRENCY', 1)) > 1
+    except ValueError:
+        return False
+
+def criar_broker():
+    """
+    Cria o broker conforme EVENTOS_BACKEND ('memoria' ou 'arquivo').
+
+    Sem EVENTOS_BACKEND, usa 'arquivo' quando WEB_CONCURRENCY indica vários
+    workers: com 'memoria' cada processo só vê os eventos publicados nele.
+    """
+    backend = Config.EVENTOS_BACKEND or ('arquivo' if varios_workers() else 'memoria')
+    if backend == 'arquivo':
+        return FileEventBroker(Config.EVENTOS_ARQUIVO)
+    return EventBroker()
+
+# Instância global do broker de eventos, criada no primeiro uso: importar este
+# módulo não cria o diretório nem o arquivo de eventos
+_event_broker = None
+_event_broker_lock = threading.Lock()
+
+def get_event_broker() -> EventBroker:
+    """Retorna o broker de eventos global, criando-o se necessário"""
+    global _event_broker
+    if _event_broker is None:
+        with _event_broker_lock:
+            if _event_broker is None:
+                _event_broker = criar_broker()
+    return _event_broker
+
+def publicar_evento(tipo: str, dados: dict):
+    """Publica um evento sem deixar falhas afetarem a rota que o originou"""
+    try:
+        get_event_broker().publish(tipo, dados)
+    except Exception as e:
+        logger.error(f"Erro ao publicar evento {tipo}: {e}")
+
+def formatar_evento_sse(evento):
+    """Formata um evento do broker no protocolo text/event-stream"""
+    dados = json.dumps(evento['dados'], ensure_ascii=False, default=str)
+    return f"event: {evento['tipo']}\ndata: {dados}\n\n"
@@ -0,0 +1,369 @@
+"""
+Serviço de exportação de relatórios (em streaming e em segundo plano)
+"""
+from app.services.supabase_service import supabase_service
+from app.services.relatorio_service import (
+    aplicar_cursor, aplicar_filtros, enriquecer_relatorios, filtrar_dados_localmente,
+    filtrar_por_dados
+)
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from pathlib import Path
+from config.settings import Config
+import csv
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class ExportJobManager:
+    """
+    Fila de exportações executadas por um pool de threads
+
+    Cada job grava o arquivo gerado e um `<id>.json` com o estado no
+    diretório de artefatos. O estado fica em disco (e não só em memória)
+    para que a consulta de status e o download funcionem em qualquer worker
+    que compartilhe o diretório. Artefatos mais antigos que `ttl` segundos
+    são removidos a cada novo job.
+    """
+
+    # Intervalo mínimo entre gravações do progresso em disco
+    INTERVALO_PROGRESSO = 1.0
+
+    def __init__(self, export_dir: str = 'exports', max_workers: int = 2, ttl: int = 3600):
+        self.export_dir = Path(export_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='exportacao'
+        )
+        self._lock = threading.Lock()
+
+    def _caminho_estado(self, job_id: str) -> Path:
+        return self.export_dir / f"{job_id}.json"
+
+    def _salvar_estado(self, job: dict):
+        """Grava o estado de forma atômica (arquivo temporário + rename)"""
+        caminho = self._caminho_estado(job['id'])
+        temporario = caminho.with_suffix('.json.tmp')
+        with self._lock:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(temporario, caminho)
+
+    def submit(self, formato: str, extensao: str, gerar, total=None) -> dict:
+        """
+        Enfileira uma exportação e retorna o estado inicial do job.
+
+        `gerar(caminho, progresso)` deve escrever o arquivo em `caminho`,
+        chamando `progresso(linhas)` conforme avança.
+        """
+        self.cleanup()
+
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'formato': formato,
+            'status': 'pending',
+            'linhas': 0,
+            'total': total,
+            'arquivo': f"{job_id}.{extensao}",
+            'criado_em': datetime.now().isoformat(),
+            'concluido_em': None,
+            'error': None
+        }
+        self._salvar_estado(job)
+        self._executor.submit(self._executar, job, gerar)
+        logger.info(f"Exportação {formato} enfileirada: {job_id}")
+        return dict(job)
+
+    def _executar(self, job: dict, gerar):
+        """Executa o job no pool, registrando progresso e resultado"""
+        caminho = self.export_dir / job['arquivo']
+        ultima_gravacao = [0.0]
+
+        def progresso(linhas):
+            job['linhas'] = linhas
+            agora = time.monotonic()
+            if agora - ultima_gravacao[0] >= self.INTERVALO_PROGRESSO:
+                ultima_gravacao[0] = agora
+                self._salvar_estado(job)
+
+        job['status'] = 'in_progress'
+        self._salvar_estado(job)
+
+        try:
+            gerar(str(caminho), progresso)
+            job['status'] = 'completed'
+            logger.info(f"Exportação {job['id']} concluída com {job['linhas']} relatórios")
+        except Exception as e:
+            logger.error(f"Erro na exportação {job['id']}: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            if caminho.exists():
+                caminho.unlink()
+
+        job['concluido_em'] = datetime.now().isoformat()
+        self._salvar_estado(job)
+
+    def get_job(self, job_id: str):
+        """Retorna o estado do job ou None se não existir (ou tiver expirado)"""
+        # O id vira nome de arquivo: aceitar apenas o formato gerado por submit
+        if len(job_id) != 32 or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+
+        try:
+            with open(self._caminho_estado(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get_artifact(self, job: dict) -> Path:
+        """Caminho do arquivo gerado por um job concluído"""
+        return self.export_dir / job['arquivo']
+
+    def cleanup(self):
+        """Remove estados e arquivos de jobs mais antigos que o TTL"""
+        limite = time.time() - self.ttl
+        for caminho in self.export_dir.iterdir():
+            try:
+                if caminho.stat().st_mtime < limite:
+                    caminho.unlink()
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error(f"Erro ao remover exportação expirada {caminho.name}: {e}")
+
+# Instância global do gerenciador de exportações, criada no primeiro uso:
+# importar este módulo não cria o diretório de artefatos nem o pool de threads
+_export_manager = None
+_export_manager_lock = threading.Lock()
+
+def get_export_manager() -> ExportJobManager:
+    """Retorna o gerenciador de exportações global, criando-o se necessário"""
+    global _export_manager
+    if _export_manager is None:
+        with _export_manager_lock:
+            if _export_manager is None:
+                _export_manager = ExportJobManager(
+                    export_dir=Config.EXPORT_DIR,
+                    max_workers=Config.EXPORT_WORKERS,
+                    ttl=Config.EXPORT_JOB_TTL
+                )
+    return _export_manager
+
+def extrair_motorista_dos_dados(dados):
+    """
+    Extrai o nome do motorista dos dados (JSONB ou string)
+    """
+    try:
+        if isinstance(dados, dict):
+            return (dados.get('motorista') or 
+                   dados.get('motorista_matricula') or 
+                   dados.get('nome_motorista') or 
+                   None)
+        elif isinstance(dados, str):
+            match = re.search(r'motorista[:\s]+([^\n\r,]+)', dados, re.IGNORECASE)
+            if match:
+                return match.group(1).strip()
+        return None
+    except Exception as e:
+        logger.error(f"Erro ao extrair motorista dos dados: {e}")
+        return None
+
+# Relatórios buscados por consulta durante a exportação
+TAMANHO_PAGINA_EXPORTACAO = 500
+
+def iterar_relatorios_exportacao(filtros, tamanho_pagina=TAMANHO_PAGINA_EXPORTACAO):
+    """
+    Gera os relatórios filtrados, enriquecidos e formatados para exportação.
+
+    Busca no Supabase uma página por vez com paginação por keyset
+    (criado_em desc, id desc), então apenas uma página fica em memória
+    enquanto o arquivo é enviado.
+    """
+    filtro_local = filtrar_dados_localmente(filtros)
+    posicao = None
+
+    while True:
+        query = supabase_service.get_table('relatorios').select('*')
+        query = aplicar_filtros(query, filtros, busca_dados=not filtro_local)
+        query = query.order('criado_em', desc=True).order('id', desc=True)
+        if posicao:
+            query = aplicar_cursor(query, *posicao)
+        pagina = query.limit(tamanho_pagina).execute().data
+
+        if not pagina:
+            return
+        ultima_pagina = len(pagina) < tamanho_pagina
+        posicao = (pagina[-1]['criado_em'], pagina[-1]['id'])
+
+        if filtro_local:
+            # Filtros de matrícula e carro aplicados no Python
+            pagina = filtrar_por_dados(pagina, filtros['matricula'], filtros['carro'])
+
+        for relatorio_data in enriquecer_relatorios(pagina):
+            yield formatar_relatorio_exportacao(relatorio_data)
+
+        if ultima_pagina:
+            return
+
+def formatar_relatorio_exportacao(relatorio_data):
+    """Prepara um relatório enriquecido para exibição na exportação"""
+    # Extrair nome do motorista dos dados se não estiver no campo motorista
+    if not relatorio_data.get('motorista') and relatorio_data.get('dados'):
+        motorista_extraido = extrair_motorista_dos_dados(relatorio_data['dados'])
+        if motorista_extraido:
+            relatorio_data['motorista'] = motorista_extraido
+
+    # Formatar data para exibição
+    if relatorio_data.get('criado_em'):
+        try:
+            if isinstance(relatorio_data['criado_em'], str):
+                for fmt in ['%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%d %H:%M:%S']:
+                    try:
+                        dt = datetime.strptime(relatorio_data['criado_em'], fmt)
+                        relatorio_data['criado_em'] = dt.strftime('%d/%m/%Y %H:%M:%S')
+                        break
+                    except ValueError:
+                        continue
+            else:
+                relatorio_data['criado_em'] = relatorio_data['criado_em'].strftime('%d/%m/%Y %H:%M:%S')
+        except Exception as e:
+            logger.error(f"Erro ao formatar data: {e}")
+            relatorio_data['criado_em'] = 'Data inválida'
+
+    return relatorio_data
+
+def registrar_exportacao(relatorios, formato):
+    """Repassa os relatórios exportados registrando o total ou a falha no log"""
+    total = 0
+    try:
+        for relatorio in relatorios:
+            total += 1
+            yield relatorio
+    except Exception as e:
+        # A resposta já começou a ser enviada: só resta registrar e interromper
+        logger.error(f"Erro ao exportar relatórios ({formato}) após {total} registros: {e}")
+        logger.error(traceback.format_exc())
+        raise
+    logger.info(f"Exportação {formato} concluída com {total} relatórios")
+
+# Colunas das exportações em planilha (CSV/XLSX)
+COLUNAS_EXPORTACAO = [
+    ('numero_os', 'Número OS'),
+    ('criado_em', 'Data'),
+    ('tipo_nome', 'Tipo'),
+    ('porteiro_nome', 'Porteiro'),
+    ('motorista', 'Motorista'),
+    ('status', 'Status'),
+    ('dados', 'Dados')
+]
+
+def linha_exportacao(relatorio):
+    """Converte um relatório formatado na lista de células da planilha"""
+    linha = []
+    for campo, _ in COLUNAS_EXPORTACAO:
+        valor = relatorio.get(campo)
+        if valor is None:
+            valor = ''
+        elif not isinstance(valor, str):
+            valor = json.dumps(valor, ensure_ascii=False)
+        # Impedir que o texto digitado seja interpretado como fórmula
+        if valor[:1] in ('=', '+', '-', '@'):
+            valor = "'" + valor
+        linha.append(valor)
+    return linha
+
+def gerar_csv(relatorios):
+    """Gera o CSV linha a linha (separador ';' e BOM para o Excel em pt-BR)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+
+    def descarregar():
+        conteudo = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return conteudo
+
+    writer.writerow([titulo for _, titulo in COLUNAS_EXPORTACAO])
+    yield '\ufeff' + descarregar()
+    for relatorio in relatorios:
+        writer.writerow(linha_exportacao(relatorio))
+        yield descarregar()
+
+def gerar_xlsx(relatorios, destino):
+    """
+    Grava a planilha em destino com o modo write_only do openpyxl, que
+    descarrega cada linha em disco em vez de manter a planilha em memória
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet('Relatórios')
+    planilha.append([titulo for _, titulo in COLUNAS_EXPORTACAO])
+    for relatorio in relatorios:
+        planilha.append(linha_exportacao(relatorio))
+    workbook.save(destino)
+
+def enviar_e_remover(caminho, tamanho_bloco=64 * 1024):
+    """Envia um arquivo temporário em blocos e o remove ao final"""
+    try:
+        with open(caminho, 'rb') as arquivo:
+            while True:
+                bloco = arquivo.read(tamanho_bloco)
+                if not bloco:
+                    break
+                yield bloco
+    finally:
+        os.remove(caminho)
+
+def nome_arquivo_exportacao(extensao):
+    """Nome do arquivo baixado, no mesmo padrão da exportação HTML"""
+    return f"relatorios_{datetime.now().strftime('%Y-%m-%d')}.{extensao}"
+
+def escrever_html(relatorios, caminho):
+    """Renderiza o template de exportação em partes direto para o arquivo"""
+    # Executado no job com o contexto da aplicação ativo (ver rota de jobs)
+    template = current_app.jinja_env.get_template('export_template.html')
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        for parte in template.generate(
+            relatorios=relatorios,
+            data_exportacao=datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        ):
+            arquivo.write(parte)
+
+def escrever_csv(relatorios, caminho):
+    """Grava o CSV linha a linha no arquivo"""
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        for parte in gerar_csv(relatorios):
+            arquivo.write(parte)
+
+# formato -> (função que grava o arquivo, mimetype do download)
+FORMATOS_EXPORTACAO = {
+    'html': (escrever_html, 'text/html'),
+    'csv': (escrever_csv, 'text/csv'),
+    'xlsx': (gerar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+
+def contar_relatorios_exportacao(filtros):
+    """Total de relatórios a exportar, ou None se depender de filtragem local"""
+    if filtrar_dados_localmente(filtros):
+        return None
+    query = supabase_service.get_table('relatorios').select('id', count='exact')
+    query = aplicar_filtros(query, filtros, busca_dados=True)
+    return query.limit(1).execute().count
+
+def acompanhar_progresso(relatorios, progresso):
+    """Repassa os relatórios informando ao job quantos já foram gravados"""
+    for linhas, relatorio in enumerate(relatorios, 1):
+        yield relatorio
+        progresso(linhas)
@@ -0,0 +1,346 @@
+"""
+Serviço de upload e processamento das fotos dos relatórios
+"""
+from app.services.supabase_service import supabase_service, TTLCache
+from config.settings import Config
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import base64
+import hashlib
+import io
+import logging
+import os
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Pool compartilhado para upload de fotos: limita as conexões simultâneas
+# com o Storage mesmo com várias requisições enviando fotos ao mesmo tempo
+UPLOAD_FOTOS_WORKERS = Config.UPLOAD_FOTOS_WORKERS
+upload_fotos_executor = ThreadPoolExecutor(
+    max_workers=UPLOAD_FOTOS_WORKERS, thread_name_prefix='upload-fotos'
+)
+
+# Formatos de imagem aceitos no upload de fotos
+FORMATOS_FOTO = ['jpeg', 'jpg', 'png', 'gif']
+
+# Redimensionamento das fotos antes do upload (requer Pillow)
+FOTO_MAX_LADO = Config.FOTO_MAX_LADO
+FOTO_QUALIDADE = Config.FOTO_QUALIDADE
+FOTO_THUMB_LADO = Config.FOTO_THUMB_LADO
+
+def processar_imagem(conteudo, formato):
+    """
+    Limita a foto a FOTO_MAX_LADO px no maior lado, recomprime com
+    FOTO_QUALIDADE e gera uma miniatura de FOTO_THUMB_LADO px.
+
+    `conteudo` são os bytes da imagem ou o caminho do arquivo. Retorna
+    (formato, bytes da foto, bytes da miniatura); a foto é None quando a
+    original já é menor do que a versão recomprimida. Retorna None se a
+    imagem deve ser enviada como recebida (GIF ou Pillow não instalado).
+    """
+    if formato == 'gif':
+        # GIFs podem ser animados: enviados sem alteração
+        return None
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+
+    formato_saida = 'png' if formato == 'png' else 'jpeg'
+
+    def codificar(imagem):
+        saida = io.BytesIO()
+        if formato_saida == 'png':
+            imagem.save(saida, 'PNG', optimize=True)
+        else:
+            imagem.save(saida, 'JPEG', quality=FOTO_QUALIDADE, optimize=True)
+        return saida.getvalue()
+
+    origem = io.BytesIO(conteudo) if isinstance(conteudo, bytes) else conteudo
+    with Image.open(origem) as original:
+        # Em JPEG a decodificação já é feita em escala reduzida (1/2 a 1/8)
+        # quando a foto é muito maior que o limite
+        original.draft('RGB', (FOTO_MAX_LADO, FOTO_MAX_LADO))
+        reduzir = max(original.size) > FOTO_MAX_LADO
+        # Aplica a rotação do EXIF; os metadados (ex.: GPS) não são copiados
+        imagem = ImageOps.exif_transpose(original)
+
+    if formato_saida == 'jpeg' and imagem.mode != 'RGB':
+        imagem = imagem.convert('RGB')
+
+    imagem.thumbnail((FOTO_MAX_LADO, FOTO_MAX_LADO), Image.LANCZOS)
+    foto = codificar(imagem)
+    tamanho_original = (
+        len(conteudo) if isinstance(conteudo, bytes) else os.path.getsize(conteudo)
+    )
+    if not reduzir and len(foto) >= tamanho_original:
+        foto = None
+
+    imagem.thumbnail((FOTO_THUMB_LADO, FOTO_THUMB_LADO), Image.LANCZOS)
+    return formato_saida, foto, codificar(imagem)
+
+# Fotos são gravadas pelo hash do conteúdo: conteudo/<2 primeiros>/<sha256>.<ext>
+PASTA_FOTOS_CONTEUDO = 'conteudo'
+
+# Índice local hash -> (URL, URL da miniatura) das fotos já enviadas
+indice_fotos = TTLCache(ttl=24 * 3600, max_itens=5000)
+
+def url_publica_foto(caminho_completo):
+    """URL pública de um objeto do bucket relatorios-fotos (sem parâmetros)"""
+    return f"https://{Config.SUPABASE_URL.split('//')[-1]}/storage/v1/object/public/relatorios-fotos/{caminho_completo}"
+
+def hash_foto(conteudo):
+    """SHA-256 dos bytes da foto ou, para um caminho, do arquivo lido em blocos"""
+    if isinstance(conteudo, bytes):
+        return hashlib.sha256(conteudo).hexdigest()
+
+    sha = hashlib.sha256()
+    with open(conteudo, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(64 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def buscar_foto_existente(sha):
+    """
+    Retorna (URL, URL da miniatura) de uma foto já armazenada com este
+    hash, consultando o índice local e depois a pasta do hash no Storage.
+    """
+    existente = indice_fotos.get(('fotos', sha))
+    if existente:
+        return existente
+
+    pasta = f"{PASTA_FOTOS_CONTEUDO}/{sha[:2]}"
+    objetos = supabase_service.get_storage().from_('relatorios-fotos').list(pasta, {'search': sha})
+    nomes = [objeto.get('name', '') for objeto in objetos or []]
+    foto = next((n for n in nomes if n.startswith(f"{sha}.")), None)
+    if not foto:
+        return None
+
+    miniatura = next((n for n in nomes if n.startswith(f"{sha}_thumb.")), None)
+    existente = (
+        url_publica_foto(f"{pasta}/{foto}"),
+        url_publica_foto(f"{pasta}/{miniatura}") if miniatura else None
+    )
+    indice_fotos.set(('fotos', sha), existente)
+    return existente
+
+def upload_foto(caminho_completo, conteudo, formato):
+    """
+    Envia bytes ou um arquivo (caminho) ao bucket e retorna a URL pública.
+    Como o caminho deriva do conteúdo, um objeto já existente (envio
+    simultâneo da mesma foto) é tratado como sucesso.
+    """
+    origem = open(conteudo, 'rb') if isinstance(conteudo, str) else nullcontext(conteudo)
+
+    # Fazer upload para o Supabase Storage
+    try:
+        with origem as dados_imagem:
+            upload_response = supabase_service.get_storage().from_('relatorios-fotos').upload(
+                caminho_completo,
+                dados_imagem,
+                {"content-type": f"image/{formato}"}
+            )
+    except Exception as e:
+        if 'Duplicate' not in str(e) and 'already exists' not in str(e):
+            raise
+        logger.info(f"Foto já existente no Storage: {caminho_completo}")
+        return url_publica_foto(caminho_completo)
+
+    if hasattr(upload_response, 'error') and upload_response.error:
+        raise RuntimeError(upload_response.error)
+
+    return url_publica_foto(caminho_completo)
+
+def enviar_foto(i, foto_data):
+    """
+    Envia a foto de índice i e sua miniatura para o bucket relatorios-fotos.
+
+    A foto chega como data URL base64 (corpo JSON) ou, no upload multipart,
+    como arquivo temporário em foto_data['arquivo']. Fotos idênticas são
+    armazenadas uma única vez: se o hash já existir, nada é processado nem
+    enviado. Retorna (URL pública, URL da miniatura ou None), ou None se a
+    foto falhar; falhas ficam restritas a esta foto.
+    """
+    try:
+        if foto_data.get('arquivo'):
+            formato = foto_data['formato']
+            conteudo = foto_data['arquivo']
+        else:
+            # Verificar se é uma string base64 válida
+            if not foto_data.get('base64', '').startswith('data:image/'):
+                logger.warning(f"Formato de foto inválido: {foto_data.get('base64', '')[:100]}...")
+                return None
+
+            # Decodificar a imagem base64
+            foto_base64 = foto_data.get('base64', '')
+            header, encoded = foto_base64.split(',', 1)
+            formato = header.split(';')[0].split('/')[1]
+
+            # Validar formato
+            if formato not in FORMATOS_FOTO:
+                logger.warning(f"Formato de imagem não suportado: {formato}")
+                return None
+
+            conteudo = base64.b64decode(encoded)
+
+        # O hash é dos bytes recebidos, antes do redimensionamento
+        sha = hash_foto(conteudo)
+        try:
+            existente = buscar_foto_existente(sha)
+        except Exception as e:
+            logger.warning(f"Não foi possível verificar foto existente {sha}: {e}")
+            existente = None
+        if existente:
+            logger.info(f"Foto {i} já armazenada (sha256 {sha}), upload ignorado")
+            return existente
+
+        miniatura = None
+        try:
+            processada = processar_imagem(conteudo, formato)
+        except Exception as e:
+            # Imagem que o Pillow não consegue abrir: envia como recebida
+            logger.warning(f"Não foi possível redimensionar a foto {i}: {e}")
+            processada = None
+        if processada:
+            formato_miniatura, foto, miniatura = processada
+            if foto is not None:
+                formato, conteudo = formato_miniatura, foto
+
+        nome_base = f"{PASTA_FOTOS_CONTEUDO}/{sha[:2]}/{sha}"
+        public_url = upload_foto(f"{nome_base}.{formato}", conteudo, formato)
+
+        thumb_url = None
+        if miniatura:
+            try:
+                thumb_url = upload_foto(
+                    f"{nome_base}_thumb.{formato_miniatura}", miniatura, formato_miniatura
+                )
+            except Exception as e:
+                logger.error(f"Erro no upload da miniatura da foto {i}: {e}")
+
+        indice_fotos.set(('fotos', sha), (public_url, thumb_url))
+        return public_url, thumb_url
+
+    except Exception as e:
+        logger.error(f"Erro ao processar foto {i}: {e}")
+        logger.error(traceback.format_exc())
+        return None
+
+def processar_fotos(fotos):
+    """
+    Envia as fotos em paralelo no pool de upload e retorna
+    (fotos_dict com FOTO1..N, fotos_urls para o frontend), na ordem recebida.
+    """
+    futuros = [
+        upload_fotos_executor.submit(enviar_foto, i, foto_data)
+        for i, foto_data in enumerate(fotos)
+    ]
+
+    fotos_dict = {}
+    fotos_urls = []
+    for i, (foto_data, futuro) in enumerate(zip(fotos, futuros)):
+        resultado = futuro.result()
+        if not resultado:
+            continue
+        public_url, thumb_url = resultado
+
+        # Salvar no dicionário com chave FOTO1, FOTO2, ... e a miniatura
+        # em FOTO1_thumb, FOTO2_thumb, ...
+        chave = f"FOTO{i+1}"
+        fotos_dict[chave] = public_url
+        if thumb_url:
+            fotos_dict[f"{chave}_thumb"] = thumb_url
+
+        # ✅ NOVO: Adicionar à lista de URLs para retorno ao frontend
+        fotos_urls.append({
+            'url': public_url,
+            'thumbUrl': thumb_url,
+            'indice': i + 1,
+            'placeholder': f"FOTO{i+1}",
+            'campoNome': foto_data.get('campoNome', ''),
+            'fileName': foto_data.get('fileName', '')
+        })
+
+        logger.debug(f"{chave}: {public_url}")
+
+    return fotos_dict, fotos_urls
+
+# Marcadores em fotos['_status'] de relatórios com envio de fotos em segundo plano
+FOTOS_PROCESSANDO = 'PROCESSANDO'
+FOTOS_ERRO = 'ERRO'
+
+# Prazo para a tarefa concluir as fotos; depois dele o envio é considerado
+# perdido (a tarefa vive só na memória do worker que recebeu o relatório)
+FOTOS_PROCESSANDO_TIMEOUT = Config.FOTOS_PROCESSANDO_TIMEOUT
+
+# Tarefas que enviam as fotos depois de gravar o relatório; cada uma usa o
+# pool de upload, por isso ficam em um pool separado
+fotos_assincronas_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix='fotos-relatorio'
+)
+
+def marcador_fotos_processando():
+    """Valor de 'fotos' gravado com o relatório enquanto as fotos são enviadas"""
+    return {'_status': FOTOS_PROCESSANDO, '_inicio': time.time()}
+
+def fotos_abandonadas(fotos):
+    """
+    Indica se um relatório está em PROCESSANDO há mais que o prazo, o que
+    acontece quando o worker é reiniciado antes de a tarefa terminar.
+    Marcadores sem '_inicio' são de antes do prazo existir e contam como
+    abandonados.
+    """
+    inicio = fotos.get('_inicio')
+    if not isinstance(inicio, (int, float)):
+        return True
+    return time.time() - inicio > FOTOS_PROCESSANDO_TIMEOUT
+
+def marcar_fotos_abandonadas(relatorio_id):
+    """
+    Troca PROCESSANDO por ERRO. O filtro no status evita sobrescrever fotos
+    concluídas entre a leitura e a atualização; se a tarefa terminar depois,
+    ela grava as fotos por cima do ERRO.
+    """
+    supabase_service.get_table('relatorios').update(
+        {'fotos': {'_status': FOTOS_ERRO}}
+    ).eq('id', relatorio_id).eq('fotos->>_status', FOTOS_PROCESSANDO).execute()
+    logger.warning(f"Fotos do relatório {relatorio_id} sem conclusão no prazo; marcadas como erro")
+
+def concluir_fotos_relatorio(relatorio_id, fotos, arquivos_temporarios=()):
+    """Envia as fotos de um relatório já gravado e atualiza seu campo 'fotos'"""
+    try:
+        fotos_dict, _ = processar_fotos(fotos)
+        supabase_service.get_table('relatorios').update(
+            {'fotos': fotos_dict or None}
+        ).eq('id', relatorio_id).execute()
+        logger.info(f"Fotos do relatório {relatorio_id} concluídas: {len(fotos_dict)}")
+    except Exception as e:
+        logger.error(f"Erro ao concluir fotos do relatório {relatorio_id}: {e}")
+        logger.error(traceback.format_exc())
+        try:
+            supabase_service.get_table('relatorios').update(
+                {'fotos': {'_status': FOTOS_ERRO}}
+            ).eq('id', relatorio_id).execute()
+        except Exception as erro_atualizacao:
+            logger.error(f"Erro ao marcar fotos do relatório {relatorio_id}: {erro_atualizacao}")
+    finally:
+        for caminho in arquivos_temporarios:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+def urls_das_fotos(fotos):
+    """Monta a lista fotosUrls (FOTO1..N em ordem) a partir do campo 'fotos'"""
+    indices = sorted(
+        int(chave[4:]) for chave in fotos
+        if chave.startswith('FOTO') and chave[4:].isdigit()
+    )
+    return [{
+        'url': fotos[f"FOTO{indice}"],
+        'thumbUrl': fotos.get(f"FOTO{indice}_thumb"),
+        'indice': indice,
+        'placeholder': f"FOTO{indice}"
+    } for indice in indices]
@@ -1,35 +1,426 @@
 """
 Serviço para operações com relatórios
+
+Camada de consulta compartilhada pelas rotas: filtros, paginação por
+cursor, enriquecimento com nomes, sincronização das filas e numeração de OS.
 """
-from app.services.supabase_service import supabase_service
+from app.services.supabase_service import supabase_service, cache_referencia
+from config.settings import Config
+from postgrest.exceptions import APIError
+from datetime import datetime, timedelta
+import base64
+import json
 import logging
+import threading
+import uuid
 
 logger = logging.getLogger(__name__)
 
-def gerar_numero_os():
-    """Gera número sequencial para OS"""
-    try:
-        # Buscar último número usado
-        response = supabase_service.get_table('relatorios').select('numero_os').order('numero_os', desc=True).limit(1).execute()
-        
-        if response.data:
-            ultimo_numero = int(response.data[0]['numero_os'])
-            novo_numero = ultimo_numero + 1
-        else:
-            novo_numero = 1
+# Marca no cache os ids consultados que não existem na tabela
+_SEM_NOME = object()
+
+def buscar_nomes_por_id(tabela, ids):
+    """
+    Busca o campo 'nome' de vários registros de uma tabela e retorna um
+    dicionário {str(id): nome}.
+
+    Cada id tem sua própria entrada (e expiração) no cache de referência,
+    inclusive os que não foram encontrados; apenas os ids sem entrada são
+    buscados, em uma única consulta (filtro in_).
+    """
+    ids_unicos = list(dict.fromkeys(str(i) for i in ids if i is not None))
+    if not ids_unicos:
+        return {}
+
+    nomes = {}
+    faltantes = []
+    for i in ids_unicos:
+        nome = cache_referencia.get((tabela, 'nome', i))
+        if nome is None:
+            faltantes.append(i)
+        elif nome is not _SEM_NOME:
+            nomes[i] = nome
+
+    if faltantes:
+        response = supabase_service.get_table(tabela).select('id, nome').in_(
+            'id', faltantes).execute()
+        encontrados = {str(item['id']): item['nome'] for item in (response.data or [])}
+        for i in faltantes:
+            cache_referencia.set((tabela, 'nome', i), encontrados.get(i, _SEM_NOME))
+        nomes.update(encontrados)
+
+    return {i: nomes[i] for i in ids_unicos if i in nomes}
+
+def enriquecer_relatorios(relatorios):
+    """
+    Adiciona 'porteiro_nome' e 'tipo_nome' aos relatórios.
+
+    Os ids distintos de porteiro e tipo são resolvidos com uma consulta por
+    tabela, em vez de duas consultas por relatório. Os relatórios são
+    alterados no próprio dicionário e a lista é retornada.
+    """
+    campos = [
+        ('porteiro_id', 'porteiro_nome', 'porteiros', 'porteiro'),
+        ('tipo_id', 'tipo_nome', 'tipos_relatorio', 'tipo'),
+    ]
+
+    for campo_id, campo_nome, tabela, descricao in campos:
+        ids = [r[campo_id] for r in relatorios if r.get(campo_id)]
+        if not ids:
+            continue
+
+        try:
+            nomes = buscar_nomes_por_id(tabela, ids)
+        except Exception as e:
+            logger.error(f"Erro ao buscar {descricao}s {sorted(set(map(str, ids)))}: {e}")
+            nomes = None
+
+        for relatorio in relatorios:
+            if not relatorio.get(campo_id):
+                continue
+            if nomes is None:
+                relatorio[campo_nome] = 'Erro'
+            else:
+                relatorio[campo_nome] = nomes.get(str(relatorio[campo_id]), 'N/A')
+
+    return relatorios
+
+def filtrar_por_dados(relatorios, matricula=None, carro=None):
+    """Filtra relatórios pela busca textual de matrícula/carro em 'dados'"""
+    relatorios_filtrados = []
+    for relatorio in relatorios:
+        dados_texto = str(relatorio.get('dados', '')).lower()
         
-        # Garantir que o número seja único
-        while True:
-            check_response = supabase_service.get_table('relatorios').select('id').eq('numero_os', str(novo_numero)).execute()
-            if not check_response.data:
-                break
-            novo_numero += 1
+        # Verificar filtro de matrícula
+        if matricula and matricula.lower() not in dados_texto:
+            continue
         
-        return str(novo_numero)
+        # Verificar filtro de carro
+        if carro and carro.lower() not in dados_texto:
+            continue
         
-    except Exception as e:
-        logger.error(f"Erro ao gerar número OS: {str(e)}")
-        # Fallback: usar timestamp
-        import time
-        return str(int(time.time()))
+        relatorios_filtrados.append(relatorio)
+    return relatorios_filtrados
+
+# Códigos de erro do PostgREST/Postgres para função, coluna ou tabela
+# inexistente (script de database/schema ainda não aplicado)
+CODIGOS_RECURSO_AUSENTE = {'PGRST202', 'PGRST204', '42883', '42703', '42P01'}
+
+def recurso_ausente_no_servidor(erro):
+    """Indica se o APIError se deve a um objeto do banco que não existe"""
+    return getattr(erro, 'code', None) in CODIGOS_RECURSO_AUSENTE
+
+# Campo calculado com o texto pesquisável de 'dados'
+# (ver database/schema/add_busca_dados.sql)
+COLUNA_BUSCA_DADOS = 'dados_busca'
+_busca_dados_no_servidor = None
+
+def busca_dados_no_servidor():
+    """
+    Indica se os filtros de matrícula/carro podem ser avaliados pelo banco,
+    isto é, se o campo calculado COLUNA_BUSCA_DADOS existe no banco.
+
+    O resultado é memorizado por processo. Falhas que não sejam erro da API
+    (rede, por exemplo) não são memorizadas e a verificação é refeita.
+    """
+    global _busca_dados_no_servidor
+    if _busca_dados_no_servidor is None:
+        try:
+            supabase_service.get_table('relatorios').select(COLUNA_BUSCA_DADOS).limit(1).execute()
+            _busca_dados_no_servidor = True
+        except APIError as e:
+            if not recurso_ausente_no_servidor(e):
+                logger.error(f"Erro ao verificar busca em dados no servidor: {e.message}")
+                return False
+            logger.warning(
+                f"Busca em dados indisponível no servidor, usando filtragem local: {e.message}"
+            )
+            _busca_dados_no_servidor = False
+        except Exception as e:
+            logger.error(f"Erro ao verificar busca em dados no servidor: {e}")
+            return False
+    return _busca_dados_no_servidor
+
+def padrao_busca(valor):
+    """Monta o padrão ILIKE de 'contém', escapando os curingas do valor"""
+    escapado = valor.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escapado.lower()}%'
+
+def obter_filtros(args):
+    """Lê os filtros de relatórios dos parâmetros da requisição"""
+    return {
+        'tipo': args.get('tipo'),
+        'porteiro': args.get('porteiro'),
+        'status': args.get('status'),
+        'data_inicio': args.get('data_inicio'),
+        'data_fim': args.get('data_fim'),
+        'numero_os': args.get('numero_os'),  # Filtro por número de OS
+        'matricula': args.get('matricula'),  # Filtro por matrícula
+        'carro': args.get('carro')  # Filtro por carro/veículo
+    }
+
+def intervalo_datas(filtros):
+    """
+    Retorna (data_inicio, data_fim às 23:59:59 em ISO) quando as duas datas
+    foram informadas, ou None. Lança ValueError se data_fim for inválida.
+    """
+    if not (filtros.get('data_inicio') and filtros.get('data_fim')):
+        return None
+
+    data_fim_ajustada = datetime.strptime(filtros['data_fim'], '%Y-%m-%d')
+    data_fim_ajustada = data_fim_ajustada.replace(
+        hour=23, minute=59, second=59
+    )
+    return filtros['data_inicio'], data_fim_ajustada.isoformat()
+
+def aplicar_filtros(query, filtros, incluir_status=True, busca_dados=False):
+    """
+    Aplica os filtros de relatórios à query do Supabase.
+
+    Com busca_dados=True os filtros de matrícula/carro são enviados ao banco
+    (ILIKE na coluna de busca); caso contrário ficam a cargo de
+    filtrar_por_dados. Lança ValueError se data_fim for inválida.
+    """
+    if filtros.get('tipo'):
+        query = query.eq('tipo_id', filtros['tipo'])
+    if filtros.get('porteiro'):
+        query = query.eq('porteiro_id', filtros['porteiro'])
+    if incluir_status and filtros.get('status'):
+        query = query.eq('status', filtros['status'])
+    intervalo = intervalo_datas(filtros)
+    if intervalo:
+        query = query.gte('criado_em', intervalo[0]).lte('criado_em', intervalo[1])
+    if filtros.get('numero_os'):
+        query = query.eq('numero_os', filtros['numero_os'])
+    if busca_dados:
+        for campo in ('matricula', 'carro'):
+            if filtros.get(campo):
+                query = query.ilike(COLUNA_BUSCA_DADOS, padrao_busca(filtros[campo]))
+    return query
+
+def filtrar_dados_localmente(filtros):
+    """Indica se os filtros de matrícula/carro precisam ser aplicados no Python"""
+    if not (filtros.get('matricula') or filtros.get('carro')):
+        return False
+    return not busca_dados_no_servidor()
+
+def codificar_cursor(relatorio):
+    """Codifica a posição (criado_em, id) de um relatório como cursor opaco"""
+    posicao = json.dumps({'criado_em': relatorio['criado_em'], 'id': relatorio['id']})
+    return base64.urlsafe_b64encode(posicao.encode('utf-8')).decode('ascii')
+
+def validar_posicao_cursor(criado_em, relatorio_id):
+    """
+    Confere se criado_em é uma data ISO (ou None, coluna sem valor) e o id um
+    UUID antes de interpolar a posição no filtro do PostgREST. Lança
+    ValueError se não forem.
+    """
+    if criado_em is not None and not isinstance(criado_em, str):
+        raise ValueError('Posição de cursor inválida')
+    if not isinstance(relatorio_id, str):
+        raise ValueError('Posição de cursor inválida')
+    if criado_em is not None:
+        datetime.fromisoformat(criado_em)
+    return criado_em, str(uuid.UUID(relatorio_id))
+
+def decodificar_cursor(cursor):
+    """Retorna a tupla (criado_em, id) de um cursor gerado por codificar_cursor"""
+    posicao = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return validar_posicao_cursor(posicao['criado_em'], posicao['id'])
+
+def aplicar_cursor(query, criado_em, relatorio_id):
+    """
+    Restringe a query aos relatórios posteriores ao cursor na ordenação
+    (criado_em desc, id desc): criado_em < c OU (criado_em = c E id < i).
+
+    criado_em aceita NULL e, em ordem decrescente, o Postgres põe os NULLs
+    primeiro. Depois de um relatório sem criado_em vêm os demais sem data
+    com id menor e, em seguida, todos os que têm data.
+    """
+    criado_em, relatorio_id = validar_posicao_cursor(criado_em, relatorio_id)
+    if criado_em is None:
+        filtro = (
+            f'and(criado_em.is.null,id.lt.{relatorio_id}),'
+            f'criado_em.not.is.null'
+        )
+    else:
+        filtro = (
+            f'criado_em.lt."{criado_em}",'
+            f'and(criado_em.eq."{criado_em}",id.lt.{relatorio_id})'
+        )
+    query.params = query.params.add('or', f'({filtro})')
+    return query
+
+STATUS_VALIDOS = ['PENDENTE', 'EM_DP', 'EM_TRAFEGO', 'COBRADO', 'FINALIZADA']
+
+def dados_atualizacao_status(data):
+    """
+    Monta o update de status (com valor, motorista e documentos opcionais).
+    Lança ValueError com a mensagem para o usuário se o status for inválido.
+    """
+    novo_status = data.get('status')
+    if not novo_status:
+        raise ValueError('Status não fornecido')
+    if novo_status not in STATUS_VALIDOS:
+        raise ValueError(
+            f"Status inválido: {novo_status}. Status válidos: {', '.join(STATUS_VALIDOS)}"
+        )
+
+    update_data = {'status': novo_status}
+
+    if 'valor' in data:
+        update_data['valor'] = data['valor']
+    if 'motorista' in data:
+        update_data['motorista'] = data['motorista']
+    if 'documentos' in data:
+        # Converter array de documentos para objeto se necessário
+        documentos = data['documentos']
+        if isinstance(documentos, list):
+            # Converter array para objeto com chaves numeradas
+            documentos_obj = {}
+            for i, doc in enumerate(documentos):
+                documentos_obj[f'doc_{i+1}'] = doc
+            update_data['documentos'] = documentos_obj
+        else:
+            update_data['documentos'] = documentos
+
+    return update_data
+
+# Sincronização incremental das filas (database/schema/add_atualizado_em.sql)
+# A marca d'água é o relógio da aplicação; cada consulta recua DELTA_MARGEM
+# segundos para cobrir transações em andamento e diferença de relógio com o
+# banco. Reenviar uma alteração é inofensivo: o navegador mescla por id.
+DELTA_MARGEM_SEGUNDOS = Config.DELTA_MARGEM_SEGUNDOS
+DELTA_LIMITE = Config.DELTA_LIMITE
+
+_delta_no_servidor = True
+_removidos_no_servidor = True
+
+def fila_completa(status):
+    """Todos os relatórios da fila, do mais recente para o mais antigo"""
+    response = supabase_service.get_table('relatorios').select('*').eq(
+        'status', status
+    ).order('criado_em', desc=True).execute()
+    return response.data or []
+
+def alteracoes_da_fila(status, desde):
+    """
+    Retorna (alterados, removidos) desde a data informada, ou None quando há
+    alterações demais para valer a pena o delta. Alterados são os relatórios
+    da fila que mudaram; removidos são ids que saíram da fila (mudaram de
+    status) ou foram excluídos. Ids que nunca estiveram na fila do navegador
+    são simplesmente ignorados por ele.
+    """
+    global _removidos_no_servidor
+
+    alterados = supabase_service.get_table('relatorios').select('*').eq(
+        'status', status
+    ).gte('atualizado_em', desde).order('atualizado_em').limit(
+        DELTA_LIMITE + 1
+    ).execute().data or []
+
+    sairam = supabase_service.get_table('relatorios').select('id').neq(
+        'status', status
+    ).gte('atualizado_em', desde).limit(DELTA_LIMITE + 1).execute().data or []
+
+    if len(alterados) > DELTA_LIMITE or len(sairam) > DELTA_LIMITE:
+        return None
+
+    removidos = [r['id'] for r in sairam]
+    if _removidos_no_servidor:
+        try:
+            excluidos = supabase_service.get_table('relatorios_removidos').select('id').gte(
+                'removido_em', desde
+            ).limit(DELTA_LIMITE + 1).execute().data or []
+            if len(excluidos) > DELTA_LIMITE:
+                return None
+            removidos += [r['id'] for r in excluidos]
+        except APIError as e:
+            if not recurso_ausente_no_servidor(e):
+                raise
+            logger.warning(f"Tabela relatorios_removidos indisponível: {e.message}")
+            _removidos_no_servidor = False
+
+    return alterados, removidos
+
+def sincronizar_fila(status, desde=None):
+    """
+    Retorna (relatorios, removidos, completo) de uma fila. Com `desde`
+    (datetime), apenas o que mudou depois dele, recuando DELTA_MARGEM
+    segundos; sem ele, ou quando o delta não é possível (alterações demais ou
+    add_atualizado_em.sql não aplicado), a fila inteira com completo=True.
+    """
+    global _delta_no_servidor
+
+    if desde and _delta_no_servidor:
+        desde = desde - timedelta(seconds=DELTA_MARGEM_SEGUNDOS)
+        try:
+            alteracoes = alteracoes_da_fila(status, desde.isoformat())
+        except APIError as e:
+            if not recurso_ausente_no_servidor(e):
+                raise
+            logger.warning(
+                f"Coluna atualizado_em indisponível, enviando filas completas: {e.message}"
+            )
+            _delta_no_servidor = False
+        else:
+            if alteracoes is not None:
+                relatorios, removidos = alteracoes
+                return relatorios, removidos, False
+
+    return fila_completa(status), [], True
+
+class ReservaNumerosOS:
+    """
+    Bloco de números de OS reservados da sequência do banco
+
+    Com `tamanho_bloco` 0 nenhum número é gerado na aplicação: o trigger de
+    add_numero_os.sql atribui o número no INSERT (zero round-trips). Com um
+    bloco positivo, uma chamada a `reservar_numeros_os` reserva vários
+    números de uma vez e eles são consumidos localmente por este processo.
+    Como todos vêm de `nextval`, não há colisão entre workers; números de um
+    bloco não usado até o fim do processo são simplesmente pulados.
+    """
+
+    def __init__(self, tamanho_bloco: int = 0):
+        self.tamanho_bloco = max(tamanho_bloco, 0)
+        self._numeros = []
+        self._lock = threading.Lock()
+
+    def _reservar_bloco(self):
+        response = supabase_service.client.rpc(
+            'reservar_numeros_os', {'p_quantidade': self.tamanho_bloco}
+        ).execute()
+        numeros = [linha['numero'] for linha in response.data or []]
+        if not numeros:
+            raise RuntimeError('Nenhum número de OS reservado')
+        return numeros
+
+    def proximo(self):
+        """Retorna o próximo número de OS, ou None para deixar o trigger gerar"""
+        if not self.tamanho_bloco:
+            return None
+
+        with self._lock:
+            if not self._numeros:
+                self._numeros = self._reservar_bloco()
+            numero = self._numeros.pop(0)
+
+        return formatar_numero_os(numero)
+
+def formatar_numero_os(numero, ano=None):
+    """Formata o número no padrão do trigger: OS-2024-000001"""
+    ano = ano or datetime.now().year
+    return f"OS-{ano}-{int(numero):06d}"
+
+reserva_numeros_os = ReservaNumerosOS(Config.NUMERO_OS_BLOCO)
+
+def gerar_numero_os():
+    """
+    Gera número sequencial para OS
 
+    Retorna None quando o número fica a cargo do trigger do banco. Erros na
+    reserva são propagados: gerar um número fora da sequência poderia
+    colidir com os já emitidos.
+    """
+    return reserva_numeros_os.proximo()
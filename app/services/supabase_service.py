@@ -1,19 +1,36 @@
 """
 Serviço para integração com Supabase
 """
-from supabase import create_client, Client
 from config.settings import Config
+from collections import OrderedDict
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 class SupabaseService:
-    """Serviço para operações com Supabase"""
+    """
+    Serviço para operações com Supabase
+
+    O cliente só é criado no primeiro uso: importar a aplicação (testes,
+    scripts, cada worker ao subir) não paga a criação nem o import do SDK.
+    """
     
     def __init__(self):
-        """Inicializa o cliente Supabase"""
-        Config.validate()
-        self.client: Client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, nome):
+        """Cria o cliente no primeiro acesso a `client` (só chamado enquanto ele não existe)"""
+        if nome != 'client':
+            raise AttributeError(nome)
+        with self._lock:
+            if 'client' not in self.__dict__:
+                from supabase import create_client
+                Config.validate()
+                self.client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+                logger.info("Cliente Supabase inicializado")
+        return self.__dict__['client']
     
     def setup_storage(self):
         """Configura o storage do Supabase"""
@@ -43,6 +60,74 @@ class SupabaseService:
         """Retorna referência para o storage"""
         return self.client.storage
 
+class TTLCache:
+    """
+    Cache em memória para tabelas de referência (tipos_relatorio, porteiros)
+
+    Cada item expira após `ttl` segundos e, ao atingir `max_itens`, o item
+    usado há mais tempo é descartado. As chaves são tuplas cujo primeiro
+    elemento é o nome da tabela, o que permite invalidar tudo o que foi
+    carregado de uma tabela de uma só vez.
+    """
+    
+    def __init__(self, ttl: int = 300, max_itens: int = 128):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, chave, padrao=None):
+        """Retorna o valor em cache ou `padrao` se ausente/expirado"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return padrao
+            
+            expira_em, valor = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                return padrao
+            
+            self._itens.move_to_end(chave)
+            return valor
+    
+    def set(self, chave, valor):
+        """Armazena um valor, descartando o mais antigo se o limite for atingido"""
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+    
+    def get_or_load(self, chave, carregar):
+        """Retorna o valor em cache ou executa `carregar()` e armazena o resultado"""
+        valor = self.get(chave)
+        if valor is None:
+            valor = carregar()
+            self.set(chave, valor)
+        return valor
+    
+    def invalidate(self, tabela=None):
+        """Remove os itens de uma tabela ou, sem argumento, todo o cache"""
+        with self._lock:
+            if tabela is None:
+                self._itens.clear()
+                return
+            
+            for chave in [c for c in self._itens if c[0] == tabela]:
+                del self._itens[chave]
+
 # Instância global do serviço
 supabase_service = SupabaseService()
 
+# Cache global das tabelas de referência
+cache_referencia = TTLCache(
+    ttl=Config.REFERENCIA_CACHE_TTL,
+    max_itens=Config.REFERENCIA_CACHE_MAX_ITENS
+)
+
+def invalidar_cache_referencia(tabela=None):
+    """Hook de invalidação: chamar após alterar tipos_relatorio ou porteiros"""
+    cache_referencia.invalidate(tabela)
+    logger.info(f"Cache de referência invalidado: {tabela or 'todas as tabelas'}")
+
@@ -274,9 +274,30 @@ class AlertManager:
             except Exception as e:
                 monitoring_logger.error(f"Erro ao verificar alertas: {e}")
 
-# Instância global do coletor de métricas
-metrics_collector = MetricsCollector()
-alert_manager = AlertManager(metrics_collector)
+# Instâncias globais criadas no primeiro uso: importar este módulo não
+# registra métricas nem inicia as threads de limpeza e de alertas
+_metrics_collector = None
+_alert_manager = None
+_instancias_lock = threading.Lock()
+
+def get_metrics_collector() -> MetricsCollector:
+    """Retorna o coletor de métricas global, criando-o se necessário"""
+    global _metrics_collector
+    if _metrics_collector is None:
+        with _instancias_lock:
+            if _metrics_collector is None:
+                _metrics_collector = MetricsCollector()
+    return _metrics_collector
+
+def get_alert_manager() -> AlertManager:
+    """Retorna o gerenciador de alertas global, criando-o se necessário"""
+    global _alert_manager
+    collector = get_metrics_collector()
+    if _alert_manager is None:
+        with _instancias_lock:
+            if _alert_manager is None:
+                _alert_manager = AlertManager(collector)
+    return _alert_manager
 
 def get_metrics():
     """Retorna métricas no formato Prometheus"""
@@ -284,8 +305,8 @@ def get_metrics():
 
 def record_request_metrics(method: str, endpoint: str, status: int, duration: float):
     """Função helper para registrar métricas de requisição"""
-    metrics_collector.record_request(method, endpoint, status, duration)
+    get_metrics_collector().record_request(method, endpoint, status, duration)
 
 def record_error_metrics(error_type: str, endpoint: str, error_message: str):
     """Função helper para registrar métricas de erro"""
-    metrics_collector.record_error(error_type, endpoint, error_message)
+    get_metrics_collector().record_error(error_type, endpoint, error_message)
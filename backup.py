@@ -4,9 +4,14 @@
 Módulo de backup para o Sistema de Relatórios
 """
 
-from app.services.backup_service import create_backup, get_backup_status, list_backups
+from app.services.backup_service import (
+    BACKUP_MODOS, create_backup, get_backup_status, list_backups, restore_backup, get_backup_manager
+)
 
-__all__ = ['create_backup', 'get_backup_status', 'list_backups']
+__all__ = [
+    'BACKUP_MODOS', 'create_backup', 'get_backup_status', 'list_backups', 'restore_backup',
+    'get_backup_manager'
+]
 
 
 
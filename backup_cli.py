@@ -7,8 +7,11 @@ Uso: python backup_cli.py [comando] [opções]
 
 import sys
 import json
+import logging
 from datetime import datetime
-from backup import create_backup, get_backup_status, list_backups
+from backup import (
+    BACKUP_MODOS, create_backup, get_backup_status, list_backups, restore_backup, get_backup_manager
+)
 
 def print_help():
     """Mostra ajuda do script"""
@@ -21,15 +24,21 @@ Uso: python backup_cli.py [comando]
 Comandos disponíveis:
   status          - Mostra status dos backups
   list            - Lista todos os backups
-  create [tipo]   - Cria um novo backup (tipo: manual, automated, weekly)
+  create [tipo] [modo] - Cria um novo backup (tipo: manual, automated, weekly;
+                    modo: completo ou incremental, padrão BACKUP_MODO)
   info [id]       - Mostra informações detalhadas de um backup
+  restore [id]    - Reconstrói um backup em backups/restore_<nome>
+  daemon          - Executa os backups agendados em primeiro plano
   help            - Mostra esta ajuda
 
 Exemplos:
   python backup_cli.py status
   python backup_cli.py create manual
   python backup_cli.py list
+  python backup_cli.py create manual incremental
   python backup_cli.py info 1
+  python backup_cli.py restore 1
+  BACKUP_AUTOMATICO=false (na aplicação) + python backup_cli.py daemon
 """)
 
 def print_status():
@@ -82,18 +91,20 @@ def print_list():
     except Exception as e:
         print(f"❌ Erro ao listar backups: {e}")
 
-def create_new_backup(backup_type="manual"):
+def create_new_backup(backup_type="manual", mode=None):
     """Cria um novo backup"""
     try:
         print(f"\n🔄 Criando backup do tipo '{backup_type}'...")
-        result = create_backup(backup_type)
+        result = create_backup(backup_type, mode)
         
         if result['status'] == 'completed':
             print("✅ Backup criado com sucesso!")
             print(f"   Nome: {result['name']}")
             print(f"   ID: {result['id']}")
             print(f"   Tamanho: {result.get('size', 0) / 1024:.1f} KB")
-            print(f"   Arquivo: {result.get('zip_path', 'N/A')}")
+            print(f"   Arquivo: {result.get('zip_path') or result.get('manifest_path', 'N/A')}")
+            if result.get('mode') == 'incremental':
+                print(f"   Arquivos: {len(result['files'])} ({result['new_objects']} com conteúdo novo)")
         else:
             print(f"❌ Erro ao criar backup: {result.get('error', 'Erro desconhecido')}")
             
@@ -141,6 +152,29 @@ def print_backup_info(backup_id):
     except Exception as e:
         print(f"❌ Erro ao obter informações: {e}")
 
+def restore(backup_id):
+    """Reconstrói um backup em um diretório de restauração"""
+    try:
+        result = restore_backup(int(backup_id))
+        if result['success']:
+            print(f"✅ Backup restaurado em: {result['restore_path']}")
+        else:
+            print(f"❌ Erro ao restaurar backup: {result['error']}")
+    except ValueError:
+        print("❌ ID do backup deve ser um número")
+
+def run_daemon():
+    """Executa o agendamento de backups em primeiro plano"""
+    logging.basicConfig(level=logging.INFO)
+    manager = get_backup_manager()
+    print("\n🕒 Agendamento de backups iniciado (Ctrl+C para encerrar)")
+    print(f"   Lock de liderança: {manager.scheduler_lock_file}")
+    print("   Se outro processo já for o líder, este aguarda para assumir.")
+    try:
+        manager.run_scheduler()
+    except KeyboardInterrupt:
+        print("\n👋 Agendamento encerrado")
+
 def main():
     """Função principal"""
     if len(sys.argv) < 2:
@@ -157,12 +191,24 @@ def main():
         print_list()
     elif command == "create":
         backup_type = sys.argv[2] if len(sys.argv) > 2 else "manual"
-        create_new_backup(backup_type)
+        mode = sys.argv[3].lower() if len(sys.argv) > 3 else None
+        if mode is not None and mode not in BACKUP_MODOS:
+            print(f"❌ Modo inválido: {sys.argv[3]}")
+            print(f"❌ Uso: python backup_cli.py create [tipo] [{'|'.join(BACKUP_MODOS)}]")
+            return
+        create_new_backup(backup_type, mode)
     elif command == "info":
         if len(sys.argv) < 3:
             print("❌ Uso: python backup_cli.py info [id]")
             return
         print_backup_info(sys.argv[2])
+    elif command == "restore":
+        if len(sys.argv) < 3:
+            print("❌ Uso: python backup_cli.py restore [id]")
+            return
+        restore(sys.argv[2])
+    elif command == "daemon":
+        run_daemon()
     else:
         print(f"❌ Comando desconhecido: {command}")
         print_help()
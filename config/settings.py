@@ -2,6 +2,7 @@
 Configurações da aplicação
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,8 +16,48 @@ class Config:
     # Configurações de logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     
+    # Log de requisições: fração amostrada e limite para requisições lentas
+    LOG_REQUESTS_AMOSTRA = float(os.environ.get('LOG_REQUESTS_AMOSTRA', 0.1))
+    LOG_REQUESTS_LENTAS_MS = int(os.environ.get('LOG_REQUESTS_LENTAS_MS', 1000))
+    
     # Configurações de backup
     BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+    # Agendamento diário/semanal, iniciado na primeira requisição do processo
+    BACKUP_AUTOMATICO = os.environ.get('BACKUP_AUTOMATICO', 'true').lower() == 'true'
+    # 'completo' (ZIP por backup) ou 'incremental' (conteúdo único + manifestos)
+    BACKUP_MODO = os.environ.get('BACKUP_MODO', 'completo')
+    
+    # Cache das tabelas de referência (tipos_relatorio, porteiros)
+    REFERENCIA_CACHE_TTL = int(os.environ.get('REFERENCIA_CACHE_TTL', 300))
+    REFERENCIA_CACHE_MAX_ITENS = int(os.environ.get('REFERENCIA_CACHE_MAX_ITENS', 1024))
+    
+    # Exportações em segundo plano
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', 'exports')
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+    EXPORT_JOB_TTL = int(os.environ.get('EXPORT_JOB_TTL', 3600))
+    
+    # Fotos: conexões simultâneas com o Storage e redimensionamento (Pillow)
+    UPLOAD_FOTOS_WORKERS = int(os.environ.get('UPLOAD_FOTOS_WORKERS', 4))
+    FOTO_MAX_LADO = int(os.environ.get('FOTO_MAX_LADO', 1920))
+    FOTO_QUALIDADE = int(os.environ.get('FOTO_QUALIDADE', 82))
+    FOTO_THUMB_LADO = int(os.environ.get('FOTO_THUMB_LADO', 320))
+    FOTOS_PROCESSANDO_TIMEOUT = int(os.environ.get('FOTOS_PROCESSANDO_TIMEOUT', 900))
+    
+    # Filas do DP/Tráfego: atualização em lote e sincronização incremental
+    MAX_RELATORIOS_LOTE = int(os.environ.get('MAX_RELATORIOS_LOTE', 500))
+    DELTA_MARGEM_SEGUNDOS = int(os.environ.get('DELTA_MARGEM_SEGUNDOS', 10))
+    DELTA_LIMITE = int(os.environ.get('DELTA_LIMITE', 500))
+    
+    # Números de OS reservados por processo (0 = gerados pelo trigger)
+    NUMERO_OS_BLOCO = int(os.environ.get('NUMERO_OS_BLOCO', 0))
+    
+    # Eventos em tempo real: 'memoria' (um processo) ou 'arquivo' (vários workers);
+    # sem valor, 'arquivo' se WEB_CONCURRENCY > 1
+    EVENTOS_BACKEND = os.environ.get('EVENTOS_BACKEND')
+    EVENTOS_ARQUIVO = os.environ.get(
+        'EVENTOS_ARQUIVO', os.path.join(tempfile.gettempdir(), 'sistema-relatorios-eventos.log')
+    )
+    EVENTOS_KEEPALIVE = int(os.environ.get('EVENTOS_KEEPALIVE', 15))
     
     @staticmethod
     def validate():
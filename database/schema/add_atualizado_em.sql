@@ -0,0 +1,75 @@
+-- Script para adicionar o controle de alterações usado pela sincronização
+-- incremental das filas do DP e do Tráfego (/api/relatorios/delta)
+-- Cada INSERT/UPDATE grava atualizado_em pelo trigger, e relatórios
+-- excluídos ficam registrados em relatorios_removidos. A API devolve apenas
+-- o que mudou desde a marca d'água enviada pelo navegador.
+--
+-- Enquanto este script não for aplicado a API responde sempre com a fila
+-- completa (completo: true), como a listagem por status.
+
+-- Relatórios existentes começam com a data de criação (apenas na primeira
+-- execução, para não apagar alterações já registradas)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'relatorios'
+          AND column_name = 'atualizado_em'
+    ) THEN
+        ALTER TABLE public.relatorios
+        ADD COLUMN atualizado_em TIMESTAMP WITH TIME ZONE DEFAULT now();
+
+        UPDATE public.relatorios SET atualizado_em = COALESCE(criado_em, now());
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_relatorios_atualizado_em
+    ON public.relatorios (atualizado_em);
+
+CREATE INDEX IF NOT EXISTS idx_relatorios_status_atualizado_em
+    ON public.relatorios (status, atualizado_em);
+
+CREATE OR REPLACE FUNCTION public.marcar_relatorio_atualizado()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.atualizado_em := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_relatorios_atualizado_em ON public.relatorios;
+CREATE TRIGGER trigger_relatorios_atualizado_em
+    BEFORE INSERT OR UPDATE ON public.relatorios
+    FOR EACH ROW
+    EXECUTE FUNCTION public.marcar_relatorio_atualizado();
+
+-- Exclusões: sem a linha não há atualizado_em, então o id é guardado aqui
+CREATE TABLE IF NOT EXISTS public.relatorios_removidos (
+    id UUID PRIMARY KEY,
+    removido_em TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_relatorios_removidos_removido_em
+    ON public.relatorios_removidos (removido_em);
+
+CREATE OR REPLACE FUNCTION public.registrar_relatorio_removido()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.relatorios_removidos (id) VALUES (OLD.id)
+    ON CONFLICT (id) DO UPDATE SET removido_em = now();
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_relatorios_removidos ON public.relatorios;
+CREATE TRIGGER trigger_relatorios_removidos
+    AFTER DELETE ON public.relatorios
+    FOR EACH ROW
+    EXECUTE FUNCTION public.registrar_relatorio_removido();
+
+-- Registros de exclusão antigos podem ser apagados periodicamente; um
+-- navegador com marca d'água anterior a isso recebe a fila completa
+-- ao recarregar a página.
+
+COMMENT ON COLUMN public.relatorios.atualizado_em IS 'Última alteração do relatório (mantida por trigger)';
+COMMENT ON TABLE public.relatorios_removidos IS 'Ids de relatórios excluídos, para a sincronização incremental';
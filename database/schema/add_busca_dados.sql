@@ -0,0 +1,43 @@
+-- Script para permitir os filtros de matrícula e carro no banco de dados
+-- Os filtros "matricula" e "carro" de /api/relatorios, /api/estatisticas e
+-- /api/exportar/html procuram o texto informado dentro de "dados".
+-- O formulário do porteiro grava "dados" como uma string JSON com o texto
+-- do relatório ("• Matrícula: 123\n• Carro: 456..."); registros antigos
+-- podem ter um objeto com chaves (matricula, motorista_matricula, carro,
+-- veiculo, placa...). O campo calculado abaixo normaliza os dois formatos
+-- em texto minúsculo e o índice trigram atende ILIKE '%valor%' sem varrer
+-- a tabela.
+--
+-- Enquanto este script não for aplicado a aplicação continua funcionando,
+-- aplicando os filtros no Python após buscar todos os registros.
+
+-- Extensão de trigramas (no Supabase fica no schema "extensions")
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Campo calculado do PostgREST: pode ser usado em filtros
+-- (dados_busca=ilike.*123*) mas não é incluído em select=*
+CREATE OR REPLACE FUNCTION public.dados_busca(public.relatorios)
+RETURNS TEXT AS $$
+    SELECT lower(
+        CASE
+            WHEN jsonb_typeof($1.dados) = 'string' THEN $1.dados #>> '{}'
+            ELSE $1.dados::text
+        END
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Índice sobre a mesma expressão da função (que é expandida inline pelo
+-- planejador), usado pelos filtros ILIKE
+CREATE INDEX IF NOT EXISTS idx_relatorios_dados_busca_trgm
+    ON public.relatorios
+    USING GIN ((
+        lower(
+            CASE
+                WHEN jsonb_typeof(dados) = 'string' THEN dados #>> '{}'
+                ELSE dados::text
+            END
+        )
+    ) gin_trgm_ops);
+
+-- Comentário explicativo
+COMMENT ON FUNCTION public.dados_busca(public.relatorios) IS 'Texto pesquisável (minúsculo) de relatorios.dados para os filtros de matrícula e carro';
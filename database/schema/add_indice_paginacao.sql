@@ -0,0 +1,18 @@
+-- Script para adicionar índice de paginação por cursor na tabela relatorios
+-- A listagem ordena por (criado_em desc, id desc) e o parâmetro "cursor"
+-- de /api/relatorios filtra a partir da última posição lida:
+--   criado_em < c OR (criado_em = c AND id < i)
+-- Com este índice cada página é uma leitura sequencial curta do índice,
+-- com o mesmo custo independentemente da profundidade da página.
+-- criado_em aceita NULL: esses relatórios vêm primeiro (NULLS FIRST, padrão
+-- de DESC) e o cursor de um deles continua com
+--   (criado_em IS NULL AND id < i) OR criado_em IS NOT NULL
+
+CREATE INDEX IF NOT EXISTS idx_relatorios_criado_em_id
+    ON public.relatorios (criado_em DESC, id DESC);
+
+-- Índices de apoio para os filtros mais usados combinados com a ordenação
+CREATE INDEX IF NOT EXISTS idx_relatorios_status_criado_em
+    ON public.relatorios (status, criado_em DESC, id DESC);
+
+COMMENT ON INDEX public.idx_relatorios_criado_em_id IS 'Paginação por cursor (keyset) da listagem de relatórios';
@@ -0,0 +1,39 @@
+-- Script para calcular as estatísticas do painel no banco de dados
+-- /api/estatisticas chama esta função via RPC e recebe uma linha por status
+-- (GROUP BY status) em vez de baixar os relatórios para contá-los no Python.
+-- Os parâmetros seguem os filtros da API; o filtro de status não é aplicado
+-- aqui porque a contagem por status o ignora (o total é derivado dela).
+-- p_matricula e p_carro recebem o padrão ILIKE já montado pela aplicação
+-- ('%valor%' com curingas escapados) e dependem de add_busca_dados.sql.
+--
+-- Enquanto este script não for aplicado a aplicação continua funcionando,
+-- contando os relatórios a partir de uma consulta apenas da coluna status.
+
+CREATE OR REPLACE FUNCTION public.estatisticas_relatorios(
+    p_tipo TEXT DEFAULT NULL,
+    p_porteiro TEXT DEFAULT NULL,
+    p_data_inicio TEXT DEFAULT NULL,
+    p_data_fim TEXT DEFAULT NULL,
+    p_numero_os TEXT DEFAULT NULL,
+    p_matricula TEXT DEFAULT NULL,
+    p_carro TEXT DEFAULT NULL
+)
+RETURNS TABLE (status TEXT, total BIGINT) AS $$
+    SELECT COALESCE(r.status, 'PENDENTE')::TEXT AS status, COUNT(*) AS total
+    FROM public.relatorios r
+    WHERE (p_tipo IS NULL OR r.tipo_id = p_tipo::INTEGER)
+      AND (p_porteiro IS NULL OR r.porteiro_id = p_porteiro::UUID)
+      AND (p_data_inicio IS NULL OR r.criado_em >= p_data_inicio::TIMESTAMPTZ)
+      AND (p_data_fim IS NULL OR r.criado_em <= p_data_fim::TIMESTAMPTZ)
+      AND (p_numero_os IS NULL OR r.numero_os = p_numero_os)
+      AND (p_matricula IS NULL OR public.dados_busca(r) ILIKE p_matricula)
+      AND (p_carro IS NULL OR public.dados_busca(r) ILIKE p_carro)
+    GROUP BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Permitir a chamada pela API (mesmas permissões de leitura da tabela)
+GRANT EXECUTE ON FUNCTION public.estatisticas_relatorios(
+    TEXT, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT
+) TO anon, authenticated;
+
+COMMENT ON FUNCTION public.estatisticas_relatorios IS 'Contagem de relatórios por status para /api/estatisticas';
@@ -0,0 +1,141 @@
+-- Script para manter contadores de relatórios por dia, tipo, porteiro e status
+-- O painel consulta /api/estatisticas continuamente. Com esta tabela, mantida
+-- por trigger em relatorios, a contagem lê uma linha por combinação
+-- (dia × tipo × porteiro × status) em vez de percorrer todos os relatórios.
+-- O dia é a data de criado_em em UTC, a mesma referência dos filtros
+-- data_inicio/data_fim da API.
+--
+-- Após aplicar o script (ou se os contadores divergirem, por exemplo depois
+-- de uma importação com triggers desativados) execute a reconstrução:
+--   SELECT public.reconstruir_relatorios_contadores();
+-- ou, pelo painel, POST /api/estatisticas/reconstruir (administradores).
+--
+-- Enquanto este script não for aplicado a aplicação continua funcionando,
+-- usando a RPC estatisticas_relatorios ou a contagem pela coluna status.
+-- Requer PostgreSQL 15+ (UNIQUE NULLS NOT DISTINCT).
+
+CREATE TABLE IF NOT EXISTS public.relatorios_contadores (
+    dia DATE NOT NULL,
+    tipo_id INTEGER NULL,
+    porteiro_id UUID NULL,
+    status VARCHAR(20) NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    CONSTRAINT relatorios_contadores_chave
+        UNIQUE NULLS NOT DISTINCT (dia, tipo_id, porteiro_id, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_relatorios_contadores_dia
+    ON public.relatorios_contadores (dia);
+
+-- Soma "delta" ao contador da combinação informada
+CREATE OR REPLACE FUNCTION public.ajustar_relatorios_contador(
+    p_criado_em TIMESTAMPTZ,
+    p_tipo_id INTEGER,
+    p_porteiro_id UUID,
+    p_status TEXT,
+    p_delta INTEGER
+)
+RETURNS VOID AS $$
+    INSERT INTO public.relatorios_contadores AS c
+        (dia, tipo_id, porteiro_id, status, total)
+    VALUES (
+        (p_criado_em AT TIME ZONE 'UTC')::DATE,
+        p_tipo_id,
+        p_porteiro_id,
+        COALESCE(p_status, 'PENDENTE'),
+        p_delta
+    )
+    ON CONFLICT ON CONSTRAINT relatorios_contadores_chave
+    DO UPDATE SET total = c.total + EXCLUDED.total;
+$$ LANGUAGE sql;
+
+-- Trigger: move o relatório entre contadores a cada inserção, exclusão ou
+-- alteração das colunas agrupadas (normalmente a mudança de status)
+CREATE OR REPLACE FUNCTION public.atualizar_relatorios_contadores()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.ajustar_relatorios_contador(
+            OLD.criado_em, OLD.tipo_id, OLD.porteiro_id, OLD.status, -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.ajustar_relatorios_contador(
+            NEW.criado_em, NEW.tipo_id, NEW.porteiro_id, NEW.status, 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trigger_relatorios_contadores ON public.relatorios;
+CREATE TRIGGER trigger_relatorios_contadores
+    AFTER INSERT OR DELETE OR UPDATE OF status, tipo_id, porteiro_id, criado_em
+    ON public.relatorios
+    FOR EACH ROW
+    EXECUTE FUNCTION public.atualizar_relatorios_contadores();
+
+-- Reconstrução completa a partir de relatorios (backfill)
+-- O lock em relatorios impede alterações durante a recontagem, para que
+-- nenhuma atualização do trigger seja perdida.
+CREATE OR REPLACE FUNCTION public.reconstruir_relatorios_contadores()
+RETURNS BIGINT AS $$
+DECLARE
+    combinacoes BIGINT;
+BEGIN
+    LOCK TABLE public.relatorios IN SHARE MODE;
+    DELETE FROM public.relatorios_contadores;
+
+    INSERT INTO public.relatorios_contadores
+        (dia, tipo_id, porteiro_id, status, total)
+    SELECT (criado_em AT TIME ZONE 'UTC')::DATE,
+           tipo_id,
+           porteiro_id,
+           COALESCE(status, 'PENDENTE'),
+           COUNT(*)
+    FROM public.relatorios
+    GROUP BY 1, 2, 3, 4;
+
+    GET DIAGNOSTICS combinacoes = ROW_COUNT;
+    RETURN combinacoes;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Soma dos contadores por status para /api/estatisticas: a resposta tem uma
+-- linha por status, sem o limite de linhas (max-rows) do PostgREST que
+-- cortaria a leitura direta da tabela. Os parâmetros seguem os filtros da
+-- API (tipo, porteiro e o intervalo de dias, ambos inclusivos).
+CREATE OR REPLACE FUNCTION public.estatisticas_contadores(
+    p_tipo TEXT DEFAULT NULL,
+    p_porteiro TEXT DEFAULT NULL,
+    p_data_inicio TEXT DEFAULT NULL,
+    p_data_fim TEXT DEFAULT NULL
+)
+RETURNS TABLE (status TEXT, total BIGINT) AS $$
+    SELECT c.status::TEXT AS status, SUM(c.total)::BIGINT AS total
+    FROM public.relatorios_contadores c
+    WHERE (p_tipo IS NULL OR c.tipo_id = p_tipo::INTEGER)
+      AND (p_porteiro IS NULL OR c.porteiro_id = p_porteiro::UUID)
+      AND (p_data_inicio IS NULL OR c.dia >= p_data_inicio::DATE)
+      AND (p_data_fim IS NULL OR c.dia <= p_data_fim::DATE)
+    GROUP BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Contadores são somente leitura pela API. A reconstrução bloqueia relatorios
+-- e só pode ser chamada pelo backend com a chave service_role, pela rota
+-- /api/estatisticas/reconstruir (restrita a administradores)
+GRANT SELECT ON public.relatorios_contadores TO anon, authenticated;
+REVOKE ALL ON FUNCTION public.ajustar_relatorios_contador(
+    TIMESTAMPTZ, INTEGER, UUID, TEXT, INTEGER
+) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.estatisticas_contadores(
+    TEXT, TEXT, TEXT, TEXT
+) TO anon, authenticated;
+REVOKE ALL ON FUNCTION public.reconstruir_relatorios_contadores()
+    FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reconstruir_relatorios_contadores()
+    TO service_role;
+
+COMMENT ON TABLE public.relatorios_contadores IS 'Contagem de relatórios por dia (UTC), tipo, porteiro e status, mantida por trigger';
+COMMENT ON FUNCTION public.estatisticas_contadores IS 'Soma de relatorios_contadores por status para /api/estatisticas';
+COMMENT ON FUNCTION public.reconstruir_relatorios_contadores IS 'Recalcula relatorios_contadores a partir de relatorios';
@@ -0,0 +1,36 @@
+-- Script para reservar números de OS a partir da sequência
+-- A aplicação pode pedir um bloco de números de uma vez (uma única chamada
+-- RPC) e consumi-lo localmente, em vez de procurar o próximo número livre
+-- com uma consulta por candidato. Depende de add_numero_os.sql.
+--
+-- O trigger passa a respeitar um numero_os já informado no INSERT; quando
+-- ele vem vazio, o número continua sendo gerado pela sequência no banco.
+
+CREATE OR REPLACE FUNCTION public.reservar_numeros_os(p_quantidade INTEGER DEFAULT 1)
+RETURNS TABLE (numero BIGINT) AS $$
+    SELECT nextval('public.relatorios_numero_os_seq')
+    FROM generate_series(1, GREATEST(p_quantidade, 1));
+$$ LANGUAGE sql VOLATILE;
+
+-- Gerar o número apenas quando a aplicação não reservou um
+CREATE OR REPLACE FUNCTION gerar_numero_os()
+RETURNS TRIGGER AS $$
+DECLARE
+    proximo_numero INTEGER;
+    ano_atual VARCHAR(4);
+BEGIN
+    IF NEW.numero_os IS NOT NULL AND NEW.numero_os <> '' THEN
+        RETURN NEW;
+    END IF;
+
+    SELECT nextval('public.relatorios_numero_os_seq') INTO proximo_numero;
+    SELECT EXTRACT(YEAR FROM CURRENT_DATE)::VARCHAR INTO ano_atual;
+
+    -- Formatar o número: OS-2024-000001
+    NEW.numero_os := 'OS-' || ano_atual || '-' || LPAD(proximo_numero::VARCHAR, 6, '0');
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION public.reservar_numeros_os(INTEGER) IS 'Reserva um bloco de números da sequência de OS';
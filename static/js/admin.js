@@ -10,7 +10,8 @@ function ampliarFoto(urlFoto, index = 0) {
     
     // Coletar todas as fotos disponíveis
     const photoElements = document.querySelectorAll('#galeria-fotos img');
-    fotosArray = Array.from(photoElements).map(img => img.src);
+    // As miniaturas guardam a URL da foto original em data-full
+    fotosArray = Array.from(photoElements).map(img => img.dataset.full || img.src);
     
     currentPhotoIndex = index;
 
@@ -144,6 +145,8 @@ document.addEventListener('DOMContentLoaded', function() {
     let currentPage = 1;
     const itemsPerPage = 10;
     let totalRelatorios = 0;
+    // Cursor de início de cada página já visitada (paginação por keyset)
+    let cursoresPagina = { 1: '' };
     let filtrosAtivos = {
         tipo: null,
         porteiro: null,
@@ -188,6 +191,32 @@ document.addEventListener('DOMContentLoaded', function() {
         configurarDatePicker();
         configurarEventos();
         configurarEventosExportacao();
+        conectarEventos();
+    }
+    
+    // Atualizar painel quando o servidor avisar de novos relatórios ou
+    // mudanças de status (SSE), em vez de consultar periodicamente
+    function conectarEventos() {
+        if (!window.EventSource) return;
+        
+        let timerAtualizacao = null;
+        const eventos = new EventSource('/api/eventos?tipos=relatorio_criado,status_alterado');
+        
+        function aoReceber() {
+            clearTimeout(timerAtualizacao);
+            timerAtualizacao = setTimeout(async () => {
+                // Fora da primeira página a listagem fica como está
+                if (currentPage === 1) {
+                    await carregarRelatorios();
+                }
+                await carregarEstatisticas();
+            }, 1000);
+        }
+        
+        eventos.addEventListener('relatorio_criado', aoReceber);
+        eventos.addEventListener('status_alterado', aoReceber);
+        // Avisos perdidos no servidor: recarregar a listagem e as estatísticas
+        eventos.addEventListener('resync', aoReceber);
     }
     
     // Configurar o filtro de status
@@ -288,6 +317,16 @@ document.addEventListener('DOMContentLoaded', function() {
                 await exportarParaPDF();
             });
         }
+        
+        ['csv', 'xlsx'].forEach(formato => {
+            const btn = document.getElementById(`btnExportar${formato.toUpperCase()}`);
+            if (btn) {
+                btn.addEventListener('click', (e) => {
+                    e.preventDefault();
+                    exportarRelatorios(formato);
+                });
+            }
+        });
     }
     
     // Carregar opções de filtro
@@ -345,6 +384,7 @@ document.addEventListener('DOMContentLoaded', function() {
         filtrosAtivos.numeroOS = numeroOSSelecionado || null;
         filtrosAtivos.matricula = matriculaSelecionada || null;
         filtrosAtivos.carro = carroSelecionado || null;
+        cursoresPagina = { 1: '' };
         
         await carregarRelatorios();
         await carregarEstatisticas();
@@ -376,6 +416,7 @@ document.addEventListener('DOMContentLoaded', function() {
         };
 
         currentPage = 1;
+        cursoresPagina = { 1: '' };
         await carregarRelatorios();
         await carregarEstatisticas();
     }
@@ -394,10 +435,17 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
         
         try {
+            // Páginas alcançadas em sequência usam o cursor; saltos diretos
+            // para uma página ainda não visitada usam page/per_page
+            const cursor = cursoresPagina[currentPage];
             const params = new URLSearchParams({
-                page: currentPage,
                 per_page: itemsPerPage
             });
+            if (cursor !== undefined) {
+                params.append('cursor', cursor);
+            } else {
+                params.append('page', currentPage);
+            }
             
             if (filtrosAtivos.tipo) params.append('tipo', filtrosAtivos.tipo);
             if (filtrosAtivos.porteiro) params.append('porteiro', filtrosAtivos.porteiro);
@@ -412,7 +460,12 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             
             const data = await response.json();
-            totalRelatorios = data.count || 0;
+            if (data.count !== null && data.count !== undefined) {
+                totalRelatorios = data.count;
+            }
+            if (cursor !== undefined && data.next_cursor) {
+                cursoresPagina[currentPage + 1] = data.next_cursor;
+            }
             renderizarRelatorios(data.data || []);
             renderizarPaginacao();
         } catch (error) {
@@ -637,15 +690,7 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
 
         try {
-            const params = new URLSearchParams();
-            if (filtrosAtivos.tipo) params.append('tipo', filtrosAtivos.tipo);
-            if (filtrosAtivos.porteiro) params.append('porteiro', filtrosAtivos.porteiro);
-            if (filtrosAtivos.status) params.append('status', filtrosAtivos.status);
-            if (filtrosAtivos.numeroOS) params.append('numero_os', filtrosAtivos.numeroOS);
-            if (filtrosAtivos.matricula) params.append('matricula', filtrosAtivos.matricula);
-            if (filtrosAtivos.carro) params.append('carro', filtrosAtivos.carro);
-            if (filtrosAtivos.dataInicio) params.append('data_inicio', formatarDataParaAPI(filtrosAtivos.dataInicio));
-            if (filtrosAtivos.dataFim) params.append('data_fim', formatarDataParaAPI(filtrosAtivos.dataFim));
+            const params = parametrosFiltros();
             
             const response = await fetch(`/api/estatisticas?${params}`);
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
@@ -754,17 +799,20 @@ document.addEventListener('DOMContentLoaded', function() {
                             <strong>Fotos do Relatório:</strong>
                             <div class="mt-2 d-flex flex-wrap gap-2" id="galeria-fotos">`;
 
-                        fotosArray.forEach((urlFoto, index) => {
+                        fotosArray.forEach(({ url: urlFoto, miniatura }, index) => {
                             if (urlFoto && typeof urlFoto === 'string') {
                                 // Garante que a URL é válida
                                 let urlFinal = corrigirUrlFoto(urlFoto);
+                                // Na galeria carrega a miniatura, quando existir
+                                const urlMiniatura = miniatura ? corrigirUrlFoto(miniatura) : urlFinal;
                                 
                                 // Escapa aspas simples para evitar quebra de HTML
                                 const urlEscapada = urlFinal.replace(/'/g, "\\'");
                                 
                                 fotosHTML += `
                                     <div class="position-relative" style="width: 100px; height: 100px;">
-                                        <img src="${urlFinal}" 
+                                        <img src="${urlMiniatura}" 
+                                            data-full="${urlFinal}"
                                             class="img-thumbnail h-100 w-100" 
                                             style="object-fit: cover; cursor: pointer; border-radius: 4px;" 
                                             alt="Foto ${index + 1}"
@@ -891,6 +939,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Nova função para processar fotos
+    // Retorna [{ url, miniatura }]; as chaves FOTOn_thumb são as miniaturas de FOTOn
     function processarFotos(fotos) {
         if (!fotos) return [];
         
@@ -903,20 +952,25 @@ document.addEventListener('DOMContentLoaded', function() {
                     fotos = JSON.parse(fotos);
                 } catch (e) {
                     // Se não for JSON válido, trata como string única
-                    fotosArray = [fotos];
+                    fotosArray = [{ url: fotos, miniatura: null }];
                     return fotosArray;
                 }
             }
             
             // Se for array, usa diretamente
             if (Array.isArray(fotos)) {
-                fotosArray = fotos.filter(url => url && typeof url === 'string');
+                fotosArray = fotos
+                    .filter(url => url && typeof url === 'string')
+                    .map(url => ({ url, miniatura: null }));
                 return fotosArray;
             }
             
             // Se for objeto, extrai os valores
             if (typeof fotos === 'object' && fotos !== null) {
-                fotosArray = Object.values(fotos).filter(url => url && typeof url === 'string');
+                fotosArray = Object.entries(fotos)
+                    // Chaves iniciadas por '_' são marcadores (ex.: _status das fotos em processamento)
+                    .filter(([chave, url]) => !chave.startsWith('_') && !chave.endsWith('_thumb') && url && typeof url === 'string')
+                    .map(([chave, url]) => ({ url, miniatura: fotos[`${chave}_thumb`] || null }));
                 return fotosArray;
             }
             
@@ -973,51 +1027,75 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    // Função para exportar relatórios em HTML
-    async function exportarRelatorios() {
+    // Monta os parâmetros de consulta a partir dos filtros ativos
+    function parametrosFiltros() {
+        const params = new URLSearchParams();
+        if (filtrosAtivos.tipo) params.append('tipo', filtrosAtivos.tipo);
+        if (filtrosAtivos.porteiro) params.append('porteiro', filtrosAtivos.porteiro);
+        if (filtrosAtivos.status) params.append('status', filtrosAtivos.status);
+        if (filtrosAtivos.numeroOS) params.append('numero_os', filtrosAtivos.numeroOS);
+        if (filtrosAtivos.matricula) params.append('matricula', filtrosAtivos.matricula);
+        if (filtrosAtivos.carro) params.append('carro', filtrosAtivos.carro);
+        if (filtrosAtivos.dataInicio) params.append('data_inicio', formatarDataParaAPI(filtrosAtivos.dataInicio));
+        if (filtrosAtivos.dataFim) params.append('data_fim', formatarDataParaAPI(filtrosAtivos.dataFim));
+        return params;
+    }
+    
+    // Acompanha uma exportação em segundo plano até a conclusão
+    async function aguardarExportacao(statusUrl, formato) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                throw new Error(data.message || `HTTP error! status: ${response.status}`);
+            }
+            
+            const job = data.job;
+            if (job.status === 'completed') return job;
+            if (job.status === 'failed') throw new Error(job.error || 'Falha na exportação');
+            
+            const progresso = job.total ? `${job.linhas}/${job.total}` : `${job.linhas}`;
+            mostrarAlerta(`Gerando exportação ${formato.toUpperCase()}... ${progresso} relatórios`, 'info');
+        }
+    }
+    
+    // Função para exportar relatórios (HTML, CSV ou XLSX)
+    // O arquivo é gerado no servidor em segundo plano e baixado ao final,
+    // sem ocupar uma requisição durante a geração
+    async function exportarRelatorios(formato = 'html') {
         try {
-            const params = new URLSearchParams();
-            if (filtrosAtivos.tipo) params.append('tipo', filtrosAtivos.tipo);
-            if (filtrosAtivos.porteiro) params.append('porteiro', filtrosAtivos.porteiro);
-            if (filtrosAtivos.status) params.append('status', filtrosAtivos.status);
-            if (filtrosAtivos.numeroOS) params.append('numero_os', filtrosAtivos.numeroOS);
-            if (filtrosAtivos.matricula) params.append('matricula', filtrosAtivos.matricula);
-            if (filtrosAtivos.carro) params.append('carro', filtrosAtivos.carro);
-            if (filtrosAtivos.dataInicio) params.append('data_inicio', formatarDataParaAPI(filtrosAtivos.dataInicio));
-            if (filtrosAtivos.dataFim) params.append('data_fim', formatarDataParaAPI(filtrosAtivos.dataFim));
+            const params = parametrosFiltros();
+            params.append('formato', formato);
             
-            const response = await fetch(`/api/exportar/html?${params}`);
-            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            const response = await fetch(`/api/exportar/jobs?${params}`, { method: 'POST' });
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                throw new Error(data.message || `HTTP error! status: ${response.status}`);
+            }
+            
+            mostrarAlerta(`Exportação ${formato.toUpperCase()} iniciada...`, 'info');
+            await aguardarExportacao(data.status_url, formato);
             
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
-            a.href = url;
-            a.download = `relatorios_${new Date().toISOString().split('T')[0]}.html`;
+            a.href = data.download_url;
+            a.download = `relatorios_${new Date().toISOString().split('T')[0]}.${formato}`;
             document.body.appendChild(a);
             a.click();
-            window.URL.revokeObjectURL(url);
             document.body.removeChild(a);
             
             mostrarAlerta('Relatórios exportados com sucesso!', 'success');
         } catch (error) {
             console.error('Erro ao exportar relatórios:', error);
-            mostrarAlerta('Erro ao exportar relatórios', 'danger');
+            mostrarAlerta(`Erro ao exportar relatórios: ${error.message}`, 'danger');
         }
     }
     
     // Função para exportar relatórios em PDF (usando HTML com estilos para impressão)
     async function exportarParaPDF() {
         try {
-            const params = new URLSearchParams();
-            if (filtrosAtivos.tipo) params.append('tipo', filtrosAtivos.tipo);
-            if (filtrosAtivos.porteiro) params.append('porteiro', filtrosAtivos.porteiro);
-            if (filtrosAtivos.status) params.append('status', filtrosAtivos.status);
-            if (filtrosAtivos.numeroOS) params.append('numero_os', filtrosAtivos.numeroOS);
-            if (filtrosAtivos.matricula) params.append('matricula', filtrosAtivos.matricula);
-            if (filtrosAtivos.carro) params.append('carro', filtrosAtivos.carro);
-            if (filtrosAtivos.dataInicio) params.append('data_inicio', formatarDataParaAPI(filtrosAtivos.dataInicio));
-            if (filtrosAtivos.dataFim) params.append('data_fim', formatarDataParaAPI(filtrosAtivos.dataFim));
+            const params = parametrosFiltros();
             
             console.log('Fazendo requisição para:', `/api/exportar/html?${params}`);
             
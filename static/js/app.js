@@ -15,6 +15,14 @@ document.addEventListener('DOMContentLoaded', function() {
     let usuarioLogado = null;
     let tiposRelatorio = [];
     let fotosAvaria = {};
+    const compressoesPendentes = new Set();
+    
+    // Compressão das fotos no navegador antes do envio
+    // maxLado: maior lado em pixels; qualidade: JPEG de 0 a 1
+    const COMPRESSAO_FOTOS = {
+        maxLado: 1920,
+        qualidade: 0.8
+    };
     
     // Inicialização
     async function init() {
@@ -230,26 +238,38 @@ document.addEventListener('DOMContentLoaded', function() {
                     const previewContainer = document.createElement('div');
                     previewContainer.className = 'mt-2';
                     
-                    input.addEventListener('change', function(e) {
+                    input.addEventListener('change', async function(e) {
                         if (e.target.files && e.target.files[0]) {
-                            const reader = new FileReader();
-                            reader.onload = function(event) {
-                                fotosAvaria[campo.name] = {
-                                    file: e.target.files[0],
-                                    preview: event.target.result,
-                                    indice: 0,
-                                    publicUrl: ''
-                                };
-                                
-                                previewContainer.innerHTML = `
-                                    <img src="${event.target.result}" class="img-thumbnail mt-2" style="max-width: 150px;">
-                                    <button type="button" class="btn btn-sm btn-danger ms-2" onclick="removerFoto('${campo.name}')">
-                                        Remover
-                                    </button>
-                                `;
-                                atualizarPreview();
+                            previewContainer.innerHTML = `
+                                <div class="text-muted small mt-2">
+                                    <span class="spinner-border spinner-border-sm"></span> Otimizando foto...
+                                </div>
+                            `;
+                            
+                            // A compressão é feita ao escolher a foto; o envio aguarda as pendentes
+                            const compressao = comprimirImagem(e.target.files[0]);
+                            compressoesPendentes.add(compressao);
+                            const file = await compressao;
+                            compressoesPendentes.delete(compressao);
+                            
+                            if (fotosAvaria[campo.name]?.preview) {
+                                URL.revokeObjectURL(fotosAvaria[campo.name].preview);
+                            }
+                            const previewUrl = URL.createObjectURL(file);
+                            fotosAvaria[campo.name] = {
+                                file: file,
+                                preview: previewUrl,
+                                indice: 0,
+                                publicUrl: ''
                             };
-                            reader.readAsDataURL(e.target.files[0]);
+                            
+                            previewContainer.innerHTML = `
+                                <img src="${previewUrl}" class="img-thumbnail mt-2" style="max-width: 150px;">
+                                <button type="button" class="btn btn-sm btn-danger ms-2" onclick="removerFoto('${campo.name}')">
+                                    Remover
+                                </button>
+                            `;
+                            atualizarPreview();
                         }
                     });
                     
@@ -333,6 +353,83 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Carrega a imagem já com a rotação do EXIF aplicada
+    async function carregarImagem(file) {
+        if (window.createImageBitmap) {
+            try {
+                return await createImageBitmap(file, { imageOrientation: 'from-image' });
+            } catch (error) {
+                console.warn('createImageBitmap indisponível para a foto, usando <img>:', error);
+            }
+        }
+        
+        const url = URL.createObjectURL(file);
+        try {
+            const img = new Image();
+            img.src = url;
+            await img.decode();
+            return img;
+        } finally {
+            URL.revokeObjectURL(url);
+        }
+    }
+    
+    // Reduz e recomprime a foto em um canvas (COMPRESSAO_FOTOS)
+    // Retorna o arquivo original se ele já for menor ou se algo falhar
+    async function comprimirImagem(file) {
+        if (!file.type.startsWith('image/') || file.type === 'image/gif') {
+            return file;
+        }
+        
+        try {
+            const imagem = await carregarImagem(file);
+            const largura = imagem.width;
+            const altura = imagem.height;
+            const escala = Math.min(1, COMPRESSAO_FOTOS.maxLado / Math.max(largura, altura));
+            
+            const canvas = document.createElement('canvas');
+            canvas.width = Math.round(largura * escala);
+            canvas.height = Math.round(altura * escala);
+            const ctx = canvas.getContext('2d');
+            // Fundo branco para PNGs com transparência
+            ctx.fillStyle = '#fff';
+            ctx.fillRect(0, 0, canvas.width, canvas.height);
+            ctx.drawImage(imagem, 0, 0, canvas.width, canvas.height);
+            if (imagem.close) imagem.close();
+            
+            const blob = await new Promise(resolve => 
+                canvas.toBlob(resolve, 'image/jpeg', COMPRESSAO_FOTOS.qualidade)
+            );
+            if (!blob || blob.size >= file.size) {
+                return file;
+            }
+            
+            const nome = file.name.replace(/\.[^.]+$/, '') + '.jpg';
+            console.log(`Foto comprimida: ${file.size} → ${blob.size} bytes`);
+            return new File([blob], nome, { type: 'image/jpeg', lastModified: file.lastModified });
+        } catch (error) {
+            console.error('Erro ao comprimir foto, enviando original:', error);
+            return file;
+        }
+    }
+    
+    // Aguarda o envio das fotos de um relatório já gravado e retorna as URLs
+    // (null se as fotos ainda estiverem em processamento ao fim das tentativas)
+    async function aguardarFotos(statusUrl, tentativas = 120) {
+        for (let i = 0; i < tentativas; i++) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                throw new Error(data.message || `HTTP error! status: ${response.status}`);
+            }
+            if (data.status === 'concluido') return data.fotosUrls;
+            if (data.status === 'erro') throw new Error('Falha ao enviar as fotos do relatório');
+        }
+        return null;
+    }
+    
     // Função para mostrar alertas
     function mostrarAlerta(mensagem, tipo = 'info') {
         // Remover alertas existentes
@@ -438,40 +535,47 @@ document.addEventListener('DOMContentLoaded', function() {
                 return;
             }
 
-            // Processar fotos para base64
-            const fotosBase64 = [];
+            // Aguardar fotos que ainda estão sendo comprimidas
+            if (compressoesPendentes.size > 0) {
+                await Promise.all(compressoesPendentes);
+            }
+
+            // Enviar como multipart/form-data: as fotos vão como arquivos
+            // binários, sem a conversão para base64 dentro do JSON
+            const formData = new FormData();
+            formData.append('tipo_id', parseInt(tipoId));
+            formData.append('dados', JSON.stringify(textoRelatorioContent));
+            formData.append('destinatario_whatsapp', tipoSelecionado.destinatario_whatsapp || '');
+            // O relatório é gravado na hora e as fotos são enviadas em segundo plano
+            formData.append('fotos_assincronas', '1');
             for (const campoNome in fotosAvaria) {
                 if (fotosAvaria[campoNome].file) {
-                    const reader = new FileReader();
-                    const base64 = await new Promise((resolve) => {
-                        reader.onload = function(e) {
-                            resolve(e.target.result);
-                        };
-                        reader.readAsDataURL(fotosAvaria[campoNome].file);
-                    });
-                    fotosBase64.push({
-                        base64: base64,
-                        campoNome: campoNome,
-                        fileName: fotosAvaria[campoNome].file.name
-                    });
+                    const file = fotosAvaria[campoNome].file;
+                    formData.append('fotos', file, file.name);
+                    formData.append('fotos_campo', campoNome);
                 }
             }
 
             const response = await fetch('/api/relatorios', {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    tipo_id: parseInt(tipoId),
-                    dados: textoRelatorioContent,
-                    destinatario_whatsapp: tipoSelecionado.destinatario_whatsapp || '',
-                    fotos: fotosBase64
-                })
+                body: formData
             });
             
             const data = await response.json();
             
+            if (data.success && data.fotos_pendentes) {
+                btnEnviar.innerHTML = '<span class="spinner-border spinner-border-sm"></span> Enviando fotos...';
+                data.fotosUrls = await aguardarFotos(data.fotos_status_url);
+                
+                if (data.fotosUrls === null) {
+                    // O relatório já está salvo: limpar o formulário evita reenviá-lo
+                    const numeroOS = data.numero_os ? ` Nº da OS: <strong>${data.numero_os}</strong>.` : '';
+                    mostrarAlerta(`Relatório salvo, fotos em processamento.${numeroOS} Os links das fotos ficarão disponíveis no relatório.`, 'warning');
+                    limparFormulario();
+                    return;
+                }
+            }
+            
             if (data.success) {
                 // ✅ Substituir FOTO1, FOTO2, etc. pelas URLs reais
                 let textoComUrls = textoRelatorioContent;
@@ -501,12 +605,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     window.open(`https://wa.me/${destino}?text=${textoCodificado}`, '_blank');
                 }
 
-                // Limpa formulário
-                if (tipoSelect) tipoSelect.value = '';
-                if (formContainer) formContainer.innerHTML = '';
-                if (preview) preview.classList.add('d-none');
-                btnEnviar.classList.add('d-none');
-                fotosAvaria = {};
+                limparFormulario();
                 
             } else {
                 mostrarAlerta(`Erro ao enviar: ${data.message}`, 'danger');
@@ -520,6 +619,15 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Limpa o formulário após gravar o relatório
+    function limparFormulario() {
+        if (tipoRelatorio) tipoRelatorio.value = '';
+        if (formContainer) formContainer.innerHTML = '';
+        if (preview) preview.classList.add('d-none');
+        btnEnviar.classList.add('d-none');
+        fotosAvaria = {};
+    }
+    
     // Iniciar a aplicação
     init();
 });
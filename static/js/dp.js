@@ -3,12 +3,44 @@ document.addEventListener('DOMContentLoaded', function() {
     
     let ocorrencias = [];
     let ocorrenciaSelecionada = null;
+    // Marca d'água da última sincronização da fila (null = carregar tudo)
+    let watermark = null;
     let documentosDP = [];
     
     // Inicialização
     async function init() {
         configurarEventos();
         await carregarOcorrenciasDP();
+        conectarEventos();
+    }
+    
+    // Sincronizar a fila quando o servidor avisar de mudanças (SSE)
+    function conectarEventos() {
+        if (!window.EventSource) return;
+        
+        let timerSincronizacao = null;
+        const eventos = new EventSource('/api/eventos?tipos=relatorio_criado,status_alterado');
+        
+        function aoReceber(e) {
+            const dados = JSON.parse(e.data);
+            const ids = dados.ids || [dados.id];
+            const relevante = dados.status === 'EM_DP' ||
+                ids.some(id => ocorrencias.some(oc => oc.id === id));
+            if (!relevante) return;
+            
+            // Agrupar rajadas de eventos em uma única sincronização
+            clearTimeout(timerSincronizacao);
+            timerSincronizacao = setTimeout(carregarOcorrenciasDP, 300);
+        }
+        
+        eventos.addEventListener('relatorio_criado', aoReceber);
+        eventos.addEventListener('status_alterado', aoReceber);
+        // Avisos perdidos no servidor: sincronizar desde o watermark traz
+        // todas as alterações desde a última sincronização
+        eventos.addEventListener('resync', () => {
+            clearTimeout(timerSincronizacao);
+            carregarOcorrenciasDP();
+        });
     }
     
     // Configurar eventos
@@ -59,16 +91,23 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
-        // Mostrar loading
-        loadingState.style.display = 'block';
-        container.innerHTML = '';
+        // Mostrar loading apenas na carga inicial; depois só chegam as alterações
+        if (watermark === null) {
+            loadingState.style.display = 'block';
+            container.innerHTML = '';
+        }
         
         try {
-            const response = await fetch('/api/relatorios?status=EM_DP');
+            let url = '/api/relatorios/delta?status=EM_DP';
+            if (watermark !== null) {
+                url += `&since=${encodeURIComponent(watermark)}`;
+            }
+            const response = await fetch(url);
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             
             const data = await response.json();
-            ocorrencias = data.data || [];
+            if (!data.success) throw new Error(data.message || 'Erro ao sincronizar fila');
+            aplicarDelta(data);
             
             // Debug: verificar estrutura dos dados
             if (ocorrencias.length > 0) {
@@ -84,6 +123,7 @@ document.addEventListener('DOMContentLoaded', function() {
             renderizarOcorrenciasDP();
         } catch (error) {
             console.error('Erro ao carregar ocorrências:', error);
+            watermark = null;
             if (loadingState) {
                 loadingState.style.display = 'none';
             }
@@ -102,6 +142,24 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Mesclar a resposta de /api/relatorios/delta na lista local
+    function aplicarDelta(data) {
+        if (data.completo) {
+            ocorrencias = data.data || [];
+        } else {
+            const removidos = new Set(data.removidos || []);
+            const porId = new Map();
+            ocorrencias.forEach(oc => {
+                if (!removidos.has(oc.id)) porId.set(oc.id, oc);
+            });
+            (data.data || []).forEach(oc => porId.set(oc.id, oc));
+            ocorrencias = Array.from(porId.values()).sort(
+                (a, b) => (b.criado_em || '').localeCompare(a.criado_em || '')
+            );
+        }
+        watermark = data.watermark;
+    }
+    
     // Renderizar ocorrências em cards modernos
     function renderizarOcorrenciasDP() {
         const container = document.getElementById('ocorrenciasContainer');
@@ -363,8 +421,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 alert('Ocorrência processada e enviada para o Tráfego com sucesso!');
                 
-                // Recarregar a página para mostrar as mudanças
-                window.location.reload();
+                // Remover da fila local em vez de recarregar a página
+                ocorrencias = ocorrencias.filter(oc => oc.id !== ocorrenciaSelecionada.id);
+                ocorrenciaSelecionada = null;
+                renderizarOcorrenciasDP();
             } else {
                 alert('Erro ao processar ocorrência: ' + (data.message || 'Erro desconhecido'));
             }
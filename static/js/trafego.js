@@ -3,11 +3,44 @@ document.addEventListener('DOMContentLoaded', function() {
     
     let ocorrencias = [];
     let ocorrenciaSelecionada = null;
+    // Marca d'água da última sincronização da fila (null = carregar tudo)
+    let watermark = null;
+    const selecionadas = new Set();
     
     // Inicialização
     async function init() {
         configurarEventos();
         await carregarOcorrenciasTrafego();
+        conectarEventos();
+    }
+    
+    // Sincronizar a fila quando o servidor avisar de mudanças (SSE)
+    function conectarEventos() {
+        if (!window.EventSource) return;
+        
+        let timerSincronizacao = null;
+        const eventos = new EventSource('/api/eventos?tipos=relatorio_criado,status_alterado');
+        
+        function aoReceber(e) {
+            const dados = JSON.parse(e.data);
+            const ids = dados.ids || [dados.id];
+            const relevante = dados.status === 'EM_TRAFEGO' ||
+                ids.some(id => ocorrencias.some(oc => oc.id === id));
+            if (!relevante) return;
+            
+            // Agrupar rajadas de eventos em uma única sincronização
+            clearTimeout(timerSincronizacao);
+            timerSincronizacao = setTimeout(carregarOcorrenciasTrafego, 300);
+        }
+        
+        eventos.addEventListener('relatorio_criado', aoReceber);
+        eventos.addEventListener('status_alterado', aoReceber);
+        // Avisos perdidos no servidor: sincronizar desde o watermark traz
+        // todas as alterações desde a última sincronização
+        eventos.addEventListener('resync', () => {
+            clearTimeout(timerSincronizacao);
+            carregarOcorrenciasTrafego();
+        });
     }
     
     // Configurar eventos
@@ -23,6 +56,11 @@ document.addEventListener('DOMContentLoaded', function() {
             btnMarcarComoCobrado.addEventListener('click', marcarComoCobrado);
         }
         
+        const btnCobrarSelecionados = document.getElementById('btnCobrarSelecionados');
+        if (btnCobrarSelecionados) {
+            btnCobrarSelecionados.addEventListener('click', marcarSelecionadasComoCobradas);
+        }
+        
         // Logout
         document.getElementById('logoutBtn').addEventListener('click', function(e) {
             e.preventDefault();
@@ -58,16 +96,28 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
-        // Mostrar loading
-        loadingState.style.display = 'block';
-        container.innerHTML = '';
+        // Mostrar loading apenas na carga inicial; depois só chegam as alterações
+        if (watermark === null) {
+            loadingState.style.display = 'block';
+            container.innerHTML = '';
+        }
         
         try {
-            const response = await fetch('/api/relatorios?status=EM_TRAFEGO');
+            let url = '/api/relatorios/delta?status=EM_TRAFEGO';
+            if (watermark !== null) {
+                url += `&since=${encodeURIComponent(watermark)}`;
+            }
+            const response = await fetch(url);
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             
             const data = await response.json();
-            ocorrencias = data.data || [];
+            if (!data.success) throw new Error(data.message || 'Erro ao sincronizar fila');
+            aplicarDelta(data);
+            
+            // Manter apenas seleções que continuam na fila
+            const idsAtuais = new Set(ocorrencias.map(oc => oc.id));
+            selecionadas.forEach(id => { if (!idsAtuais.has(id)) selecionadas.delete(id); });
+            atualizarSelecao();
             
             // Esconder loading
             if (loadingState) {
@@ -76,6 +126,7 @@ document.addEventListener('DOMContentLoaded', function() {
             renderizarOcorrenciasTrafego();
         } catch (error) {
             console.error('Erro ao carregar ocorrências:', error);
+            watermark = null;
             if (loadingState) {
                 loadingState.style.display = 'none';
             }
@@ -94,6 +145,24 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Mesclar a resposta de /api/relatorios/delta na lista local
+    function aplicarDelta(data) {
+        if (data.completo) {
+            ocorrencias = data.data || [];
+        } else {
+            const removidos = new Set(data.removidos || []);
+            const porId = new Map();
+            ocorrencias.forEach(oc => {
+                if (!removidos.has(oc.id)) porId.set(oc.id, oc);
+            });
+            (data.data || []).forEach(oc => porId.set(oc.id, oc));
+            ocorrencias = Array.from(porId.values()).sort(
+                (a, b) => (b.criado_em || '').localeCompare(a.criado_em || '')
+            );
+        }
+        watermark = data.watermark;
+    }
+    
     // Renderizar ocorrências em cards modernos
     function renderizarOcorrenciasTrafego() {
         const container = document.getElementById('ocorrenciasContainer');
@@ -152,6 +221,9 @@ document.addEventListener('DOMContentLoaded', function() {
                     <div class="modern-card trafego-card" data-id="${ocorrencia.id}">
                         <div class="card-header">
                             <div class="os-number">
+                                <input type="checkbox" class="form-check-input me-1" title="Selecionar"
+                                       onchange="alternarSelecao('${ocorrencia.id}', this.checked)"
+                                       ${selecionadas.has(ocorrencia.id) ? 'checked' : ''}>
                                 <i class="bi bi-file-text"></i>
                                 <span>${numeroOS}</span>
                             </div>
@@ -300,8 +372,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (data.success) {
                 alert('Cobrança marcada como realizada com sucesso!');
                 
-                // Recarregar a página para mostrar as mudanças
-                window.location.reload();
+                removerDaFila([id]);
             } else {
                 alert('Erro ao marcar como cobrado: ' + (data.message || 'Erro desconhecido'));
             }
@@ -311,10 +382,77 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Remover ocorrências já cobradas da lista, sem recarregar a fila
+    function removerDaFila(ids) {
+        const removidas = new Set(ids);
+        ocorrencias = ocorrencias.filter(oc => !removidas.has(oc.id));
+        removidas.forEach(id => selecionadas.delete(id));
+        atualizarSelecao();
+        renderizarOcorrenciasTrafego();
+    }
+    
+    // Seleção de ocorrências para cobrança em lote
+    function alternarSelecao(id, marcada) {
+        if (marcada) {
+            selecionadas.add(id);
+        } else {
+            selecionadas.delete(id);
+        }
+        atualizarSelecao();
+    }
+    
+    function atualizarSelecao() {
+        const btn = document.getElementById('btnCobrarSelecionados');
+        const total = document.getElementById('totalSelecionadas');
+        if (total) total.textContent = selecionadas.size;
+        if (btn) btn.disabled = selecionadas.size === 0;
+    }
+    
+    // Marcar todas as selecionadas como cobradas em uma única requisição
+    async function marcarSelecionadasComoCobradas() {
+        const ids = Array.from(selecionadas);
+        if (ids.length === 0) return;
+        
+        if (!confirm(`Tem certeza que deseja marcar ${ids.length} cobrança(s) como realizada(s)?`)) {
+            return;
+        }
+        
+        try {
+            const response = await fetch('/api/relatorios/status', {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ status: 'COBRADO', ids: ids })
+            });
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            const data = await response.json();
+            const resultados = data.resultados || [];
+            const falhas = resultados.filter(r => !r.success);
+            
+            removerDaFila(resultados.filter(r => r.success).map(r => r.id));
+            
+            if (falhas.length === 0) {
+                alert(`${data.atualizados} cobrança(s) marcada(s) como realizada(s)!`);
+            } else {
+                alert(`${data.atualizados} cobrança(s) marcada(s). Falharam ${falhas.length}: ` +
+                    falhas.map(r => `${r.id} (${r.message})`).join(', '));
+            }
+        } catch (error) {
+            console.error('Erro ao marcar cobranças em lote:', error);
+            alert('Erro ao marcar cobranças. Tente novamente.');
+        }
+    }
+    
     // Inicializar a aplicação
     init();
     
     // Torna as funções globais para acesso pelo HTML
     window.abrirModalVisualizarTrafego = abrirModalVisualizarTrafego;
     window.marcarComoCobrado = marcarComoCobrado;
+    window.alternarSelecao = alternarSelecao;
 });
\ No newline at end of file
@@ -1,6 +1,10 @@
 import pytest
+import base64
+import hashlib
 import json
+import io
 import os
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 import sys
 from pathlib import Path
@@ -15,6 +19,13 @@ app_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(app_module)
 app = app_module.app
 
+from app.routes import relatorios as rotas_relatorios
+from app.services import (
+    estatisticas_service, eventos_service, export_service, foto_service, relatorio_service
+)
+from app.services import supabase_service as supabase_module
+from config.settings import Config
+
 @pytest.fixture
 def client():
     """Cliente de teste para a aplicação Flask"""
@@ -25,10 +36,25 @@ def client():
         with app.app_context():
             yield client
 
+@pytest.fixture(autouse=True)
+def limpar_cache_referencia():
+    """Garante que cada teste comece com o cache de referência e o índice de fotos vazios"""
+    supabase_module.cache_referencia.invalidate()
+    foto_service.indice_fotos.invalidate()
+    yield
+    supabase_module.cache_referencia.invalidate()
+    foto_service.indice_fotos.invalidate()
+
+@pytest.fixture
+def admin_logado(client):
+    """Sessão de administrador no cliente de teste"""
+    with client.session_transaction() as sess:
+        sess['user'] = {'id': 'a1', 'setor': 'admin'}
+
 @pytest.fixture
 def mock_supabase():
     """Mock do cliente Supabase"""
-    with patch.object(app_module, 'supabase') as mock:
+    with patch.object(supabase_module.supabase_service, 'client') as mock:
         yield mock
 
 class TestAuthentication:
@@ -84,7 +110,7 @@ class TestAPIEndpoints:
         assert data['success'] == True
         assert data['message'] == 'Logout realizado com sucesso'
     
-    def test_tipos_relatorio_endpoint(self, client, mock_supabase):
+    def test_tipos_relatorio_endpoint(self, client, admin_logado, mock_supabase):
         """Testa endpoint de tipos de relatório"""
         mock_data = [{'id': 1, 'nome': 'Teste', 'template': 'template'}]
         mock_supabase.table().select().execute.return_value.data = mock_data
@@ -109,6 +135,1127 @@ class TestAPIEndpoints:
         data = json.loads(response.data)
         assert data == mock_data
 
+class TestPaginacao:
+    """Testes para a paginação da listagem de relatórios"""
+
+    def test_relatorios_paginacao_no_servidor(self, client, admin_logado, mock_supabase):
+        """Testa se a janela da página é enviada na query e o total vem do count"""
+        query = mock_supabase.table.return_value.select.return_value.order.return_value
+        query.range.return_value.execute.return_value.data = [{'id': 'r11'}]
+        query.range.return_value.execute.return_value.count = 11
+
+        response = client.get('/api/relatorios?page=2&per_page=10')
+        data = json.loads(response.data)
+
+        query.range.assert_called_once_with(10, 20)
+        query.execute.assert_not_called()
+        assert data['data'] == [{'id': 'r11'}]
+        assert data['count'] == 11
+        assert data['total_pages'] == 2
+
+    def test_relatorios_paginacao_por_cursor(self, client, admin_logado, mock_supabase):
+        """Testa se o cursor retornado posiciona a página seguinte por keyset"""
+        query = mock_supabase.table.return_value.select.return_value.order.return_value.order.return_value
+        query.limit.return_value.execute.return_value.data = [
+            {'id': '6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02', 'criado_em': '2025-09-01T10:00:00+00:00'},
+            {'id': '3b9e8d41-5c2a-4f6b-8e17-9a0c1d2e3f41', 'criado_em': '2025-09-01T09:00:00+00:00'}
+        ]
+        query.limit.return_value.execute.return_value.count = 5
+
+        response = client.get('/api/relatorios?cursor=&per_page=1')
+        data = json.loads(response.data)
+
+        query.limit.assert_called_once_with(2)
+        assert [r['id'] for r in data['data']] == ['6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02']
+        assert data['count'] == 5
+        assert relatorio_service.decodificar_cursor(data['next_cursor']) == (
+            '2025-09-01T10:00:00+00:00', '6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02'
+        )
+
+        params = query.params
+        client.get(f"/api/relatorios?cursor={data['next_cursor']}&per_page=1")
+        mock_supabase.table.return_value.select.assert_called_with('*', count=None)
+        params.add.assert_called_with(
+            'or',
+            '(criado_em.lt."2025-09-01T10:00:00+00:00",'
+            'and(criado_em.eq."2025-09-01T10:00:00+00:00",id.lt.6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02))'
+        )
+
+    def test_relatorios_cursor_com_criado_em_nulo(self, client, admin_logado, mock_supabase):
+        """Testa se um relatório sem criado_em no fim da página gera cursor válido"""
+        query = mock_supabase.table.return_value.select.return_value.order.return_value.order.return_value
+        query.limit.return_value.execute.return_value.data = [
+            {'id': '6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02', 'criado_em': None},
+            {'id': '3b9e8d41-5c2a-4f6b-8e17-9a0c1d2e3f41', 'criado_em': '2025-09-01T09:00:00+00:00'}
+        ]
+        query.limit.return_value.execute.return_value.count = 5
+
+        response = client.get('/api/relatorios?cursor=&per_page=1')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert relatorio_service.decodificar_cursor(data['next_cursor']) == (
+            None, '6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02'
+        )
+
+        params = query.params
+        response = client.get(f"/api/relatorios?cursor={data['next_cursor']}&per_page=1")
+        assert response.status_code == 200
+        params.add.assert_called_with(
+            'or',
+            '(and(criado_em.is.null,id.lt.6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02),criado_em.not.is.null)'
+        )
+
+    def test_relatorios_cursor_invalido(self, client, admin_logado, mock_supabase):
+        """Testa se um cursor malformado retorna 400"""
+        response = client.get('/api/relatorios?cursor=invalido')
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('posicao', [
+        {'criado_em': '2025-09-01T10:00:00+00:00",id.gt.0', 'id': '6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02'},
+        {'criado_em': '2025-09-01T10:00:00+00:00', 'id': '0),status.eq.FINALIZADA'},
+        {'criado_em': 1, 'id': '6f1c2a9e-0b7d-4c1e-9a53-2d8f4e7b1a02'}
+    ])
+    def test_relatorios_cursor_com_posicao_invalida(self, client, admin_logado, mock_supabase, posicao):
+        """Testa se criado_em fora do formato ISO ou id fora do formato UUID retornam 400"""
+        cursor = base64.urlsafe_b64encode(json.dumps(posicao).encode('utf-8')).decode('ascii')
+        response = client.get(f'/api/relatorios?cursor={cursor}')
+        assert response.status_code == 400
+        mock_supabase.table.return_value.select.return_value.order.return_value \
+            .order.return_value.params.add.assert_not_called()
+
+class TestFiltrosDados:
+    """Testes para os filtros de matrícula/carro em 'dados'"""
+
+    def test_filtro_matricula_no_servidor(self, client, admin_logado, mock_supabase, monkeypatch):
+        """Testa se o filtro de matrícula vira ILIKE na query quando o banco suporta"""
+        monkeypatch.setattr(relatorio_service, '_busca_dados_no_servidor', True)
+        query = mock_supabase.table.return_value.select.return_value
+        query.ilike.return_value.order.return_value.range.return_value.execute.return_value.data = []
+        query.ilike.return_value.order.return_value.range.return_value.execute.return_value.count = 0
+
+        response = client.get('/api/relatorios?matricula=AB_1')
+
+        assert response.status_code == 200
+        query.ilike.assert_called_once_with('dados_busca', '%ab\\_1%')
+        query.ilike.return_value.order.return_value.range.assert_called_once_with(0, 10)
+
+    def test_filtro_matricula_local_sem_suporte_no_servidor(self, client, admin_logado, mock_supabase, monkeypatch):
+        """Testa a filtragem no Python quando o banco não tem a busca em dados"""
+        monkeypatch.setattr(relatorio_service, '_busca_dados_no_servidor', False)
+        query = mock_supabase.table.return_value.select.return_value
+        query.order.return_value.execute.return_value.data = [
+            {'id': 'r1', 'dados': '• Matrícula: 123\n• Carro: 456'},
+            {'id': 'r2', 'dados': '• Matrícula: 999'}
+        ]
+
+        response = client.get('/api/relatorios?matricula=123')
+        data = json.loads(response.data)
+
+        query.ilike.assert_not_called()
+        assert [r['id'] for r in data['data']] == ['r1']
+        assert data['count'] == 1
+
+class TestDeltaFilas:
+    """Testes para a sincronização incremental das filas"""
+
+    @pytest.fixture(autouse=True)
+    def preparar(self, client, monkeypatch):
+        monkeypatch.setattr(relatorio_service, '_delta_no_servidor', True)
+        monkeypatch.setattr(relatorio_service, '_removidos_no_servidor', True)
+        monkeypatch.setattr(rotas_relatorios, 'enriquecer_relatorios', lambda relatorios: relatorios)
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': '1', 'setor': 'dp'}
+
+    def _mock_tabelas(self, mock_supabase):
+        tabelas = {nome: MagicMock() for nome in ('relatorios', 'relatorios_removidos')}
+        mock_supabase.table.side_effect = lambda nome: tabelas[nome]
+        return tabelas
+
+    def test_sem_since_retorna_fila_completa(self, client, mock_supabase):
+        """Testa se a primeira sincronização traz a fila inteira e a marca d'água"""
+        tabelas = self._mock_tabelas(mock_supabase)
+        query = tabelas['relatorios'].select.return_value.eq.return_value
+        query.order.return_value.execute.return_value = MagicMock(data=[{'id': 'a'}])
+
+        data = json.loads(client.get('/api/relatorios/delta?status=EM_DP').data)
+
+        assert data['completo'] is True
+        assert data['data'] == [{'id': 'a'}]
+        assert data['watermark']
+        tabelas['relatorios'].select.return_value.eq.assert_called_once_with('status', 'EM_DP')
+
+    def test_delta_retorna_alterados_e_removidos(self, client, mock_supabase):
+        """Testa se apenas as alterações desde a marca d'água são enviadas"""
+        tabelas = self._mock_tabelas(mock_supabase)
+        relatorios = tabelas['relatorios'].select.return_value
+        relatorios.eq.return_value.gte.return_value.order.return_value.limit.return_value.execute.return_value = (
+            MagicMock(data=[{'id': 'novo', 'status': 'EM_DP'}])
+        )
+        relatorios.neq.return_value.gte.return_value.limit.return_value.execute.return_value = (
+            MagicMock(data=[{'id': 'movido'}])
+        )
+        removidos = tabelas['relatorios_removidos'].select.return_value
+        removidos.gte.return_value.limit.return_value.execute.return_value = MagicMock(data=[{'id': 'excluido'}])
+
+        response = client.get('/api/relatorios/delta?status=EM_DP&since=2024-05-01T12:00:10Z')
+        data = json.loads(response.data)
+
+        assert data['completo'] is False
+        assert data['data'] == [{'id': 'novo', 'status': 'EM_DP'}]
+        assert data['removidos'] == ['movido', 'excluido']
+        relatorios.eq.return_value.gte.assert_called_once_with('atualizado_em', '2024-05-01T12:00:00+00:00')
+
+    def test_sem_coluna_atualizado_em_envia_fila_completa(self, client, mock_supabase):
+        """Testa o retorno à fila completa quando o script SQL não foi aplicado"""
+        from postgrest.exceptions import APIError
+
+        tabelas = self._mock_tabelas(mock_supabase)
+        query = tabelas['relatorios'].select.return_value.eq.return_value
+        query.gte.side_effect = APIError({'code': '42703', 'message': 'column does not exist'})
+        query.order.return_value.execute.return_value = MagicMock(data=[{'id': 'a'}])
+
+        data = json.loads(client.get('/api/relatorios/delta?status=EM_DP&since=2024-05-01T12:00:00').data)
+
+        assert data['completo'] is True
+        assert relatorio_service._delta_no_servidor is False
+
+    def test_status_invalido(self, client, mock_supabase):
+        """Testa a validação do status da fila"""
+        assert client.get('/api/relatorios/delta?status=XPTO').status_code == 400
+
+class TestStatusEmLote:
+    """Testes para a atualização de status em lote"""
+
+    def test_updates_iguais_agrupados(self, client, mock_supabase):
+        """Testa se ids com o mesmo update viram um único in_() e o resultado é por id"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': '1', 'setor': 'trafego'}
+
+        update = mock_supabase.table.return_value.update
+        update.return_value.in_.return_value.execute.side_effect = [
+            MagicMock(data=[{'id': 'a'}, {'id': 'b'}]),
+            MagicMock(data=[{'id': 'c'}])
+        ]
+
+        response = client.put('/api/relatorios/status', json={
+            'status': 'COBRADO',
+            'ids': ['a', 'b', 'x'],
+            'relatorios': [{'id': 'c', 'status': 'EM_TRAFEGO', 'valor': 10}]
+        })
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert update.call_count == 2
+        update.assert_any_call({'status': 'COBRADO'})
+        update.return_value.in_.assert_any_call('id', ['a', 'b', 'x'])
+        assert data['atualizados'] == 3
+        assert data['success'] is False
+        resultados = {r['id']: r for r in data['resultados']}
+        assert resultados['c']['status'] == 'EM_TRAFEGO'
+        assert resultados['x']['message'] == 'Relatório não encontrado'
+
+    def test_status_invalido_por_item(self, client, mock_supabase):
+        """Testa se um item inválido não impede a atualização dos demais"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': '1', 'setor': 'dp'}
+
+        update = mock_supabase.table.return_value.update
+        update.return_value.in_.return_value.execute.return_value = MagicMock(data=[{'id': 'a'}])
+
+        response = client.put('/api/relatorios/status', json={
+            'relatorios': [{'id': 'a', 'status': 'EM_TRAFEGO'}, {'id': 'b', 'status': 'XPTO'}]
+        })
+        resultados = {r['id']: r for r in json.loads(response.data)['resultados']}
+
+        assert resultados['a']['success'] is True
+        assert resultados['b']['success'] is False
+        update.assert_called_once_with({'status': 'EM_TRAFEGO'})
+
+    def test_id_repetido_com_updates_diferentes(self, client, mock_supabase):
+        """Testa se um id repetido com updates conflitantes retorna 400 sem atualizar"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': '1', 'setor': 'dp'}
+
+        response = client.put('/api/relatorios/status', json={
+            'status': 'COBRADO',
+            'ids': ['a'],
+            'relatorios': [{'id': 'a', 'status': 'EM_TRAFEGO'}]
+        })
+
+        assert response.status_code == 400
+        mock_supabase.table.return_value.update.assert_not_called()
+
+    def test_id_repetido_com_mesmo_update(self, client, mock_supabase):
+        """Testa se um id repetido com o mesmo update é atualizado uma única vez"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': '1', 'setor': 'dp'}
+
+        update = mock_supabase.table.return_value.update
+        update.return_value.in_.return_value.execute.return_value = MagicMock(data=[{'id': 'a'}])
+
+        response = client.put('/api/relatorios/status', json={
+            'status': 'COBRADO',
+            'ids': ['a'],
+            'relatorios': [{'id': 'a'}]
+        })
+
+        assert response.status_code == 200
+        update.return_value.in_.assert_called_once_with('id', ['a'])
+
+    def test_lote_exige_login(self, client):
+        """Testa se o endpoint em lote exige autenticação"""
+        response = client.put('/api/relatorios/status', json={'status': 'COBRADO', 'ids': ['a']})
+        assert response.status_code == 401
+
+class TestEventos:
+    """Testes para o canal de eventos (SSE)"""
+
+    def test_broker_entrega_a_todos_os_assinantes(self):
+        """Testa o fan-out do broker em memória"""
+        from app.services.eventos_service import EventBroker
+
+        broker = EventBroker()
+        fila_a, fila_b = broker.subscribe(), broker.subscribe()
+        broker.publish('status_alterado', {'ids': ['a'], 'status': 'COBRADO'})
+
+        assert fila_a.get_nowait()['dados']['ids'] == ['a']
+        assert fila_b.get_nowait()['tipo'] == 'status_alterado'
+
+        broker.unsubscribe(fila_a)
+        assert broker.total_assinantes == 1
+
+    def test_broker_em_arquivo_entre_processos(self, tmp_path):
+        """Testa se um evento publicado por um worker chega às conexões de outro"""
+        from app.services.eventos_service import FileEventBroker
+
+        caminho = str(tmp_path / 'eventos.log')
+        publicador = FileEventBroker(caminho)
+        leitor = FileEventBroker(caminho)
+        leitor._iniciar_leitor = lambda: None
+        fila = leitor.subscribe()
+
+        publicador.publish('relatorio_criado', {'id': 'r1'})
+        leitor._ler_novos()
+
+        assert fila.get_nowait()['dados'] == {'id': 'r1'}
+
+    def test_broker_em_arquivo_pede_resync_apos_truncamento(self, tmp_path):
+        """Testa se o leitor percebe o truncamento mesmo com o arquivo já maior que sua posição"""
+        from app.services.eventos_service import EVENTO_RESYNC, FileEventBroker
+
+        caminho = str(tmp_path / 'eventos.log')
+        publicador = FileEventBroker(caminho, max_bytes=200)
+        leitor = FileEventBroker(caminho)
+        leitor._iniciar_leitor = lambda: None
+        fila = leitor.subscribe()
+
+        publicador.publish('relatorio_criado', {'id': 'r1'})
+        publicador.publish('relatorio_criado', {'id': 'r2'})
+        leitor._ler_novos()
+        assert [fila.get_nowait()['dados']['id'] for _ in range(2)] == ['r1', 'r2']
+
+        # Trunca e cresce além da posição do leitor antes da próxima leitura
+        publicador.publish('relatorio_criado', {'id': 'r3', 'obs': 'x' * 200})
+        assert os.path.getsize(caminho) > leitor._posicao
+        leitor._ler_novos()
+
+        assert fila.get_nowait()['tipo'] == EVENTO_RESYNC
+        assert fila.get_nowait()['dados']['id'] == 'r3'
+        assert fila.empty()
+
+    def test_backend_padrao_conforme_workers(self, tmp_path, monkeypatch):
+        """Testa se, sem EVENTOS_BACKEND, vários workers usam o backend em arquivo"""
+        monkeypatch.setattr(Config, 'EVENTOS_BACKEND', None)
+        monkeypatch.setattr(Config, 'EVENTOS_ARQUIVO', str(tmp_path / 'eventos.log'))
+
+        monkeypatch.setenv('WEB_CONCURRENCY', '1')
+        assert type(eventos_service.criar_broker()) is eventos_service.EventBroker
+        monkeypatch.setenv('WEB_CONCURRENCY', '4')
+        assert isinstance(eventos_service.criar_broker(), eventos_service.FileEventBroker)
+
+    def test_broker_criado_no_primeiro_uso(self, tmp_path, monkeypatch):
+        """Testa se o arquivo de eventos só é criado quando o broker é usado"""
+        caminho = tmp_path / 'eventos' / 'eventos.log'
+        monkeypatch.setattr(Config, 'EVENTOS_BACKEND', 'arquivo')
+        monkeypatch.setattr(Config, 'EVENTOS_ARQUIVO', str(caminho))
+        monkeypatch.setattr(eventos_service, '_event_broker', None)
+
+        assert not caminho.exists()
+        eventos_service.publicar_evento('relatorio_criado', {'id': 'r1'})
+
+        assert isinstance(eventos_service.get_event_broker(), eventos_service.FileEventBroker)
+        assert '"r1"' in caminho.read_text()
+
+    def test_stream_envia_eventos_publicados(self, client, monkeypatch):
+        """Testa se a rota SSE repassa os eventos do broker"""
+        from app.services.eventos_service import EventBroker
+
+        broker = EventBroker()
+        monkeypatch.setattr(eventos_service, '_event_broker', broker)
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': '1', 'setor': 'dp'}
+
+        response = client.get('/api/eventos')
+        corpo = iter(response.response)
+
+        assert response.mimetype == 'text/event-stream'
+        assert next(corpo).startswith(b'retry:')
+
+        broker.publish('status_alterado', {'ids': ['a'], 'status': 'EM_TRAFEGO'})
+        evento = next(corpo).decode('utf-8')
+        assert evento.startswith('event: status_alterado\n')
+        assert '"EM_TRAFEGO"' in evento
+        response.close()
+
+    def test_atualizar_status_publica_evento(self, client, admin_logado, mock_supabase, monkeypatch):
+        """Testa se a troca de status gera um evento"""
+        publicados = []
+        monkeypatch.setattr(rotas_relatorios, 'publicar_evento', lambda tipo, dados: publicados.append((tipo, dados)))
+        mock_supabase.table.return_value.update.return_value.eq.return_value.execute.return_value = (
+            MagicMock(data=[{'id': 'a'}])
+        )
+
+        client.put('/api/relatorios/a/status', json={'status': 'EM_DP'})
+
+        assert publicados == [('status_alterado', {'ids': ['a'], 'status': 'EM_DP'})]
+
+class TestEstatisticas:
+    """Testes para a contagem de relatórios por status"""
+
+    def test_estatisticas_agregadas_no_servidor(self, client, admin_logado, mock_supabase, monkeypatch):
+        """Testa se a contagem vem da RPC em uma única chamada"""
+        monkeypatch.setattr(estatisticas_service, '_contadores_no_servidor', False)
+        monkeypatch.setattr(estatisticas_service, '_estatisticas_no_servidor', True)
+        mock_supabase.rpc.return_value.execute.return_value.data = [
+            {'status': 'PENDENTE', 'total': 3},
+            {'status': 'COBRADO', 'total': 2}
+        ]
+
+        response = client.get('/api/estatisticas?status=COBRADO&tipo=1')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data['total'] == 2
+        assert data['por_status'] == {'PENDENTE': 3, 'EM_DP': 0, 'EM_TRAFEGO': 0, 'COBRADO': 2}
+        nome, params = mock_supabase.rpc.call_args[0]
+        assert nome == 'estatisticas_relatorios'
+        assert params['p_tipo'] == '1'
+        mock_supabase.table.assert_not_called()
+
+    def test_estatisticas_sem_rpc_contam_localmente(self, client, admin_logado, mock_supabase, monkeypatch):
+        """Testa a contagem a partir da coluna status quando a RPC não existe"""
+        monkeypatch.setattr(estatisticas_service, '_contadores_no_servidor', False)
+        monkeypatch.setattr(estatisticas_service, '_estatisticas_no_servidor', True)
+        mock_supabase.rpc.return_value.execute.side_effect = estatisticas_service.APIError(
+            {'code': 'PGRST202', 'message': 'function not found'}
+        )
+        query = mock_supabase.table.return_value.select.return_value
+        query.execute.return_value.data = [
+            {'status': 'PENDENTE'}, {'status': 'EM_DP'}, {'status': 'EM_DP'}
+        ]
+
+        response = client.get('/api/estatisticas')
+        data = json.loads(response.data)
+
+        assert data['total'] == 3
+        assert data['por_status']['EM_DP'] == 2
+        mock_supabase.table.return_value.select.assert_called_once_with('status')
+        assert estatisticas_service._estatisticas_no_servidor is False
+
+    def test_estatisticas_lidas_dos_contadores(self, client, admin_logado, mock_supabase, monkeypatch):
+        """Testa se os contadores são somados por status no banco (RPC)"""
+        monkeypatch.setattr(estatisticas_service, '_contadores_no_servidor', True)
+        monkeypatch.setattr(estatisticas_service, '_soma_contadores_no_servidor', True)
+        mock_supabase.rpc.return_value.execute.return_value.data = [
+            {'status': 'PENDENTE', 'total': 5},
+            {'status': 'EM_DP', 'total': 2}
+        ]
+
+        response = client.get(
+            '/api/estatisticas?tipo=1&status=PENDENTE&data_inicio=2024-01-01&data_fim=2024-01-31'
+        )
+        data = json.loads(response.data)
+
+        assert data['total'] == 5
+        assert data['por_status']['EM_DP'] == 2
+        mock_supabase.rpc.assert_called_once_with('estatisticas_contadores', {
+            'p_tipo': '1', 'p_porteiro': None,
+            'p_data_inicio': '2024-01-01', 'p_data_fim': '2024-01-31'
+        })
+        mock_supabase.table.assert_not_called()
+
+    def test_contadores_sem_rpc_lidos_em_paginas(self, client, admin_logado, mock_supabase, monkeypatch):
+        """Testa se, sem a RPC, todas as páginas de contadores são lidas e somadas"""
+        monkeypatch.setattr(estatisticas_service, '_contadores_no_servidor', True)
+        monkeypatch.setattr(estatisticas_service, '_soma_contadores_no_servidor', True)
+        monkeypatch.setattr(estatisticas_service, 'PAGINA_CONTADORES', 2)
+        mock_supabase.rpc.return_value.execute.side_effect = estatisticas_service.APIError(
+            {'code': 'PGRST202', 'message': 'function not found'}
+        )
+        query = mock_supabase.table.return_value.select.return_value \
+            .order.return_value.order.return_value.order.return_value.order.return_value
+        query.range.return_value.execute.side_effect = [
+            MagicMock(data=[{'status': 'PENDENTE', 'total': 4}, {'status': 'EM_DP', 'total': 2}]),
+            MagicMock(data=[{'status': 'PENDENTE', 'total': 1}, {'status': 'COBRADO', 'total': 3}]),
+            MagicMock(data=[{'status': 'PENDENTE', 'total': 2}])
+        ]
+
+        data = json.loads(client.get('/api/estatisticas').data)
+
+        assert data['por_status'] == {'PENDENTE': 7, 'EM_DP': 2, 'EM_TRAFEGO': 0, 'COBRADO': 3}
+        assert [c[0] for c in query.range.call_args_list] == [(0, 1), (2, 3), (4, 5)]
+        mock_supabase.table.assert_called_with('relatorios_contadores')
+        assert estatisticas_service._soma_contadores_no_servidor is False
+
+    def test_contadores_nao_atendem_numero_os(self):
+        """Testa se filtros fora das dimensões dos contadores usam a agregação"""
+        assert estatisticas_service.contadores_atendem({'tipo': '1', 'numero_os': None})
+        assert not estatisticas_service.contadores_atendem({'numero_os': 'OS-2024-000001'})
+
+class TestEnriquecimento:
+    """Testes para o enriquecimento em lote de relatórios"""
+
+    def test_enriquecer_relatorios_uma_consulta_por_tabela(self, mock_supabase):
+        """Testa se nomes de porteiro e tipo são buscados com uma consulta por tabela"""
+        tabelas = {
+            'porteiros': MagicMock(),
+            'tipos_relatorio': MagicMock()
+        }
+        tabelas['porteiros'].select.return_value.in_.return_value.execute.return_value.data = [
+            {'id': 'p1', 'nome': 'Porteiro 1'}
+        ]
+        tabelas['tipos_relatorio'].select.return_value.in_.return_value.execute.return_value.data = [
+            {'id': 1, 'nome': 'Avaria'}
+        ]
+        mock_supabase.table.side_effect = lambda nome: tabelas[nome]
+
+        relatorios = [
+            {'id': 'r1', 'porteiro_id': 'p1', 'tipo_id': 1},
+            {'id': 'r2', 'porteiro_id': 'p1', 'tipo_id': 1},
+            {'id': 'r3', 'porteiro_id': 'p2', 'tipo_id': None}
+        ]
+        relatorio_service.enriquecer_relatorios(relatorios)
+
+        assert tabelas['porteiros'].select.return_value.in_.call_count == 1
+        assert tabelas['porteiros'].select.return_value.in_.call_args[0] == ('id', ['p1', 'p2'])
+        assert tabelas['tipos_relatorio'].select.return_value.in_.call_count == 1
+        assert [r['porteiro_nome'] for r in relatorios] == ['Porteiro 1', 'Porteiro 1', 'N/A']
+        assert [r.get('tipo_nome') for r in relatorios] == ['Avaria', 'Avaria', None]
+
+    def test_enriquecer_relatorios_erro_na_consulta(self, mock_supabase):
+        """Testa se falhas na consulta marcam os nomes como 'Erro'"""
+        mock_supabase.table.side_effect = Exception("Erro de teste")
+
+        relatorios = [{'id': 'r1', 'porteiro_id': 'p1', 'tipo_id': 1}]
+        relatorio_service.enriquecer_relatorios(relatorios)
+
+        assert relatorios[0]['porteiro_nome'] == 'Erro'
+        assert relatorios[0]['tipo_nome'] == 'Erro'
+
+class TestCacheReferencia:
+    """Testes para o cache das tabelas de referência"""
+
+    def test_tipos_relatorio_servidos_do_cache(self, client, admin_logado, mock_supabase):
+        """Testa se a segunda chamada não consulta o Supabase"""
+        mock_supabase.table.return_value.select.return_value.execute.return_value.data = [
+            {'id': 1, 'nome': 'Teste'}
+        ]
+
+        client.get('/api/tipos-relatorio')
+        response = client.get('/api/tipos-relatorio')
+
+        assert json.loads(response.data) == [{'id': 1, 'nome': 'Teste'}]
+        assert mock_supabase.table.return_value.select.return_value.execute.call_count == 1
+
+        supabase_module.invalidar_cache_referencia('tipos_relatorio')
+        client.get('/api/tipos-relatorio')
+        assert mock_supabase.table.return_value.select.return_value.execute.call_count == 2
+
+    def test_cache_expira_e_respeita_limite(self, monkeypatch):
+        """Testa a expiração por TTL e o descarte do item mais antigo"""
+        from app.services.supabase_service import TTLCache
+
+        agora = [100.0]
+        monkeypatch.setattr('app.services.supabase_service.time.monotonic', lambda: agora[0])
+
+        cache = TTLCache(ttl=10, max_itens=2)
+        cache.set(('porteiros', 'a'), 1)
+        cache.set(('porteiros', 'b'), 2)
+        cache.set(('tipos_relatorio', 'c'), 3)
+
+        assert cache.get(('porteiros', 'a')) is None
+        assert cache.get(('porteiros', 'b')) == 2
+
+        agora[0] += 11
+        assert cache.get(('tipos_relatorio', 'c')) is None
+
+    def test_nomes_expiram_por_id_e_ids_ausentes_ficam_em_cache(self, mock_supabase, monkeypatch):
+        """Testa se cada id expira no seu prazo e se ids inexistentes não são reconsultados"""
+        agora = [100.0]
+        monkeypatch.setattr('app.services.supabase_service.time.monotonic', lambda: agora[0])
+        ttl = supabase_module.cache_referencia.ttl
+
+        in_ = mock_supabase.table.return_value.select.return_value.in_
+        in_.return_value.execute.return_value.data = [{'id': 'p1', 'nome': 'Porteiro 1'}]
+        assert relatorio_service.buscar_nomes_por_id('porteiros', ['p1', 'p9']) == {'p1': 'Porteiro 1'}
+
+        agora[0] += ttl - 1
+        in_.return_value.execute.return_value.data = [{'id': 'p2', 'nome': 'Porteiro 2'}]
+        assert relatorio_service.buscar_nomes_por_id('porteiros', ['p1', 'p2', 'p9']) == {
+            'p1': 'Porteiro 1', 'p2': 'Porteiro 2'
+        }
+        assert in_.call_args[0] == ('id', ['p2'])
+
+        # p1 e p9 expiram; p2, buscado depois, continua em cache
+        agora[0] += 2
+        in_.return_value.execute.return_value.data = [{'id': 'p1', 'nome': 'Porteiro 1'}]
+        relatorio_service.buscar_nomes_por_id('porteiros', ['p1', 'p2', 'p9'])
+        assert in_.call_args[0] == ('id', ['p1', 'p9'])
+        assert in_.call_count == 3
+
+class TestExportacao:
+    """Testes para a exportação de relatórios"""
+
+    def _mock_tabelas(self, mock_supabase, paginas):
+        tabelas = {nome: MagicMock() for nome in ('relatorios', 'porteiros', 'tipos_relatorio')}
+        query = tabelas['relatorios'].select.return_value.order.return_value.order.return_value
+        query.limit.return_value.execute.side_effect = [
+            MagicMock(data=pagina) for pagina in paginas
+        ]
+        for nome in ('porteiros', 'tipos_relatorio'):
+            tabelas[nome].select.return_value.in_.return_value.execute.return_value.data = []
+        mock_supabase.table.side_effect = lambda nome: tabelas[nome]
+        return query
+
+    def test_exportacao_busca_em_paginas(self, mock_supabase):
+        """Testa se a exportação percorre as páginas com cursor até a última"""
+        query = self._mock_tabelas(mock_supabase, [
+            [{'id': 'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d93', 'criado_em': '2024-01-03T10:00:00+00:00'},
+             {'id': 'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d92', 'criado_em': '2024-01-02T10:00:00+00:00'}],
+            [{'id': 'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d91', 'criado_em': '2024-01-01T10:00:00+00:00'}]
+        ])
+        params = query.params
+
+        relatorios = list(export_service.iterar_relatorios_exportacao({}, tamanho_pagina=2))
+
+        assert [r['id'] for r in relatorios] == [
+            'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d93',
+            'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d92',
+            'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d91'
+        ]
+        assert relatorios[0]['criado_em'] == '03/01/2024 10:00:00'
+        assert query.limit.call_count == 2
+        params.add.assert_called_once_with(
+            'or', '(criado_em.lt."2024-01-02T10:00:00+00:00",'
+                  'and(criado_em.eq."2024-01-02T10:00:00+00:00",id.lt.c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d92))'
+        )
+
+    def test_exportacao_pagina_terminando_sem_criado_em(self, mock_supabase):
+        """Testa se um relatório sem criado_em no fim da página não interrompe a exportação"""
+        query = self._mock_tabelas(mock_supabase, [
+            [{'id': 'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d93', 'criado_em': None}],
+            [{'id': 'c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d91', 'criado_em': '2024-01-01T10:00:00+00:00'}],
+            []
+        ])
+        params = query.params
+
+        relatorios = list(export_service.iterar_relatorios_exportacao({}, tamanho_pagina=1))
+
+        assert len(relatorios) == 2
+        params.add.assert_any_call(
+            'or', '(and(criado_em.is.null,id.lt.c0a8f3d2-1e4b-4a7c-9d2e-3f5a6b7c8d93),criado_em.not.is.null)'
+        )
+
+    def test_exportar_html_em_streaming(self, client, admin_logado, mock_supabase):
+        """Testa se o HTML é enviado como resposta em streaming"""
+        self._mock_tabelas(mock_supabase, [
+            [{'id': 1, 'criado_em': '2024-01-01T10:00:00+00:00', 'numero_os': 'OS-2024-000001',
+              'dados': '• Matrícula: 123'}]
+        ])
+
+        response = client.get('/api/exportar/html')
+        assert response.is_streamed
+        html = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert 'OS-2024-000001' in html
+        assert 'Total de relatórios: 1' in html
+
+    def test_exportar_html_data_invalida(self, client, admin_logado, mock_supabase):
+        """Testa se uma data inválida é rejeitada antes do streaming"""
+        response = client.get('/api/exportar/html?data_inicio=2024-01-01&data_fim=01/02/2024')
+        assert response.status_code == 400
+
+    def test_exportar_csv(self, client, admin_logado, mock_supabase):
+        """Testa se o CSV é gerado em streaming com cabeçalho e células protegidas"""
+        self._mock_tabelas(mock_supabase, [
+            [{'id': 1, 'criado_em': '2024-01-01T10:00:00+00:00', 'numero_os': 'OS-2024-000001',
+              'status': 'PENDENTE', 'dados': '=HYPERLINK("x")'}]
+        ])
+
+        response = client.get('/api/exportar/csv')
+        assert response.is_streamed
+        linhas = response.get_data(as_text=True).lstrip('\ufeff').splitlines()
+
+        assert response.status_code == 200
+        assert 'attachment' in response.headers['Content-Disposition']
+        assert linhas[0].startswith('Número OS;Data;Tipo')
+        assert linhas[1].startswith('OS-2024-000001;01/01/2024 10:00:00;')
+        assert linhas[1].endswith(';"\'=HYPERLINK(""x"")"')
+
+    def test_exportar_xlsx(self, client, admin_logado, mock_supabase):
+        """Testa se a planilha XLSX contém o cabeçalho e os relatórios"""
+        openpyxl = pytest.importorskip('openpyxl')
+        self._mock_tabelas(mock_supabase, [
+            [{'id': 1, 'criado_em': '2024-01-01T10:00:00+00:00', 'numero_os': 'OS-2024-000001',
+              'dados': {'matricula': '123'}}]
+        ])
+
+        response = client.get('/api/exportar/xlsx')
+        planilha = openpyxl.load_workbook(io.BytesIO(response.get_data())).active
+        linhas = list(planilha.iter_rows(values_only=True))
+
+        assert response.status_code == 200
+        assert linhas[0][0] == 'Número OS'
+        assert linhas[1][0] == 'OS-2024-000001'
+        assert linhas[1][-1] == '{"matricula": "123"}'
+
+class TestExportacaoEmSegundoPlano:
+    """Testes para os jobs de exportação"""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        from app.services.export_service import ExportJobManager
+        manager = ExportJobManager(export_dir=str(tmp_path), max_workers=1, ttl=3600)
+        monkeypatch.setattr(export_service, '_export_manager', manager)
+        yield manager
+        manager._executor.shutdown(wait=True)
+
+    def test_job_gera_arquivo_e_registra_progresso(self, manager):
+        """Testa se o job grava o arquivo e o estado final em disco"""
+        def gerar(caminho, progresso):
+            with open(caminho, 'w') as arquivo:
+                for linhas in range(1, 4):
+                    arquivo.write('linha\n')
+                    progresso(linhas)
+
+        job = manager.submit('csv', 'csv', gerar, total=3)
+        manager._executor.shutdown(wait=True)
+
+        estado = manager.get_job(job['id'])
+        assert estado['status'] == 'completed'
+        assert estado['linhas'] == 3
+        assert manager.get_artifact(estado).read_text() == 'linha\n' * 3
+
+    def test_job_com_erro(self, manager):
+        """Testa se a falha é registrada e o arquivo parcial removido"""
+        def gerar(caminho, progresso):
+            open(caminho, 'w').close()
+            raise RuntimeError('falhou')
+
+        job = manager.submit('html', 'html', gerar)
+        manager._executor.shutdown(wait=True)
+
+        estado = manager.get_job(job['id'])
+        assert estado['status'] == 'failed'
+        assert estado['error'] == 'falhou'
+        assert not manager.get_artifact(estado).exists()
+        assert manager.get_job('../segredo') is None
+
+    def test_criar_job_exige_login_e_formato_valido(self, client, manager):
+        """Testa autenticação e validação do formato"""
+        assert client.post('/api/exportar/jobs?formato=csv').status_code == 401
+
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': 'u1', 'setor': 'admin'}
+        response = client.post('/api/exportar/jobs?formato=pdf')
+        assert response.status_code == 400
+
+    def test_download_antes_da_conclusao(self, client, manager):
+        """Testa se o download de um job em andamento responde 409"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': 'u1', 'setor': 'admin'}
+        job = {'id': 'a' * 32, 'formato': 'csv', 'status': 'in_progress', 'arquivo': 'x.csv'}
+        manager._salvar_estado(job)
+
+        assert client.get(f"/api/exportar/jobs/{'a' * 32}/download").status_code == 409
+        assert client.get(f"/api/exportar/jobs/{'b' * 32}").status_code == 404
+
+class TestNumeroOS:
+    """Testes para a reserva de números de OS"""
+
+    def test_bloco_reservado_com_uma_chamada(self, monkeypatch):
+        """Testa se um bloco é reservado uma vez e consumido localmente"""
+        from app.services import relatorio_service
+
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value = MagicMock(
+            data=[{'numero': 7}, {'numero': 8}]
+        )
+        monkeypatch.setattr(relatorio_service.supabase_service, 'client', client, raising=False)
+
+        reserva = relatorio_service.ReservaNumerosOS(tamanho_bloco=2)
+        ano = datetime.now().year
+
+        assert reserva.proximo() == f'OS-{ano}-000007'
+        assert reserva.proximo() == f'OS-{ano}-000008'
+        client.rpc.assert_called_once_with('reservar_numeros_os', {'p_quantidade': 2})
+
+        reserva.proximo()
+        assert client.rpc.call_count == 2
+
+    def test_sem_bloco_deixa_trigger_gerar(self):
+        """Testa se, sem bloco configurado, nenhum número é gerado na aplicação"""
+        from app.services.relatorio_service import ReservaNumerosOS
+
+        assert ReservaNumerosOS(tamanho_bloco=0).proximo() is None
+
+class TestUploadFotos:
+    """Testes para o envio de fotos dos relatórios"""
+
+    FOTO = 'data:image/jpeg;base64,' + base64.b64encode(b'imagem').decode()
+    OUTRA_FOTO = 'data:image/jpeg;base64,' + base64.b64encode(b'outra imagem').decode()
+
+    def test_fotos_enviadas_em_paralelo_na_ordem(self, mock_supabase):
+        """Testa se os uploads são simultâneos e mantêm FOTO1..N na ordem"""
+        import threading
+        barreira = threading.Barrier(2, timeout=5)
+
+        def upload(caminho, dados, opcoes):
+            barreira.wait()  # só passa se as duas fotos estiverem em upload ao mesmo tempo
+            return MagicMock(error=None)
+
+        mock_supabase.storage.from_.return_value.upload.side_effect = upload
+
+        fotos_dict, fotos_urls = foto_service.processar_fotos([
+            {'base64': self.FOTO, 'fileName': 'a.jpg'},
+            {'base64': 'invalida'},
+            {'base64': self.OUTRA_FOTO, 'fileName': 'c.jpg'}
+        ])
+
+        sha = hashlib.sha256(b'outra imagem').hexdigest()
+        assert list(fotos_dict) == ['FOTO1', 'FOTO3']
+        assert fotos_dict['FOTO3'].endswith(f'/relatorios-fotos/conteudo/{sha[:2]}/{sha}.jpeg')
+        assert [f['fileName'] for f in fotos_urls] == ['a.jpg', 'c.jpg']
+
+    def test_falha_no_upload_isolada(self, mock_supabase):
+        """Testa se a falha de uma foto não impede as demais"""
+        mock_supabase.storage.from_.return_value.upload.side_effect = [
+            Exception('timeout'), MagicMock(error=None)
+        ]
+
+        fotos_dict, _ = foto_service.processar_fotos([
+            {'base64': self.FOTO}, {'base64': self.OUTRA_FOTO}
+        ])
+
+        assert len(fotos_dict) == 1
+
+    def test_foto_repetida_nao_reenviada(self, mock_supabase):
+        """Testa se uma foto já enviada é reaproveitada pelo hash do conteúdo"""
+        bucket = mock_supabase.storage.from_.return_value
+        bucket.list.return_value = []
+        bucket.upload.return_value = MagicMock(error=None)
+
+        primeiro, _ = foto_service.processar_fotos([{'base64': self.FOTO}])
+        segundo, _ = foto_service.processar_fotos([{'base64': self.FOTO}])
+
+        assert segundo == primeiro
+        assert bucket.upload.call_count == 1
+
+    def test_foto_existente_no_storage(self, mock_supabase):
+        """Testa se a foto encontrada na pasta do hash não é enviada novamente"""
+        sha = hashlib.sha256(b'imagem').hexdigest()
+        bucket = mock_supabase.storage.from_.return_value
+        bucket.list.return_value = [{'name': f'{sha}.jpeg'}, {'name': f'{sha}_thumb.jpeg'}]
+
+        fotos_dict, _ = foto_service.processar_fotos([{'base64': self.FOTO}])
+
+        bucket.list.assert_called_once_with(f'conteudo/{sha[:2]}', {'search': sha})
+        bucket.upload.assert_not_called()
+        assert fotos_dict['FOTO1_thumb'].endswith(f'{sha}_thumb.jpeg')
+
+    def test_upload_duplicado_tratado_como_sucesso(self, mock_supabase):
+        """Testa se o objeto já existente (envio simultâneo) não é tratado como falha"""
+        bucket = mock_supabase.storage.from_.return_value
+        bucket.list.return_value = []
+        bucket.upload.side_effect = Exception({'statusCode': 409, 'error': 'Duplicate'})
+
+        fotos_dict, _ = foto_service.processar_fotos([{'base64': self.FOTO}])
+
+        assert list(fotos_dict) == ['FOTO1']
+
+    def test_foto_redimensionada_com_miniatura(self, mock_supabase):
+        """Testa se fotos grandes são reduzidas e ganham a chave FOTOn_thumb"""
+        Image = pytest.importorskip('PIL.Image')
+        original = io.BytesIO()
+        Image.new('RGB', (4000, 3000), (200, 30, 30)).save(original, 'JPEG', quality=95)
+        foto = 'data:image/jpeg;base64,' + base64.b64encode(original.getvalue()).decode()
+        enviados = {}
+
+        def upload(caminho, dados, opcoes):
+            enviados[caminho.rsplit('/', 1)[-1]] = dados
+            return MagicMock(error=None)
+
+        mock_supabase.storage.from_.return_value.upload.side_effect = upload
+
+        fotos_dict, fotos_urls = foto_service.processar_fotos([{'base64': foto}])
+
+        assert sorted(fotos_dict) == ['FOTO1', 'FOTO1_thumb']
+        assert fotos_urls[0]['thumbUrl'] == fotos_dict['FOTO1_thumb']
+        foto_salva = next(v for k, v in enviados.items() if not k.endswith('_thumb.jpeg'))
+        miniatura = next(v for k, v in enviados.items() if k.endswith('_thumb.jpeg'))
+        assert max(Image.open(io.BytesIO(foto_salva)).size) == foto_service.FOTO_MAX_LADO
+        assert max(Image.open(io.BytesIO(miniatura)).size) == foto_service.FOTO_THUMB_LADO
+
+    def test_foto_pequena_mantida_original(self):
+        """Testa se uma foto já pequena não é recomprimida para um arquivo maior"""
+        Image = pytest.importorskip('PIL.Image')
+        original = io.BytesIO()
+        Image.frombytes('RGB', (200, 100), os.urandom(200 * 100 * 3)).save(original, 'JPEG', quality=30)
+
+        formato, foto, miniatura = foto_service.processar_imagem(original.getvalue(), 'jpeg')
+
+        assert formato == 'jpeg'
+        assert foto is None
+        assert max(Image.open(io.BytesIO(miniatura)).size) == 200
+
+    def test_criar_relatorio_multipart(self, client, mock_supabase):
+        """Testa o envio das fotos como arquivos em multipart/form-data"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': 'p1', 'setor': 'porteiro'}
+        enviados = []
+
+        def upload(caminho, arquivo, opcoes):
+            enviados.append((caminho, arquivo.read(), opcoes['content-type']))
+            return MagicMock(error=None)
+
+        mock_supabase.storage.from_.return_value.upload.side_effect = upload
+        mock_supabase.table.return_value.insert.return_value.execute.return_value.data = [{'id': 'r1'}]
+
+        response = client.post('/api/relatorios', data={
+            'tipo_id': '2',
+            'dados': json.dumps('• Matrícula: 123'),
+            'fotos': [
+                (io.BytesIO(b'jpeg'), 'a.jpg', 'image/jpeg'),
+                (io.BytesIO(b'texto'), 'b.txt', 'text/plain'),
+                (io.BytesIO(b'png'), 'c.png', 'image/png')
+            ],
+            'fotos_campo': ['foto_frente', 'foto_lado', 'foto_tras']
+        }, content_type='multipart/form-data')
+        data = json.loads(response.data)
+
+        assert data['success']
+        assert sorted(e[1] for e in enviados) == [b'jpeg', b'png']
+        inserido = mock_supabase.table.return_value.insert.call_args[0][0]
+        assert inserido['tipo_id'] == 2
+        assert inserido['dados'] == '• Matrícula: 123'
+        assert sorted(inserido['fotos']) == ['FOTO1', 'FOTO3']
+        assert [f['campoNome'] for f in data['fotosUrls']] == ['foto_frente', 'foto_tras']
+
+class TestFotosAssincronas:
+    """Testes para o envio de fotos após a gravação do relatório"""
+
+    def test_relatorio_gravado_antes_das_fotos(self, client, mock_supabase, monkeypatch):
+        """Testa se o relatório é inserido como pendente e as fotos atualizadas depois"""
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=1)
+        monkeypatch.setattr(rotas_relatorios, 'fotos_assincronas_executor', executor)
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': 'p1', 'setor': 'porteiro'}
+        tabela = mock_supabase.table.return_value
+        tabela.insert.return_value.execute.return_value.data = [{'id': 'r1'}]
+        mock_supabase.storage.from_.return_value.list.return_value = []
+        mock_supabase.storage.from_.return_value.upload.return_value = MagicMock(error=None)
+
+        response = client.post('/api/relatorios', json={
+            'tipo_id': 1,
+            'dados': 'texto',
+            'fotos_assincronas': True,
+            'fotos': [{'base64': TestUploadFotos.FOTO}]
+        })
+        data = json.loads(response.data)
+        executor.shutdown(wait=True)
+
+        assert data['fotos_pendentes'] is True
+        assert data['fotos_status_url'] == '/api/relatorios/r1/fotos'
+        assert tabela.insert.call_args[0][0]['fotos']['_status'] == 'PROCESSANDO'
+        atualizacao = tabela.update.call_args[0][0]
+        assert list(atualizacao['fotos']) == ['FOTO1']
+        tabela.update.return_value.eq.assert_called_with('id', 'r1')
+
+    def test_status_das_fotos(self, client, mock_supabase):
+        """Testa a consulta da situação das fotos pelo frontend"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': 'p1', 'setor': 'porteiro'}
+        execute = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+
+        execute.return_value.data = [{'fotos': foto_service.marcador_fotos_processando()}]
+        assert json.loads(client.get('/api/relatorios/r1/fotos').data)['status'] == 'processando'
+
+        execute.return_value.data = [{'fotos': {'FOTO2': 'u2', 'FOTO1': 'u1', 'FOTO1_thumb': 't1'}}]
+        data = json.loads(client.get('/api/relatorios/r1/fotos').data)
+        assert data['status'] == 'concluido'
+        assert [(f['placeholder'], f['url'], f['thumbUrl']) for f in data['fotosUrls']] == [
+            ('FOTO1', 'u1', 't1'), ('FOTO2', 'u2', None)
+        ]
+
+    def test_fotos_presas_em_processamento_viram_erro(self, client, mock_supabase, monkeypatch):
+        """Testa se fotos em PROCESSANDO além do prazo (worker reiniciado) são marcadas como ERRO"""
+        monkeypatch.setattr(foto_service, 'FOTOS_PROCESSANDO_TIMEOUT', 60)
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': 'p1', 'setor': 'porteiro'}
+        tabela = mock_supabase.table.return_value
+        marcador = foto_service.marcador_fotos_processando()
+        marcador['_inicio'] -= 61
+        tabela.select.return_value.eq.return_value.execute.return_value.data = [{'fotos': marcador}]
+
+        data = json.loads(client.get('/api/relatorios/r1/fotos').data)
+
+        assert data['status'] == 'erro'
+        tabela.update.assert_called_once_with({'fotos': {'_status': 'ERRO'}})
+        tabela.update.return_value.eq.assert_called_once_with('id', 'r1')
+        tabela.update.return_value.eq.return_value.eq.assert_called_once_with(
+            'fotos->>_status', 'PROCESSANDO'
+        )
+
+class TestLogRequisicoes:
+    """Testes para o middleware de log de requisições"""
+
+    def test_log_nao_le_o_corpo(self, client, monkeypatch, caplog):
+        """Testa se o log usa só cabeçalhos, sem interpretar o JSON enviado"""
+        monkeypatch.setattr(Config, 'LOG_REQUESTS_LENTAS_MS', 0)
+        get_json = MagicMock()
+        monkeypatch.setattr(app.request_class, 'get_json', get_json)
+        corpo = json.dumps({'fotos': [{'base64': 'x' * 1000}]})
+
+        with caplog.at_level('WARNING', logger='app'):
+            response = client.post('/api/logout', data=corpo, content_type='application/json')
+
+        assert response.status_code == 200
+        get_json.assert_not_called()
+        assert 'POST /api/logout 200' in caplog.text
+        assert f'entrada={len(corpo)}B' in caplog.text
+
+class TestAplicacao:
+    """Testes para a criação da aplicação"""
+
+    def test_app_py_e_run_py_expoem_as_mesmas_rotas(self):
+        """Testa se o app.py e o create_app do run.py registram as mesmas rotas"""
+        from app import create_app
+
+        def rotas(aplicacao):
+            return {(r.rule, tuple(sorted(r.methods))) for r in aplicacao.url_map.iter_rules()}
+
+        assert rotas(app) == rotas(create_app())
+        assert '/api/relatorios/delta' in {regra for regra, _ in rotas(app)}
+
+    def test_criar_aplicacao_nao_inicia_servicos(self, tmp_path):
+        """Testa se criar a aplicação não cria o cliente Supabase, threads nem backups/"""
+        import subprocess
+        codigo = (
+            "import threading, app, backup\n"
+            "from app.services.supabase_service import supabase_service\n"
+            "app.create_app()\n"
+            "print(threading.active_count(), 'client' in vars(supabase_service))"
+        )
+        resultado = subprocess.run(
+            [sys.executable, '-c', codigo], cwd=tmp_path, capture_output=True, text=True,
+            env={**os.environ, 'PYTHONPATH': str(Path(__file__).parent.parent)}, timeout=60
+        )
+
+        assert resultado.stdout.split() == ['1', 'False'], resultado.stderr
+        assert not (tmp_path / 'backups').exists()
+
+    def test_agendamento_de_backup_nao_duplica(self, tmp_path, monkeypatch):
+        """Testa se iniciar o agendamento duas vezes cria uma só thread"""
+        from app.services.backup_service import BackupManager
+        manager = BackupManager(str(tmp_path))
+        monkeypatch.setattr(manager, 'run_scheduler', lambda: None)
+
+        assert manager.start_scheduler() is True
+        assert manager.start_scheduler() is False
+
+    def test_apenas_um_processo_executa_backups_agendados(self, tmp_path):
+        """Testa se só o detentor do lock agenda backups e se outro assume quando ele sai"""
+        pytest.importorskip('fcntl')
+        from app.services.backup_service import BackupManager
+        lider = BackupManager(str(tmp_path))
+        seguidor = BackupManager(str(tmp_path))
+
+        lider._scheduler_step()
+        seguidor._scheduler_step()
+        assert len(lider._scheduler.jobs) == 2
+        assert len(seguidor._scheduler.jobs) == 0
+
+        # Processo líder encerrado: o sistema libera o lock
+        lider._scheduler_lock_handle.close()
+        seguidor._scheduler_step()
+        assert len(seguidor._scheduler.jobs) == 2
+
+class TestBackupIncremental:
+    """Testes para o backup incremental com repositório por conteúdo"""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        from app.services.backup_service import BackupManager
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'static' / 'css').mkdir(parents=True)
+        (tmp_path / 'static' / 'css' / 'a.css').write_text('body {}')
+        (tmp_path / 'static' / 'css' / 'b.css').write_text('body {}')
+        return BackupManager('backups', backup_mode='incremental')
+
+    def test_conteudo_guardado_uma_vez(self, manager):
+        """Testa se conteúdo repetido ou inalterado não é gravado de novo"""
+        primeiro = manager.create_backup()
+        segundo = manager.create_backup()
+
+        assert primeiro['status'] == 'completed'
+        assert sorted(primeiro['files']) == ['static/css/a.css', 'static/css/b.css']
+        assert primeiro['new_objects'] == 1
+        assert segundo['new_objects'] == 0 and segundo['size'] == 0
+        assert primeiro['manifest_path'] != segundo['manifest_path']
+        assert len(list(manager.objects_dir.glob('*/*'))) == 1
+
+    def test_restaura_a_partir_do_manifesto(self, manager, tmp_path):
+        """Testa se a restauração reconstrói os arquivos do backup escolhido"""
+        primeiro = manager.create_backup()
+        (tmp_path / 'static' / 'css' / 'a.css').write_text('body { color: red }')
+        manager.create_backup()
+
+        resultado = manager.restore_backup(primeiro['id'])
+
+        restaurado = Path(resultado['restore_path']) / 'static' / 'css' / 'a.css'
+        assert resultado['success'] is True
+        assert restaurado.read_text() == 'body {}'
+
+    def test_limpeza_remove_conteudo_nao_referenciado(self, manager, tmp_path):
+        """Testa se o conteúdo de backups removidos sai do repositório"""
+        manager.max_backups = 1
+        manager.create_backup()
+        (tmp_path / 'static' / 'css' / 'a.css').write_text('body { color: red }')
+        (tmp_path / 'static' / 'css' / 'b.css').write_text('body { color: red }')
+        atual = manager.create_backup()
+
+        assert [b['id'] for b in manager.list_backups()] == [atual['id']]
+        assert manager._remove_unreferenced_objects(grace_seconds=0) == 1
+        assert manager.restore_backup(atual['id'])['success'] is True
+
+    def test_processos_concorrentes_nao_repetem_id(self, manager):
+        """Testa se gerenciadores distintos no mesmo diretório gravam todos os backups com IDs únicos"""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.services.backup_service import BackupManager
+
+        outro = BackupManager('backups', backup_mode='incremental')
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            resultados = list(executor.map(
+                lambda m: m.create_backup(), [manager, outro] * 4
+            ))
+
+        ids = [b['id'] for b in manager.list_backups()]
+        assert all(r['status'] == 'completed' for r in resultados)
+        assert sorted(ids) == list(range(1, 9))
+
 class TestErrorHandlers:
     """Testes para handlers de erro"""
     
@@ -120,10 +1267,10 @@ class TestErrorHandlers:
         assert data['message'] == 'Recurso não encontrado'
         assert response.status_code == 404
     
-    def test_500_error_handler(self, client):
+    def test_500_error_handler(self, client, admin_logado):
         """Testa handler de erro 500"""
         # Simula erro interno acessando uma rota que pode causar erro
-        with patch.object(app_module, 'supabase') as mock_supabase:
+        with patch.object(supabase_module.supabase_service, 'client') as mock_supabase:
             mock_supabase.table.side_effect = Exception("Erro de teste")
             response = client.get('/api/tipos-relatorio')
             assert response.status_code == 500
@@ -142,5 +1289,30 @@ class TestSecurity:
         # Verifica se não há headers que possam expor informações sensíveis
         assert 'X-Powered-By' not in response.headers
 
+    def test_rotas_de_relatorios_exigem_login(self, client):
+        """Testa se relatórios, estatísticas e exportações exigem sessão"""
+        for rota in ('/api/relatorios', '/api/relatorios/r1', '/api/tipos-relatorio',
+                     '/api/porteiros', '/api/estatisticas', '/api/exportar/csv'):
+            assert client.get(rota).status_code == 401
+        assert client.put('/api/relatorios/r1/status', json={'status': 'DP'}).status_code == 401
+
+    def test_setores_sem_permissao(self, client):
+        """Testa se porteiro não altera status nem exporta CSV/XLSX"""
+        with client.session_transaction() as sess:
+            sess['user'] = {'id': '1', 'setor': 'porteiro'}
+        response = client.put('/api/relatorios/r1/status', json={'status': 'DP'})
+        assert response.status_code == 403
+        for formato in ('csv', 'xlsx'):
+            assert client.get(f'/api/exportar/{formato}').status_code == 403
+        assert client.post('/api/exportar/jobs?formato=csv').status_code == 403
+
+    def test_dp_e_trafego_exportam(self, client, mock_supabase):
+        """Testa se DP e Tráfego acessam as exportações CSV/XLSX"""
+        for setor in ('dp', 'trafego'):
+            with client.session_transaction() as sess:
+                sess['user'] = {'id': '1', 'setor': setor}
+            for formato in ('csv', 'xlsx'):
+                assert client.get(f'/api/exportar/{formato}').status_code != 403
+
 if __name__ == '__main__':
     pytest.main([__file__])